@@ -3,6 +3,8 @@ from . import models
 # Register your models here.
 admin.site.register(models.Employee)
 admin.site.register(models.Attendance)
+admin.site.register(models.AttendanceEvent)
+admin.site.register(models.AttendanceArchive)
 admin.site.register(models.AllowedEmail)
 admin.site.register(models.Position)
 admin.site.register(models.Sector)
@@ -14,4 +16,10 @@ admin.site.register(models.MessageBox)
 admin.site.register(models.Task)
 admin.site.register(models.TaskHistoryKeeper)
 admin.site.register(models.MonthSummary)
-admin.site.register(models.SystemState)
\ No newline at end of file
+admin.site.register(models.MonthSummaryTask)
+admin.site.register(models.SystemState)
+admin.site.register(models.ExportJob)
+admin.site.register(models.TableVersion)
+admin.site.register(models.SummaryCubeCell)
+admin.site.register(models.SummaryCubeStaleMonth)
+admin.site.register(models.HolidayIndexEntry)
\ No newline at end of file
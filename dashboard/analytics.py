@@ -0,0 +1,124 @@
+"""
+Sector x position x month analytics over MonthSummary.
+
+SummaryCubeCell holds the MonthSummary figures summed per (month, sector, position).
+Database triggers mark a month stale whenever one of its summaries, or an employee's
+sector or position, changes; `refresh_stale_cells()` recomputes only those months,
+and `cube_slice()` answers any slice by summing cells - a few hundred rows at most,
+whatever the headcount.
+"""
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+from .models import Employee, MonthSummary, SummaryCubeCell, SummaryCubeStaleMonth
+
+DIMENSIONS = ['month', 'sector', 'position']
+MEASURES = ['employee_months', 'workdays', 'present_days', 'holidays_taken', 'tasks_assigned', 'tasks_completed']
+
+# Cell field(s) each dimension groups by, the first one being the id
+_GROUP_FIELDS = {
+    'month': ['period'],
+    'sector': ['sector_id', 'sector__sector'],
+    'position': ['position_id', 'position__position'],
+}
+
+
+def refresh_cells(periods):
+    """Recompute the cells of the given months (first-of-month dates) with one grouped query."""
+    employee = Employee.objects.filter(id=OuterRef('employee_id'))
+    groups = MonthSummary.objects.filter(period__in=periods).annotate(
+        cell_sector=Subquery(employee.values('sector_id')[:1]),
+        cell_position=Subquery(employee.values('position_id')[:1]),
+    ).values('period', 'cell_sector', 'cell_position').annotate(
+        employee_months=Count('id'),
+        workdays=Sum('total_workdays'),
+        present_days=Sum('total_present_days'),
+        holidays_taken=Sum('total_holidays_taken'),
+        tasks_assigned=Sum('total_task_assigned'),
+        tasks_completed=Sum('total_task_completed'),
+    ).order_by()
+    cells = [
+        SummaryCubeCell(
+            period=group['period'], sector_id=group['cell_sector'], position_id=group['cell_position'],
+            **{measure: group[measure] for measure in MEASURES},
+        )
+        for group in groups
+    ]
+    with transaction.atomic():
+        SummaryCubeCell.objects.filter(period__in=periods).delete()
+        SummaryCubeCell.objects.bulk_create(cells)
+    return len(cells)
+
+
+def refresh_stale_cells():
+    """Bring the months marked stale up to date; returns how many months were refreshed."""
+    # Usually nothing is stale: a plain read then, so the analytics views take no write lock
+    if not SummaryCubeStaleMonth.objects.exists():
+        return 0
+    with transaction.atomic():
+        periods = list(SummaryCubeStaleMonth.objects.values_list('period', flat=True))
+        if periods:
+            refresh_cells(periods)
+            SummaryCubeStaleMonth.objects.filter(period__in=periods).delete()
+    return len(periods)
+
+
+def refresh_cube(filters):
+    """
+    Make the cells of the filtered months current before reading them. The staleness
+    triggers only exist on SQLite; elsewhere the months read are recomputed each time.
+    """
+    if connection.vendor == 'sqlite':
+        return refresh_stale_cells()
+    periods = list(
+        MonthSummary.objects.between(filters['first'], filters['last']).values_list('period', flat=True).distinct()
+    )
+    refresh_cells(periods)
+    return len(periods)
+
+
+def parse_dimensions(values):
+    """["sector,month"] -> ['month', 'sector']: the known dimensions asked for, in DIMENSIONS order."""
+    asked = {part.strip() for value in values for part in value.split(',')}
+    return [dimension for dimension in DIMENSIONS if dimension in asked]
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def cube_slice(filters, by):
+    """
+    The cells in the filtered month range / sector / position (see
+    month_summary.summary_filters), summed per combination of the `by` dimensions -
+    a single total when `by` is empty - with the absence and rates derived.
+    """
+    cells = SummaryCubeCell.objects.filter(period__range=(filters['first'], filters['last']))
+    if filters['sector'] is not None:
+        cells = cells.filter(sector_id=filters['sector'])
+    if filters['position'] is not None:
+        cells = cells.filter(position_id=filters['position'])
+
+    totals = {f'sum_{measure}': Sum(measure) for measure in MEASURES}
+    group_fields = [field for dimension in by for field in _GROUP_FIELDS[dimension]]
+    if group_fields:
+        groups = cells.values(*group_fields).annotate(**totals).order_by(*group_fields)
+    else:
+        groups = [cells.aggregate(**totals)]
+
+    rows = []
+    for group in groups:
+        row = {}
+        if 'month' in by:
+            row['month'] = group['period'].strftime("%Y-%m")
+        for dimension in ('sector', 'position'):
+            if dimension in by:
+                row[f'{dimension}_id'] = group[f'{dimension}_id']
+                row[dimension] = group[f'{dimension}__{dimension}']
+        row.update({measure: group[f'sum_{measure}'] or 0 for measure in MEASURES})
+        row['absent_days'] = row['workdays'] - row['present_days']
+        row['attendance_rate'] = _rate(row['present_days'], row['workdays'])
+        row['absence_rate'] = _rate(row['absent_days'], row['workdays'])
+        row['completion_rate'] = _rate(row['tasks_completed'], row['tasks_assigned'])
+        rows.append(row)
+    return rows
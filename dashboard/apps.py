@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registers the MonthSummary refresh receivers)
+        from .triggers import drop_before_migrate, install_after_migrate
+
+        # The raw triggers are taken off while migrations rebuild tables (see triggers.py)
+        pre_migrate.connect(drop_before_migrate, sender=self)
+        post_migrate.connect(install_after_migrate, sender=self)
@@ -0,0 +1,261 @@
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .holiday_calendar import month_calendar
+from .models import Attendance, AttendanceArchive, AttendanceEvent, AttendanceTimeSettings, Employee, EmployeeHoliday, MonthSummary
+from .month_summary import ensure_month_summaries, refresh_month_timesheets
+from .presence import day_bit
+
+MAX_EVENTS_PER_BATCH = 5000
+ARCHIVE_CHUNK_SIZE = 2000
+
+
+def check_in(employee, day, time):
+    """
+    Record the employee's attendance for `day` and count it in their MonthSummary.
+
+    Safe under concurrent requests: the (employee, date) unique constraint lets only
+    one check-in per day through, and the present-day counter is incremented (and
+    the day's presence bit set) with F() expressions inside the same transaction,
+    which also refreshes the month's timesheet figures (a late arrival). Returns
+    the new Attendance, or None when the employee had already checked in.
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                attendance = Attendance.objects.create(employee=employee, date=day, time=time)
+        except IntegrityError:
+            return None
+
+        summary = MonthSummary.objects.for_month(day.year, day.month).filter(employee_id=employee.id)
+        present = {
+            'total_present_days': F('total_present_days') + 1,
+            'presence_bits': F('presence_bits').bitor(day_bit(day)),
+        }
+        if not summary.update(**present):
+            # First check-in of the month: create the record (holiday figures filled in), then count it
+            ensure_month_summaries(day.year, day.month, [employee.id])
+            summary.update(**present)
+        refresh_month_timesheets(day.year, day.month, [employee.id])
+
+    return attendance
+
+
+def check_out(employee, day, time):
+    """
+    Set the quit time of today's attendance once, and the month's timesheet figures
+    with it; returns False if there was nothing to update.
+    """
+    with transaction.atomic():
+        if not Attendance.objects.filter(employee=employee, date=day, quit_time__isnull=True).update(quit_time=time):
+            return False
+        refresh_month_timesheets(day.year, day.month, [employee.id])
+    return True
+
+
+def _parse_event(raw):
+    """Validate the shape of one incoming event; returns (event, error)."""
+    if not isinstance(raw, dict):
+        return None, "event must be an object"
+    kind = raw.get('kind')
+    if kind not in ('in', 'out'):
+        return None, "kind must be 'in' or 'out'"
+    try:
+        employee_id = int(raw.get('employee_id'))
+    except (TypeError, ValueError):
+        employee_id = 0
+    if employee_id <= 0:
+        return None, "invalid employee_id"
+    timestamp = parse_datetime(str(raw.get('timestamp') or ''))
+    if timestamp is None:
+        return None, "invalid timestamp"
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    local = timezone.localtime(timestamp)
+    return {
+        'employee_id': employee_id,
+        'kind': kind,
+        'timestamp': timestamp,
+        'date': local.date(),
+        'time': local.time().replace(microsecond=0),
+    }, None
+
+
+def ingest_events(raw_events):
+    """
+    Apply a batch of badge-reader events: [{event_id, employee_id, timestamp, kind}].
+
+    The batch is validated against AttendanceTimeSettings and the holiday calendar with
+    a fixed number of queries, then written with bulk_create / bulk_update, one
+    counter UPDATE per (month, increment, presence bits) and one timesheet refresh
+    per month touched. Each event_id is stored with its outcome, so a retried
+    event returns its original result without being applied twice.
+    Returns one {event_id, status, detail} dict per input event, in input order.
+    """
+    results = [None] * len(raw_events)
+    pending = {}  # event_id -> index of the first occurrence in this batch
+
+    for index, raw in enumerate(raw_events):
+        event_id = str(raw.get('event_id') or '').strip() if isinstance(raw, dict) else ''
+        if not event_id or len(event_id) > 64:
+            results[index] = {'event_id': event_id or None, 'status': 'rejected', 'detail': "missing or invalid event_id"}
+        elif event_id in pending:
+            results[index] = {'event_id': event_id, 'status': 'duplicate', 'detail': "repeated in batch"}
+        else:
+            pending[event_id] = index
+
+    with transaction.atomic():
+        # Events seen before: replay the stored outcome
+        for event_id, status, detail in AttendanceEvent.objects.filter(
+            event_id__in=list(pending)
+        ).values_list('event_id', 'status', 'detail'):
+            results[pending.pop(event_id)] = {'event_id': event_id, 'status': status, 'detail': detail}
+
+        events = []
+        for event_id, index in pending.items():
+            event, error = _parse_event(raw_events[index])
+            if error:
+                results[index] = {'event_id': event_id, 'status': 'rejected', 'detail': error}
+            else:
+                event.update(event_id=event_id, index=index)
+                events.append(event)
+
+        if events:
+            _apply_events(events, results)
+
+        # Malformed events are not stored: re-validating them on retry gives the same answer
+        AttendanceEvent.objects.bulk_create([
+            AttendanceEvent(
+                event_id=event['event_id'],
+                employee_id=event['employee_id'],
+                kind=event['kind'],
+                timestamp=event['timestamp'],
+                status=results[event['index']]['status'],
+                detail=results[event['index']]['detail'],
+            )
+            for event in events
+        ])
+
+    return results
+
+
+def _apply_events(events, results):
+    employee_ids = {event['employee_id'] for event in events}
+    days = {event['date'] for event in events}
+
+    known_employees = set(Employee.objects.filter(id__in=employee_ids).values_list('id', flat=True))
+    settings = AttendanceTimeSettings.objects.first()
+    calendars = {(day.year, day.month): None for day in days}
+    for year, month in calendars:
+        calendars[(year, month)] = month_calendar(year, month)
+    extra_holidays = set(
+        EmployeeHoliday.objects.filter(
+            employee_id__in=employee_ids, holiday_date__in=days
+        ).values_list('employee_id', 'holiday_date')
+    )
+    # (employee_id, date) -> existing or new Attendance
+    attendance = {
+        (row.employee_id, row.date): row
+        for row in Attendance.objects.filter(employee_id__in=employee_ids, date__in=days).only(
+            'id', 'employee_id', 'date', 'quit_time'
+        )
+    }
+
+    new_rows, quit_updates = [], []
+    for event in sorted(events, key=lambda e: e['timestamp']):
+        key = (event['employee_id'], event['date'])
+        row = attendance.get(key)
+        status, detail = 'recorded', ''
+
+        if event['employee_id'] not in known_employees:
+            status, detail = 'rejected', "unknown employee"
+        elif event['kind'] == 'in':
+            month_cal = calendars[(event['date'].year, event['date'].month)]
+            if settings and not (settings.start_time <= event['time'] <= settings.end_time):
+                status, detail = 'rejected', "outside the allowed attendance time"
+            elif month_cal.is_holiday(event['date']) or key in extra_holidays:
+                status, detail = 'rejected', "holiday"
+            elif row is not None:
+                status, detail = 'duplicate', "already checked in"
+            else:
+                row = Attendance(employee_id=event['employee_id'], date=event['date'], time=event['time'])
+                attendance[key] = row
+                new_rows.append(row)
+        else:
+            if row is None:
+                status, detail = 'rejected', "not checked in"
+            elif row.quit_time is not None:
+                status, detail = 'duplicate', "already checked out"
+            else:
+                row.quit_time = event['time']
+                if row.pk:
+                    quit_updates.append(row)
+
+        results[event['index']] = {'event_id': event['event_id'], 'status': status, 'detail': detail}
+
+    Attendance.objects.bulk_create(new_rows)
+    Attendance.objects.bulk_update(quit_updates, ['quit_time'])
+
+    # Present-day counters and presence bits: one UPDATE per month and per (increment, bits)
+    presence = defaultdict(Counter)
+    bits = defaultdict(Counter)
+    for row in new_rows:
+        presence[(row.date.year, row.date.month)][row.employee_id] += 1
+        bits[(row.date.year, row.date.month)][row.employee_id] |= day_bit(row.date)
+    for (year, month), counts in presence.items():
+        ensure_month_summaries(year, month, list(counts))
+        by_increment = defaultdict(list)
+        for employee_id, count in counts.items():
+            by_increment[count, bits[(year, month)][employee_id]].append(employee_id)
+        for (count, new_bits), ids in by_increment.items():
+            MonthSummary.objects.for_month(year, month).filter(employee_id__in=ids).update(
+                total_present_days=F('total_present_days') + count,
+                presence_bits=F('presence_bits').bitor(new_bits),
+            )
+
+    # Timesheet figures of every employee-month with a new check-in or quit time
+    changed = defaultdict(set)
+    for row in new_rows + quit_updates:
+        changed[(row.date.year, row.date.month)].add(row.employee_id)
+    for (year, month), ids in changed.items():
+        refresh_month_timesheets(year, month, list(ids))
+
+
+def archive_attendance(before, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Move every Attendance row dated before `before` into AttendanceArchive.
+
+    Works in chunks, each in its own short transaction, so SQLite's write lock is
+    never held for long and an interrupted run can simply be started again (rows
+    already copied are skipped by the archive's unique constraint). Returns the
+    number of rows moved. History stays readable through `timesheet.check_in_rows()`,
+    which reads both tables.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Attendance.objects.filter(date__lt=before)
+                .order_by('id')
+                .values('id', 'employee_id', 'date', 'time', 'quit_time')[:chunk_size]
+            )
+            if not rows:
+                return moved
+            AttendanceArchive.objects.bulk_create(
+                [
+                    AttendanceArchive(
+                        employee_id=row['employee_id'],
+                        date=row['date'],
+                        time=row['time'],
+                        quit_time=row['quit_time'],
+                    )
+                    for row in rows
+                ],
+                ignore_conflicts=True,
+            )
+            Attendance.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
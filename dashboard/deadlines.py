@@ -0,0 +1,116 @@
+"""
+Task deadlines in business days.
+
+Workdays come from the shared holiday calendar - the weekly DefaultHoliday and the
+MultiDefaultHoliday dates - as a NumPy busdaycalendar, so due dates for one task
+or thousands are a single vectorized np.busday_offset call.
+
+When the holidays change, open deadlines that now fall on a day off are either
+moved forward to the next workday or flagged for review. Either way it is one
+UPDATE for a whole sector, keyed on the affected deadline dates rather than on
+task ids. Every shared-holiday change flags them on its own (signals.py and
+holiday_index.add_occasional_holidays) - and clears the flags of deadlines that
+are workdays again - so the task board shows them; moving them is left to the
+board's reschedule action, as a deadline should not change behind an employee's
+back.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, DateField, F, Max, Value, When
+from django.utils import timezone
+from django.utils.timezone import localdate
+
+from .holiday_calendar import weekmask_for
+from .models import DefaultHoliday, MultiDefaultHoliday, Task
+
+
+def business_calendar():
+    """np.busdaycalendar of the shared holidays (two queries)."""
+    default_holiday = DefaultHoliday.objects.first()
+    occasional = MultiDefaultHoliday.objects.values_list('holiday_date', flat=True)
+    return np.busdaycalendar(
+        weekmask=weekmask_for(default_holiday.day if default_holiday else None),
+        holidays=np.array(list(occasional), dtype='datetime64[D]'),
+    )
+
+
+def add_business_days(starts, business_days, calendar=None):
+    """
+    Due dates `business_days` workdays after each of `starts` (dates or a datetime64[D]
+    array; `business_days` a number or a matching array). A start on a day off counts
+    from the next workday, and 0 business days rolls a date forward onto a workday.
+    Returns a datetime64[D] array.
+    """
+    calendar = calendar if calendar is not None else business_calendar()
+    starts = np.asarray(starts, dtype='datetime64[D]')
+    return np.busday_offset(starts, business_days, roll='forward', busdaycal=calendar)
+
+
+def due_date(start, business_days, calendar=None):
+    """The date `business_days` workdays after `start`."""
+    return add_business_days([start], business_days, calendar)[0].item()
+
+
+def next_workday(day, calendar=None):
+    """`day` itself when it is a workday, else the first workday after it."""
+    return due_date(day, 0, calendar)
+
+
+def _open_tasks(sector_id=None):
+    tasks = Task.objects.filter(is_completed=False, is_delivered=False)
+    return tasks if sector_id is None else tasks.filter(employee__sector_id=sector_id)
+
+
+def off_day_deadlines(today=None, sector_id=None, calendar=None):
+    """
+    {deadline: next workday} for the days off, from `today` on, on which open tasks of
+    the sector are due (every sector when `sector_id` is None).
+    """
+    today = today or localdate()
+    last = _open_tasks(sector_id).filter(end_date__gte=today).aggregate(last=Max('end_date'))['last']
+    if last is None:
+        return {}
+    calendar = calendar if calendar is not None else business_calendar()
+    days = np.arange(np.datetime64(today, 'D'), np.datetime64(last + timedelta(days=1), 'D'))
+    off_days = days[~np.is_busday(days, busdaycal=calendar)]
+    return dict(zip(off_days.tolist(), add_business_days(off_days, 0, calendar).tolist()))
+
+
+def reschedule_deadlines(sector_id=None, today=None, flag_only=False):
+    """
+    Deal with open deadlines (not completed or delivered, due `today` or later) that fall
+    on a day off after a holiday change, for one sector or all of them.
+
+    By default each moves to the next workday (extended dates with it) in a single
+    UPDATE. With `flag_only` the dates are left alone: the tasks get
+    `deadline_flagged_at`, and flags on deadlines back on a workday are cleared.
+    Returns the number of tasks moved or flagged.
+    """
+    today = today or localdate()
+    moves = off_day_deadlines(today, sector_id)
+    tasks = _open_tasks(sector_id)
+
+    with transaction.atomic():
+        if flag_only:
+            tasks.filter(deadline_flagged_at__isnull=False, end_date__gte=today).exclude(
+                end_date__in=list(moves)
+            ).update(deadline_flagged_at=None)
+            if not moves:
+                return 0
+            return tasks.filter(end_date__in=list(moves), deadline_flagged_at__isnull=True).update(
+                deadline_flagged_at=timezone.now()
+            )
+
+        if not moves:
+            return 0
+        new_end_date = Case(
+            *[When(end_date=day, then=Value(workday)) for day, workday in moves.items()],
+            output_field=DateField(),
+        )
+        return tasks.filter(end_date__in=list(moves)).update(
+            end_date=new_end_date,
+            extended_date=Case(When(extended_date=F('end_date'), then=new_end_date), default=F('extended_date')),
+            deadline_flagged_at=None,
+        )
@@ -0,0 +1,252 @@
+"""
+Background export jobs, with no broker: the queue is the ExportJob table and the
+artifacts are files under settings.EXPORT_ROOT.
+
+A request calls `enqueue_export()` and gets a job back straight away; the
+`run_export_worker` management command claims queued jobs and builds the files.
+Artifacts are named after a cache key made of the export kind, its scope (e.g. the
+month) and the change versions of the tables it reads, so asking again for an
+export of unchanged data returns the finished file without building anything.
+"""
+import hashlib
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.timezone import localdate
+
+from .exports import (
+    MONTH_SUMMARY_COLUMNS, MONTH_SUMMARY_TOTAL_COLUMNS, PAYROLL_COLUMNS, TASK_HISTORY_COLUMNS, month_summary_rows,
+    month_summary_total_rows, payroll_rows, task_history_rows, write_csv_rows, write_xlsx_rows,
+)
+from .models import ExportJob, TableVersion
+from .month_summary import employee_totals, filter_params, filtered_month_summaries, summary_filters
+from .reports import activity_summary, write_xlsx
+
+STALE_JOB_AFTER = timedelta(minutes=30)
+# Artifacts of any export not rebuilt for this long are removed, whatever their key
+ARTIFACT_MAX_AGE = timedelta(days=1)
+
+
+def _task_history(output, file_format, today, params):
+    header = [column for column, _ in TASK_HISTORY_COLUMNS]
+    if file_format == 'csv':
+        write_csv_rows(output, header, task_history_rows())
+    else:
+        write_xlsx_rows(output, "Task History", header, task_history_rows())
+
+
+def _month_summary(output, file_format, today, params):
+    filters = summary_filters(params, today)
+    summaries = filtered_month_summaries(filters)
+    if filters['group'] == 'employee':
+        columns, rows = MONTH_SUMMARY_TOTAL_COLUMNS, month_summary_total_rows(employee_totals(summaries))
+    else:
+        columns, rows = MONTH_SUMMARY_COLUMNS, month_summary_rows(summaries)
+    header = [column for column, _ in columns]
+    if file_format == 'csv':
+        write_csv_rows(output, header, rows)
+    else:
+        write_xlsx_rows(output, "Month Summary", header, rows)
+
+
+def _payroll(output, file_format, today, params):
+    rows = payroll_rows(filtered_month_summaries(summary_filters(params, today)))
+    header = [column for column, _ in PAYROLL_COLUMNS]
+    if file_format == 'csv':
+        write_csv_rows(output, header, rows)
+    else:
+        write_xlsx_rows(output, "Payroll", header, rows)
+
+
+def _activity_summary(output, file_format, today, params):
+    df = activity_summary(today)
+    if file_format == 'csv':
+        write_csv_rows(output, df.columns, df.values.tolist())
+    else:
+        write_xlsx(output, "All Employee Activity Summary", df)
+
+
+def _month_summary_scope(today, params):
+    params = filter_params(summary_filters(params, today))
+    return "_".join(f"{name}{value}" for name, value in sorted(params.items()))
+
+
+def _month_summary_file_name(today, params, prefix="month_summary"):
+    filters = summary_filters(params, today)
+    first, last = filters['first'].strftime('%B_%Y'), filters['last'].strftime('%B_%Y')
+    months = first if first == last else f"{first}-{last}"
+    return f"{prefix}_{months}_{today.strftime('%Y-%m-%d')}"
+
+
+# kind -> tables read, request parameters taken, scope of the data (part of the cache key), file name, builder
+EXPORT_KINDS = {
+    'task_history': {
+        'tables': ['dashboard_taskhistorykeeper'],
+        'params': (),
+        'scope': lambda today, params: "all",
+        'file_name': lambda today, params: "Task_History",
+        'build': _task_history,
+    },
+    'month_summary': {
+        'tables': ['dashboard_employee', 'dashboard_monthsummary', 'dashboard_monthsummarytask'],
+        'params': ('from', 'to', 'sector', 'position', 'group'),
+        'scope': _month_summary_scope,
+        'file_name': _month_summary_file_name,
+        'build': _month_summary,
+    },
+    'payroll': {
+        # Month summary rows with the timesheet figures, same filters (one row per employee and month)
+        'tables': ['dashboard_employee', 'dashboard_monthsummary'],
+        'params': ('from', 'to', 'sector', 'position'),
+        'scope': _month_summary_scope,
+        'file_name': lambda today, params: _month_summary_file_name(today, params, prefix="payroll"),
+        'build': _payroll,
+    },
+    'activity_summary': {
+        # Task status depends on the day ("Date Over"), so the scope is the date
+        'tables': [
+            'auth_user', 'dashboard_attendance', 'dashboard_defaultholiday', 'dashboard_employee',
+            'dashboard_employeeholiday', 'dashboard_multidefaultholiday', 'dashboard_task',
+        ],
+        'params': (),
+        'scope': lambda today, params: today.isoformat(),
+        'file_name': lambda today, params: "Employee_Attendance_Summary",
+        'build': _activity_summary,
+    },
+}
+
+
+def cache_key(kind, file_format, today, params=None):
+    """Identify an artifact by kind, format, scope and the versions of its source tables."""
+    spec = EXPORT_KINDS[kind]
+    if connection.vendor == 'sqlite':
+        versions = sorted(
+            TableVersion.objects.filter(table_name__in=spec['tables']).values_list('table_name', 'version')
+        )
+    else:
+        # No change counters off SQLite: a unique key, so every export is built fresh
+        versions = [time.time_ns()]
+    digest = hashlib.sha1(repr(versions).encode()).hexdigest()[:16]
+    return f"{kind}-{spec['scope'](today, params or {})}-{file_format}-{digest}"
+
+
+def artifact_path(file_name):
+    return os.path.join(settings.EXPORT_ROOT, file_name)
+
+
+def enqueue_export(kind, file_format='xlsx', user=None, params=None):
+    """
+    Return an ExportJob for the export: already done when a cached artifact matches
+    the current data, the pending job when the same export is already queued or
+    running, and a newly queued job otherwise. `params` are the export's filters,
+    limited to the names its EXPORT_KINDS entry takes.
+    """
+    today = localdate()
+    params = {name: value for name, value in (params or {}).items() if name in EXPORT_KINDS[kind]['params'] and value}
+    key = cache_key(kind, file_format, today, params)
+    file_name = f"{key}.{file_format}"
+    download_name = f"{EXPORT_KINDS[kind]['file_name'](today, params)}.{file_format}"
+
+    with transaction.atomic():
+        pending = ExportJob.objects.filter(cache_key=key, status__in=['queued', 'running']).first()
+        if pending:
+            return pending
+        if os.path.exists(artifact_path(file_name)):
+            now = timezone.now()
+            return ExportJob.objects.create(
+                kind=kind, file_format=file_format, cache_key=key, status='done', file_name=file_name,
+                download_name=download_name, params=params, requested_by=user, started_at=now, finished_at=now,
+            )
+        return ExportJob.objects.create(
+            kind=kind, file_format=file_format, cache_key=key, download_name=download_name, params=params,
+            requested_by=user,
+        )
+
+
+def claim_next_job():
+    """Mark the oldest queued job as running and return it; None when the queue is empty."""
+    with transaction.atomic():
+        job = ExportJob.objects.filter(status='queued').order_by('created_at', 'id').first()
+        if job is None:
+            return None
+        claimed = ExportJob.objects.filter(id=job.id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+    if not claimed:
+        return claim_next_job()
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    """Build the job's artifact (unless an identical one exists) and record the outcome."""
+    today = localdate()
+    try:
+        # The data may have changed since the job was queued: cache under what is read now
+        key = cache_key(job.kind, job.file_format, today, job.params)
+        file_name = f"{key}.{job.file_format}"
+        path = artifact_path(file_name)
+        if not os.path.exists(path):
+            os.makedirs(settings.EXPORT_ROOT, exist_ok=True)
+            partial = f"{path}.{job.id}.part"
+            try:
+                with open(partial, 'wb') as output:
+                    EXPORT_KINDS[job.kind]['build'](output, job.file_format, today, job.params)
+                os.replace(partial, path)  # Readers never see a half-written file
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+            prune_artifacts(key, keep=file_name)
+    except Exception as error:
+        ExportJob.objects.filter(id=job.id).update(status='failed', error=str(error), finished_at=timezone.now())
+        raise
+    ExportJob.objects.filter(id=job.id).update(
+        status='done', cache_key=key, file_name=file_name, finished_at=timezone.now()
+    )
+
+
+def prune_artifacts(key, keep):
+    """
+    Remove the artifacts of the same export (kind, scope, format) built from older
+    data, and those of every export older than ARTIFACT_MAX_AGE: scopes change too
+    (a new filter, the date of the activity summary), leaving files no key names again.
+    """
+    prefix = key.rsplit('-', 1)[0] + '-'
+    expired = time.time() - ARTIFACT_MAX_AGE.total_seconds()
+    for name in os.listdir(settings.EXPORT_ROOT):
+        if name.endswith('.part') or name == keep:
+            continue
+        path = artifact_path(name)
+        if name.startswith(prefix) or os.path.getmtime(path) < expired:
+            os.remove(path)
+
+
+def requeue_stale_jobs():
+    """Put back jobs left running by a worker that died."""
+    return ExportJob.objects.filter(
+        status='running', started_at__lt=timezone.now() - STALE_JOB_AFTER
+    ).update(status='queued', started_at=None)
+
+
+def run_worker(once=False, poll_interval=2.0, log=print):
+    """Process export jobs until the queue is empty (`once`) or forever."""
+    requeue_stale_jobs()
+    processed = 0
+    while True:
+        job = claim_next_job()
+        if job is None:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        started = time.perf_counter()
+        try:
+            run_job(job)
+            log(f"Export #{job.id} ({job.kind}, {job.file_format}) done in {time.perf_counter() - started:.1f}s")
+        except Exception as error:
+            log(f"Export #{job.id} ({job.kind}, {job.file_format}) failed: {error}")
+        processed += 1
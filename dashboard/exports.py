@@ -0,0 +1,188 @@
+import csv
+import io
+import tempfile
+from collections import defaultdict
+from itertools import islice
+
+import openpyxl
+from django.http import FileResponse, StreamingHttpResponse
+
+from .models import MonthSummaryTask, TaskHistoryKeeper
+
+EXPORT_CHUNK_SIZE = 2000
+TASK_LIST_CHUNK_SIZE = 500  # Summaries per task ledger lookup, keeps the IN (...) list under SQLite's variable limit
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# (column header, model field or attribute) of each export
+TASK_HISTORY_COLUMNS = [
+    ("Task ID", 'task_id'),
+    ("Title", 'task_title'),
+    ("Description", 'description'),
+    ("Assigned To", 'assigned_to'),
+    ("Start Date", 'start_date'),
+    ("End Date", 'end_date'),
+    ("Extended Date", 'extended_date'),
+    ("Revisions", 'revision_count'),
+    ("Rejections", 'rejected_count'),
+    ("Status", 'status'),
+    ("Action Taken", 'action_taken'),
+    ("Action Date", 'action_date'),
+]
+
+MONTH_SUMMARY_COLUMNS = [
+    ('Employee Name', 'employee_name'),
+    ('Employee ID', 'employee_id'),
+    ('Total Workdays', 'total_workdays'),
+    ('Total Present Days', 'total_present_days'),
+    ('Total Holidays Taken', 'total_holidays_taken'),
+    ('Total Occasional Holidays', 'total_occasional_holidays'),
+    ('Total Task Assigned', 'total_task_assigned'),
+    ('Assigned Tasks', 'assigned_task_list'),
+    ('Total Task Completed', 'total_task_completed'),
+    ('Completed Tasks', 'completed_task_list'),
+    ('Employee Status', 'employee_present_status'),
+    ('Month', 'month'),
+    ('Year', 'year'),
+]
+
+# Per-employee sums over a month range, see month_summary.employee_totals()
+MONTH_SUMMARY_TOTAL_COLUMNS = [
+    ('Employee Name', 'name'),
+    ('Employee ID', 'employee_id'),
+    ('Months', 'months'),
+    ('Total Workdays', 'workdays'),
+    ('Total Present Days', 'present_days'),
+    ('Total Absent Days', 'absent_days'),
+    ('Total Holidays Taken', 'holidays_taken'),
+    ('Total Occasional Holidays', 'occasional_holidays'),
+    ('Total Task Assigned', 'tasks_assigned'),
+    ('Total Task Completed', 'tasks_completed'),
+]
+
+# MonthSummary timesheet figures for payroll, hours from the stored minutes; see payroll_rows()
+PAYROLL_COLUMNS = [
+    ('Employee Name', 'employee_name'),
+    ('Employee ID', 'employee_id'),
+    ('Month', 'month'),
+    ('Year', 'year'),
+    ('Workdays', 'total_workdays'),
+    ('Present Days', 'total_present_days'),
+    ('Absent Days', 'total_absent_days'),
+    ('Holidays Taken', 'total_holidays_taken'),
+    ('Worked Hours', 'total_worked_minutes'),
+    ('Late Arrivals', 'total_late_arrivals'),
+    ('Late Minutes', 'total_late_minutes'),
+    ('Early Leaves', 'total_early_leaves'),
+    ('Early Leave Minutes', 'total_early_minutes'),
+    ('Overtime Hours', 'total_overtime_minutes'),
+]
+
+
+def _stream(queryset, columns):
+    """Rows of `queryset` as tuples, fetched EXPORT_CHUNK_SIZE at a time."""
+    return queryset.values_list(*[field for _, field in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def task_history_rows(queryset=None):
+    queryset = TaskHistoryKeeper.objects.all() if queryset is None else queryset
+    for (task_id, title, description, assigned_to, start_date, end_date, extended_date,
+         revisions, rejections, status, action_taken, action_date) in _stream(queryset.order_by('id'), TASK_HISTORY_COLUMNS):
+        yield (
+            task_id, title, description, assigned_to,
+            start_date.strftime("%Y-%m-%d"),
+            end_date.strftime("%Y-%m-%d"),
+            extended_date.strftime("%Y-%m-%d") if extended_date else "N/A",
+            revisions, rejections, status, action_taken,
+            action_date.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+
+
+# Columns filled from the MonthSummaryTask ledger -> entry kind
+TASK_LIST_COLUMNS = {'assigned_task_list': 'assigned', 'completed_task_list': 'completed'}
+
+
+def month_summary_rows(queryset):
+    """
+    Value tuples of the summaries plus one ledger query per TASK_LIST_CHUNK_SIZE of
+    them for the task lists; model instances with prefetch_related cost about ten
+    times as much per row.
+    """
+    fields = ['id'] + [field for _, field in MONTH_SUMMARY_COLUMNS if field not in TASK_LIST_COLUMNS]
+    summaries = queryset.order_by('period', 'employee_id').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    while chunk := list(islice(summaries, TASK_LIST_CHUNK_SIZE)):
+        task_lists = defaultdict(list)
+        entries = MonthSummaryTask.objects.filter(summary_id__in=[row[0] for row in chunk]).order_by('id')
+        for summary_id, kind, task_id, title in entries.values_list('summary_id', 'kind', 'task_id', 'task_title'):
+            task_lists[summary_id, kind].append(f"{task_id}: {title}")
+        for row in chunk:
+            values = dict(zip(fields, row))
+            yield tuple(
+                ", ".join(task_lists[row[0], TASK_LIST_COLUMNS[field]]) if field in TASK_LIST_COLUMNS else values[field]
+                for _, field in MONTH_SUMMARY_COLUMNS
+            )
+
+
+def month_summary_total_rows(totals):
+    """Rows of `employee_totals()`; the grouping happens in the database, rows stream as they come."""
+    return _stream(totals.order_by('employee_id'), MONTH_SUMMARY_TOTAL_COLUMNS)
+
+
+def payroll_rows(queryset):
+    fields = [field for _, field in PAYROLL_COLUMNS if field != 'total_absent_days']
+    summaries = queryset.order_by('period', 'employee_id').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for (name, employee_id, month, year, workdays, present, holidays, worked,
+         late_arrivals, late_minutes, early_leaves, early_minutes, overtime) in summaries:
+        yield (
+            name, employee_id, month, year, workdays, present, workdays - present, holidays,
+            round(worked / 60, 2), late_arrivals, late_minutes, early_leaves, early_minutes,
+            round(overtime / 60, 2),
+        )
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(filename, columns, rows):
+    """Stream rows as CSV; only the current chunk of rows is ever held in memory."""
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow([header for header, _ in columns])
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def write_csv_rows(output, header, rows):
+    """Write rows as UTF-8 CSV to a binary file."""
+    text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(list(header))
+    writer.writerows(rows)
+    text.flush()
+    text.detach()  # Leave `output` open for the caller
+
+
+def write_xlsx_rows(output, sheet_name, header, rows):
+    """Write rows to `output` with openpyxl's write-only workbook, which spools them to disk as they come."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(list(header))
+    for row in rows:
+        sheet.append(row)
+    workbook.save(output)
+
+
+def xlsx_response(filename, sheet_name, columns, rows):
+    """Build the XLSX in a temporary file and stream it back from disk."""
+    output = tempfile.TemporaryFile()
+    write_xlsx_rows(output, sheet_name, [header for header, _ in columns], rows)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
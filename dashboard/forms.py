@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm, PasswordChangeForm, UserChangeForm
 from django.contrib.auth.models import User
 from .models import Employee, AllowedEmail, DefaultHoliday, EmployeeHoliday, MessageBox, Task, AttendanceTimeSettings, Position, Sector
+from .holiday_calendar import expand_holiday_dates
 
 class PositionForm(forms.ModelForm):
     class Meta:
@@ -95,12 +96,25 @@ class DefaultHolidayForm(forms.ModelForm):
         model = DefaultHoliday
         fields = ['day']
 
+class HolidayDatesField(forms.CharField):
+    # "2026-12-01, 2026-12-20..2026-12-31" -> sorted list of dates, ranges expanded
+    widget = forms.TextInput(attrs={'class': 'multi-date-picker', 'placeholder': 'Select multiple dates'})
+
+    def clean(self, value):
+        try:
+            dates = expand_holiday_dates(super().clean(value))
+        except ValueError as error:
+            raise forms.ValidationError(str(error))
+        if not dates:
+            raise forms.ValidationError("Select at least one date.")
+        return dates
+
 class MultiDateHolidayForm(forms.Form):
     employee = forms.ModelChoiceField(queryset=Employee.objects.all(), label="Select Employee",empty_label="Select Employee")
-    holiday_dates = forms.CharField(widget=forms.TextInput(attrs={'class': 'multi-date-picker', 'placeholder': 'Select multiple dates'}), label="Holiday Dates")
+    holiday_dates = HolidayDatesField(label="Holiday Dates")
     
 class MultiDefaultHolidaysForm(forms.Form):
-    holiday_dates = forms.CharField(widget=forms.TextInput(attrs={'class': 'multi-date-picker', 'placeholder': 'Select multiple dates'}), label="Holiday Dates")
+    holiday_dates = HolidayDatesField(label="Holiday Dates")
         
 
 class MessageForm(forms.ModelForm):
@@ -129,6 +143,20 @@ class TaskForm(forms.ModelForm):
         return cleaned_data
     
 
+class BulkTaskForm(TaskForm):
+    # The same task for the picked employees, or everyone in the sector and / or position
+    employees = forms.ModelMultipleChoiceField(queryset=Employee.objects.select_related('user'), required=False,
+                                               widget=forms.SelectMultiple(attrs={'size': 8}))
+    sector = forms.ModelChoiceField(queryset=Sector.objects.all(), required=False, empty_label="Any sector")
+    position = forms.ModelChoiceField(queryset=Position.objects.all(), required=False, empty_label="Any position")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not (cleaned_data.get('employees') or cleaned_data.get('sector') or cleaned_data.get('position')):
+            raise forms.ValidationError("Pick employees, a sector or a position.")
+        return cleaned_data
+
+
 class AttendanceTimeForm(forms.ModelForm):
     class Meta:
         model = AttendanceTimeSettings
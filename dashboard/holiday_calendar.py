@@ -0,0 +1,174 @@
+from datetime import date
+
+import numpy as np
+
+from .models import DefaultHoliday, MultiDefaultHoliday
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MAX_HOLIDAY_RANGE_DAYS = 366
+
+
+def month_bounds(year, month):
+    """Return (first day of the month, first day of the next month)."""
+    first = date(year, month, 1)
+    if month == 12:
+        return first, date(year + 1, 1, 1)
+    return first, date(year, month + 1, 1)
+
+
+def weekmask_for(default_day):
+    """NumPy weekmask ("1111011") with the default holiday switched off."""
+    mask = ['1'] * 7
+    if default_day and default_day.lower() in WEEKDAYS:
+        mask[WEEKDAYS.index(default_day.lower())] = '0'
+    return ''.join(mask)
+
+
+def as_day_array(dates):
+    """Sorted, de-duplicated datetime64[D] array from any iterable of dates."""
+    return np.unique(np.array(list(dates), dtype='datetime64[D]'))
+
+
+def expand_holiday_dates(values):
+    """
+    Dates from submitted holiday inputs: each value a comma-separated list of "YYYY-MM-DD"
+    dates and "YYYY-MM-DD..YYYY-MM-DD" ranges (both ends included). Returns the sorted,
+    de-duplicated dates; raises ValueError on anything else.
+    """
+    days = []
+    for value in [values] if isinstance(values, str) else values:
+        for part in str(value).split(','):
+            part = part.strip()
+            if not part:
+                continue
+            start, _, end = part.partition('..')
+            try:
+                start = np.datetime64(date.fromisoformat(start.strip()), 'D')
+                end = np.datetime64(date.fromisoformat(end.strip()), 'D') if end else start
+            except ValueError:
+                raise ValueError(f"Invalid date or range: {part}")
+            if end < start or end - start >= MAX_HOLIDAY_RANGE_DAYS:
+                raise ValueError(f"Invalid date range: {part}")
+            days.append(np.arange(start, end + 1))
+    if not days:
+        return []
+    return as_day_array(np.concatenate(days)).tolist()
+
+
+def holiday_label(day):
+    """Display format used by the templates and the delete-holiday URLs: "2025-02-07 (Friday)"."""
+    if isinstance(day, np.datetime64):
+        day = day.item()
+    return f"{day} ({day.strftime('%A')})"
+
+
+class MonthCalendar:
+    """
+    Holidays and workdays of one month, shared by every employee.
+
+    Default (weekly) and occasional holidays are the same for everyone, so they are
+    resolved once; per-employee extra holidays are then counted for any number of
+    employees in one vectorized pass by `summarize()`.
+    """
+
+    def __init__(self, year, month, default_day=None, occasional_dates=()):
+        self.year = year
+        self.month = month
+        self.first_day, self.next_month = month_bounds(year, month)
+        self.total_days = (self.next_month - self.first_day).days
+        self.default_day = default_day
+        self.weekmask = weekmask_for(default_day)
+
+        begin = np.datetime64(self.first_day, 'D')
+        end = np.datetime64(self.next_month, 'D')
+        days = np.arange(begin, end, dtype='datetime64[D]')
+
+        occasional = as_day_array(occasional_dates)
+        self.occasional_holidays = occasional[(occasional >= begin) & (occasional < end)]
+        self.default_holidays = days[~np.is_busday(days, weekmask=self.weekmask)]
+        self.holidays = np.union1d(self.default_holidays, self.occasional_holidays)
+
+        # Per-day flag of the shared holidays, indexed by (day - 1)
+        self._holiday_mask = ~np.is_busday(days, weekmask=self.weekmask, holidays=self.occasional_holidays)
+        self.workdays = int(np.busday_count(begin, end, weekmask=self.weekmask, holidays=self.occasional_holidays))
+
+    @property
+    def holiday_mask(self):
+        """Boolean array of the shared holidays, index 0 being the 1st of the month."""
+        return self._holiday_mask
+
+    def is_holiday(self, day):
+        """True when `day` (a date in this month) is a default or occasional holiday."""
+        return bool(self._holiday_mask[(day - self.first_day).days])
+
+    def range_filter(self, field):
+        """Queryset lookups restricting a date field to this month, e.g. `**cal.range_filter('date')`."""
+        return {f'{field}__gte': self.first_day, f'{field}__lt': self.next_month}
+
+    def in_month(self, dates):
+        """Keep only the dates that fall in this month (as a sorted datetime64[D] array)."""
+        days = as_day_array(dates)
+        return days[(days >= np.datetime64(self.first_day, 'D')) & (days < np.datetime64(self.next_month, 'D'))]
+
+    def employee_summary(self, extra_dates):
+        """Holiday and workday figures for a single employee."""
+        extra = self.in_month(extra_dates)
+        all_holidays = np.union1d(self.holidays, extra)
+        return {
+            'default_holidays': [holiday_label(d) for d in self.default_holidays],
+            'occasional_holidays': [holiday_label(d) for d in self.occasional_holidays],
+            'extra_holidays': [holiday_label(d) for d in extra],
+            'default_holiday_count': len(self.default_holidays),
+            'occasional_holiday_count': len(self.occasional_holidays),
+            'extra_holiday_count': len(extra),
+            'total_holidays': len(all_holidays),
+            'workdays': self.total_days - len(all_holidays),
+        }
+
+    def summarize(self, employee_ids, holiday_pairs=()):
+        """
+        Vectorized holiday counts for many employees at once.
+
+        `holiday_pairs` is an iterable of (employee_id, holiday_date), e.g. straight from
+        `EmployeeHoliday.objects.values_list('employee_id', 'holiday_date')`. Returns a dict of
+        NumPy arrays aligned with `employee_ids`: extra_holidays, total_holidays and workdays.
+        """
+        employee_ids = np.asarray(list(employee_ids), dtype=np.int64)
+        extra = np.zeros(len(employee_ids), dtype=np.int64)
+        overlap = np.zeros(len(employee_ids), dtype=np.int64)
+
+        pairs = list(holiday_pairs)
+        if pairs and len(employee_ids):
+            pair_employees = np.fromiter((p[0] for p in pairs), dtype=np.int64, count=len(pairs))
+            pair_days = np.array([p[1] for p in pairs], dtype='datetime64[D]')
+            offsets = (pair_days - np.datetime64(self.first_day, 'D')).astype(np.int64)
+
+            order = np.argsort(employee_ids)
+            slot = np.searchsorted(employee_ids, pair_employees, sorter=order)
+            slot = np.clip(slot, 0, len(employee_ids) - 1)
+            known = employee_ids[order[slot]] == pair_employees
+            keep = known & (offsets >= 0) & (offsets < self.total_days)
+
+            # One entry per distinct (employee, day) in the month
+            keys = np.unique(order[slot[keep]] * self.total_days + offsets[keep])
+            rows, days = np.divmod(keys, self.total_days)
+            extra = np.bincount(rows, minlength=len(employee_ids))
+            overlap = np.bincount(rows, weights=self._holiday_mask[days], minlength=len(employee_ids)).astype(np.int64)
+
+        total_holidays = len(self.holidays) + extra - overlap
+        return {
+            'extra_holidays': extra,
+            'total_holidays': total_holidays,
+            'workdays': self.total_days - total_holidays,
+        }
+
+
+def month_calendar(year, month):
+    """Build the `MonthCalendar` for a month from the holiday tables (two queries)."""
+    default_holiday = DefaultHoliday.objects.first()
+    first_day, next_month = month_bounds(year, month)
+    occasional = MultiDefaultHoliday.objects.filter(
+        holiday_date__gte=first_day, holiday_date__lt=next_month
+    ).values_list('holiday_date', flat=True)
+    return MonthCalendar(year, month, default_holiday.day if default_holiday else None, occasional)
+
@@ -0,0 +1,127 @@
+"""
+Who is off on which day.
+
+HolidayIndexEntry is a date -> employees index of individual leave: one row per
+employee and leave day, with the employee's sector copied in, so a sector's leave
+over any date range is a single index range scan with no join. On SQLite the
+triggers of triggers.py mirror every EmployeeHoliday insert, update and delete into
+it and follow employees moving sector; elsewhere the leave is read from
+EmployeeHoliday directly.
+
+Shared holidays (the weekly DefaultHoliday and the MultiDefaultHoliday dates) apply
+to everyone, so they are resolved from the holiday calendar rather than indexed
+per employee.
+
+Leave and occasional holidays are written here too, one bulk INSERT per submission:
+the unique constraints turn repeated dates into no-ops.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .deadlines import reschedule_deadlines
+from .holiday_calendar import weekmask_for
+from .models import DefaultHoliday, Employee, EmployeeHoliday, HolidayIndexEntry, MultiDefaultHoliday
+from .month_summary import refresh_month_summaries
+
+MAX_FORECAST_WEEKS = 26
+
+
+def _leave(start, end, sector_id=None):
+    """Leave rows in [start, end) of the sector's employees (all employees when sector_id is None)."""
+    if connection.vendor == 'sqlite':
+        entries = HolidayIndexEntry.objects.filter(holiday_date__gte=start, holiday_date__lt=end)
+        return entries if sector_id is None else entries.filter(sector_id=sector_id)
+    holidays = EmployeeHoliday.objects.filter(holiday_date__gte=start, holiday_date__lt=end)
+    return holidays if sector_id is None else holidays.filter(employee__sector_id=sector_id)
+
+
+def leave_counts(start, end, sector_id=None):
+    """{date: employees on leave} for the days in [start, end) with any leave: one grouped query."""
+    rows = _leave(start, end, sector_id).order_by().values('holiday_date').annotate(
+        off=Count('employee_id')
+    )
+    return {row['holiday_date']: row['off'] for row in rows}
+
+
+def _months(dates):
+    return sorted({(day.year, day.month) for day in dates})
+
+
+def add_employee_holidays(employee_ids, dates):
+    """
+    Give every employee in `employee_ids` leave on every date in `dates`: one INSERT,
+    dates they already have skipped by the unique constraint. bulk_create sends no
+    signals, so the summaries of the months touched are refreshed here.
+    """
+    employee_ids = list(employee_ids)
+    with transaction.atomic():
+        EmployeeHoliday.objects.bulk_create(
+            [EmployeeHoliday(employee_id=employee_id, holiday_date=day) for employee_id in employee_ids for day in dates],
+            ignore_conflicts=True,
+        )
+        for year, month in _months(dates):
+            refresh_month_summaries(year, month, employee_ids)
+
+
+def add_occasional_holidays(dates):
+    """
+    Add shared holidays on `dates` in one INSERT, skipping those already set, then refresh
+    their months and flag the open deadlines that now fall on a day off.
+    """
+    with transaction.atomic():
+        MultiDefaultHoliday.objects.bulk_create(
+            [MultiDefaultHoliday(holiday_date=day) for day in dates], ignore_conflicts=True
+        )
+        for year, month in _months(dates):
+            refresh_month_summaries(year, month)
+        reschedule_deadlines(flag_only=True)
+
+
+def shared_holiday_mask(start, end):
+    """Boolean array over the days of [start, end): True on default and occasional holidays."""
+    default_holiday = DefaultHoliday.objects.first()
+    occasional = MultiDefaultHoliday.objects.filter(
+        holiday_date__gte=start, holiday_date__lt=end
+    ).values_list('holiday_date', flat=True)
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D'))
+    return ~np.is_busday(
+        days,
+        weekmask=weekmask_for(default_holiday.day if default_holiday else None),
+        holidays=np.array(list(occasional), dtype='datetime64[D]'),
+    )
+
+
+def employees_off(day, sector_id=None):
+    """Ids of the employees off on `day`: everyone on a shared holiday, else those on leave."""
+    if shared_holiday_mask(day, day + timedelta(days=1))[0]:
+        employees = Employee.objects.all() if sector_id is None else Employee.objects.filter(sector_id=sector_id)
+        return sorted(employees.values_list('id', flat=True))
+    return sorted(set(_leave(day, day + timedelta(days=1), sector_id).values_list('employee_id', flat=True)))
+
+
+def coverage_forecast(start, weeks, sector_id=None):
+    """
+    Per day from `start` for `weeks` weeks: the sector's headcount, how many are off
+    and how many are left to work - nobody on a shared holiday. Four queries
+    whatever the range or headcount.
+    """
+    end = start + timedelta(weeks=weeks)
+    employees = Employee.objects.all() if sector_id is None else Employee.objects.filter(sector_id=sector_id)
+    headcount = employees.count()
+    off = leave_counts(start, end, sector_id)
+    shared = shared_holiday_mask(start, end)
+
+    days = []
+    for offset, holiday in enumerate(shared.tolist()):
+        day = start + timedelta(days=offset)
+        on_leave = headcount if holiday else min(off.get(day, 0), headcount)
+        days.append({
+            'date': day.isoformat(),
+            'holiday': holiday,
+            'off': on_leave,
+            'available': headcount - on_leave,
+        })
+    return {'headcount': headcount, 'days': days}
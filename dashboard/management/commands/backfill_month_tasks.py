@@ -0,0 +1,61 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from dashboard.models import MonthSummary, MonthSummaryTask
+
+# Entries are "id: title" joined by ", "; only split where the next entry starts, so titles may contain commas
+ENTRY_SEPARATOR = re.compile(r',\s*(?=\d+:\s)')
+ENTRY = re.compile(r'^(\d+):\s*(.*)$', re.DOTALL)
+
+
+def parse_task_list(text):
+    """"12: Fix login, 15: Report, part 2" -> [(12, "Fix login"), (15, "Report, part 2")]; unparsable bits are skipped."""
+    entries = []
+    for part in ENTRY_SEPARATOR.split(text or ''):
+        match = ENTRY.match(part.strip())
+        if match:
+            entries.append((int(match.group(1)), match.group(2).strip()[:255]))
+    return entries
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the legacy comma-joined task lists of MonthSummary into the MonthSummaryTask ledger. "
+        "Safe to run again: tasks already in the ledger are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Summaries per transaction (default: %(default)s)")
+
+    def handle(self, *args, **options):
+        summaries = MonthSummary.objects.filter(
+            ~Q(assigned_task_ids_with_title__isnull=True) & ~Q(assigned_task_ids_with_title='')
+            | ~Q(completed_task_ids_with_title__isnull=True) & ~Q(completed_task_ids_with_title='')
+        ).order_by('id').values_list('id', 'assigned_task_ids_with_title', 'completed_task_ids_with_title')
+
+        existing = MonthSummaryTask.objects.count()
+        batch, scanned, entries = [], 0, 0
+        for summary_id, assigned, completed in summaries.iterator(chunk_size=options['batch_size']):
+            scanned += 1
+            for kind, text in (('assigned', assigned), ('completed', completed)):
+                for task_id, title in parse_task_list(text):
+                    batch.append(MonthSummaryTask(summary_id=summary_id, kind=kind, task_id=task_id, task_title=title))
+            if len(batch) >= options['batch_size']:
+                entries += self._write(batch)
+                batch = []
+        entries += self._write(batch)
+
+        added = MonthSummaryTask.objects.count() - existing
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {scanned} month summaries: {entries} task entries, {added} new in the ledger."
+        ))
+
+    def _write(self, batch):
+        if batch:
+            with transaction.atomic():
+                # Already backfilled (or recorded since) entries hit the unique constraint and are skipped
+                MonthSummaryTask.objects.bulk_create(batch, ignore_conflicts=True)
+        return len(batch)
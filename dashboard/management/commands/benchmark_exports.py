@@ -0,0 +1,92 @@
+import resource
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.exports import (
+    MONTH_SUMMARY_COLUMNS, TASK_HISTORY_COLUMNS, csv_response, month_summary_rows, task_history_rows, xlsx_response,
+)
+from dashboard.models import MonthSummary, MonthSummaryTask, TaskHistoryKeeper
+from dashboard.month_summary import month_fields
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure peak memory of the task history / month summary exports at growing row counts. "
+        "Sample rows are created inside a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default="5000,20000,80000",
+                            help="Comma separated row counts to measure, ascending (default: %(default)s)")
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['rows'].split(','))
+        self.stdout.write(f"{'export':<22}{'rows':>9}{'seconds':>10}{'py peak MiB':>13}{'max RSS MiB':>13}")
+        try:
+            with transaction.atomic():
+                created = 0
+                for size in sizes:
+                    self._seed(created, size)
+                    created = size
+                    self._measure("task history csv", size, lambda: csv_response(
+                        "x.csv", TASK_HISTORY_COLUMNS, task_history_rows()))
+                    self._measure("task history xlsx", size, lambda: xlsx_response(
+                        "x.xlsx", "Task History", TASK_HISTORY_COLUMNS, task_history_rows()))
+                    self._measure("month summary csv", size, lambda: csv_response(
+                        "x.csv", MONTH_SUMMARY_COLUMNS, month_summary_rows(MonthSummary.objects.for_month(1900, 1))))
+                    self._measure("month summary xlsx", size, lambda: xlsx_response(
+                        "x.xlsx", "Month Summary", MONTH_SUMMARY_COLUMNS,
+                        month_summary_rows(MonthSummary.objects.for_month(1900, 1))))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, start, stop):
+        today = date.today()
+        now = timezone.now()
+        for offset in range(start, stop, 5000):
+            ids = range(offset, min(offset + 5000, stop))
+            TaskHistoryKeeper.objects.bulk_create([
+                TaskHistoryKeeper(
+                    task_id=i, task_title=f"Benchmark task {i}", description="lorem ipsum " * 10,
+                    assigned_to=f"user{i % 500}", start_date=today, end_date=today + timedelta(days=7),
+                    status="Completed", action_taken="Approved", action_date=now,
+                )
+                for i in ids
+            ])
+            summaries = MonthSummary.objects.bulk_create([
+                MonthSummary(
+                    **month_fields(1900, 1), employee_id=i, employee_name=f"user{i}",
+                    total_workdays=26, total_present_days=20, total_holidays_taken=1, total_occasional_holidays=0,
+                    total_task_assigned=2, total_task_completed=1,
+                )
+                for i in ids
+            ])
+            MonthSummaryTask.objects.bulk_create([
+                MonthSummaryTask(summary=summary, kind=kind, task_id=task_id, task_title=f"Benchmark task {task_id}")
+                for summary in summaries
+                for kind, task_id in (('assigned', 1), ('assigned', 2), ('completed', 1))
+            ])
+
+    def _measure(self, label, size, build):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = build()
+        for _ in response.streaming_content:
+            pass
+        # Not response.close(): that fires request_finished, which closes the DB connection mid-transaction
+        del response
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(f"{label:<22}{size:>9}{elapsed:>10.2f}{peak / 2**20:>13.1f}{max_rss:>13.1f}")
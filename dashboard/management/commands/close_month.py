@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.month_summary import close_month, month_name
+
+
+class Command(BaseCommand):
+    help = "Recompute every employee's MonthSummary for a month from attendance, holidays and tasks. Safe to rerun."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True)
+        parser.add_argument('--month', type=int, required=True, help="1-12")
+
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        if not 1 <= month <= 12:
+            raise CommandError("--month must be between 1 and 12.")
+
+        started = time.perf_counter()
+        result = close_month(year, month)
+        self.stdout.write(self.style.SUCCESS(
+            f"{month_name(month)} {year}: {result['created']} summaries created, {result['updated']} updated "
+            f"in {time.perf_counter() - started:.1f}s."
+        ))
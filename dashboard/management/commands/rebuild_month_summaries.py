@@ -0,0 +1,58 @@
+import os
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.month_rebuild import history_months, month_range, rebuild_month_summaries
+from dashboard.month_summary import month_name
+
+
+def year_month(value):
+    try:
+        parsed = datetime.strptime(value, "%Y-%m")
+    except ValueError:
+        raise CommandError(f"Expected a month as YYYY-MM, got {value!r}.")
+    return parsed.year, parsed.month
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild MonthSummary for every month since the first employee joined (or a --since/--until range), "
+        "several months at a time in worker processes, then check the result. Safe to rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=year_month, help="First month, YYYY-MM (default: the first month with data)")
+        parser.add_argument('--until', type=year_month, help="Last month, YYYY-MM (default: this month)")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help="Worker processes (default: one per CPU, %(default)s here); 1 runs in this process",
+        )
+
+    def handle(self, *args, **options):
+        months = history_months()
+        first = options['since'] or months[0]
+        last = options['until'] or months[-1]
+        months = list(month_range(first, last))
+        if not months:
+            raise CommandError("--since is after --until.")
+        if options['workers'] < 1:
+            raise CommandError("--workers must be at least 1.")
+
+        self.stdout.write(
+            f"Rebuilding {len(months)} months ({month_name(first[1])} {first[0]} - {month_name(last[1])} {last[0]}) "
+            f"with {options['workers']} workers"
+        )
+        started = time.perf_counter()
+        result = rebuild_month_summaries(months, workers=options['workers'], log=self.stdout.write)
+        self.stdout.write(
+            f"{result['created']} summaries created, {result['updated']} updated in {time.perf_counter() - started:.1f}s."
+        )
+
+        if result['problems']:
+            for (year, month), counts in result['problems'].items():
+                details = ", ".join(f"{count} {name}" for name, count in counts.items())
+                self.stderr.write(f"{month_name(month)} {year}: {details}")
+            raise CommandError(f"Consistency check failed for {len(result['problems'])} months.")
+        self.stdout.write(self.style.SUCCESS("Consistency check passed."))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.analytics import refresh_cells, refresh_stale_cells
+from dashboard.models import MonthSummary, SummaryCubeStaleMonth
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the analytics cube for the months marked stale, or for every month with --full "
+        "(when the cells were edited by hand or the stale list was emptied)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild every month, not only the stale ones")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['full']:
+            periods = list(MonthSummary.objects.values_list('period', flat=True).distinct())
+            cells = refresh_cells(periods)
+            SummaryCubeStaleMonth.objects.filter(period__in=periods).delete()
+            summary = f"Rebuilt {len(periods)} months ({cells} cells)"
+        else:
+            summary = f"Refreshed {refresh_stale_cells()} stale months"
+        self.stdout.write(self.style.SUCCESS(f"{summary} in {time.perf_counter() - started:.1f}s."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.export_jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Build queued export jobs. Runs until stopped, or until the queue is empty with --once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait between checks of an empty queue (default: %(default)s)")
+
+    def handle(self, *args, **options):
+        processed = run_worker(once=options['once'], poll_interval=options['poll_interval'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} export job(s)."))
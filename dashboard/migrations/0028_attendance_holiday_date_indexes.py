@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0027_monthsummary_joining_date_monthsummary_leaving_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['employee', 'date'], name='dashboard_a_employe_dd7d16_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeholiday',
+            index=models.Index(fields=['employee', 'holiday_date'], name='dashboard_e_employe_6493df_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multidefaultholiday',
+            index=models.Index(fields=['holiday_date'], name='dashboard_m_holiday_cc600c_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:04
+
+import datetime
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    # Keep the first check-in of each (employee, date) before adding the unique constraint
+    Attendance = apps.get_model('dashboard', 'Attendance')
+    duplicates = (
+        Attendance.objects.values('employee_id', 'date')
+        .annotate(rows=Count('id'), first_id=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        Attendance.objects.filter(
+            employee_id=duplicate['employee_id'], date=duplicate['date']
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0028_attendance_holiday_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='attendance',
+            name='dashboard_a_employe_dd7d16_idx',
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_attendance_per_day'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0029_unique_attendance_per_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=64, unique=True)),
+                ('employee_id', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('in', 'In'), ('out', 'Out')], max_length=3)),
+                ('timestamp', models.DateTimeField()),
+                ('status', models.CharField(choices=[('recorded', 'Recorded'), ('duplicate', 'Duplicate'), ('rejected', 'Rejected')], max_length=10)),
+                ('detail', models.CharField(blank=True, max_length=100)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0030_attendanceevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_id', models.PositiveIntegerField()),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('quit_time', models.TimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='dashboard_a_date_334ced_idx')],
+                'constraints': [models.UniqueConstraint(fields=('employee_id', 'date'), name='unique_archived_attendance_per_day')],
+            },
+        ),
+    ]
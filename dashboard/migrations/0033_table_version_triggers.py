@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# Tables read by the exports; auth_user only matters for the username shown in the reports
+SOURCE_TABLES = [
+    'dashboard_attendance',
+    'dashboard_defaultholiday',
+    'dashboard_employee',
+    'dashboard_employeeholiday',
+    'dashboard_monthsummary',
+    'dashboard_multidefaultholiday',
+    'dashboard_task',
+    'dashboard_taskhistorykeeper',
+    'auth_user',
+]
+
+
+def create_versions(apps, schema_editor):
+    # One counter row per table; the triggers that bump them are installed after every
+    # migrate run from dashboard/triggers.py
+    TableVersion = apps.get_model('dashboard', 'TableVersion')
+    TableVersion.objects.bulk_create(
+        [TableVersion(table_name=table) for table in SOURCE_TABLES], ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0032_exportjob_tableversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TABLE = 'dashboard_monthsummarytask'
+
+
+def create_version(apps, schema_editor):
+    # Same change counter as the other export source tables (0033)
+    apps.get_model('dashboard', 'TableVersion').objects.get_or_create(table_name=TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0033_table_version_triggers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthSummaryTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('assigned', 'Assigned'), ('completed', 'Completed')], max_length=10)),
+                ('task_id', models.IntegerField()),
+                ('task_title', models.CharField(max_length=255)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('summary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_entries', to='dashboard.monthsummary')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task_id'], name='dashboard_m_task_id_699078_idx')],
+                'constraints': [models.UniqueConstraint(fields=('summary', 'kind', 'task_id'), name='unique_month_summary_task')],
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:35
+
+from datetime import date, datetime
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+LEGACY_TASK_LISTS = ['assigned_task_ids_with_title', 'completed_task_ids_with_title']
+
+
+def fill_periods(apps, schema_editor):
+    MonthSummary = apps.get_model('dashboard', 'MonthSummary')
+    MonthSummaryTask = apps.get_model('dashboard', 'MonthSummaryTask')
+
+    # One UPDATE per month; MonthSummary.month holds names like "January"
+    for month, year in MonthSummary.objects.values_list('month', 'year').distinct():
+        try:
+            number = datetime.strptime(month.strip(), "%B").month
+        except ValueError:
+            raise RuntimeError(f"MonthSummary rows with month={month!r} (year {year}) are not a month name; fix them first.")
+        MonthSummary.objects.filter(month=month, year=year).update(period=date(year, number, 1))
+
+    # The same employee and month recorded twice: keep the oldest row, move the other
+    # rows' ledger entries onto it (skipping tasks it already has) and append their
+    # legacy task lists to its own, so `manage.py backfill_month_tasks` still finds
+    # every task, then drop the rest. Their counters are recomputed by
+    # `manage.py close_month` / `rebuild_month_summaries`.
+    duplicates = (
+        MonthSummary.objects.values('employee_id', 'period')
+        .annotate(rows=Count('id'), keep=Min('id')).filter(rows__gt=1)
+    )
+    for group in duplicates:
+        extra = MonthSummary.objects.filter(
+            employee_id=group['employee_id'], period=group['period']
+        ).exclude(id=group['keep'])
+        kept = set(MonthSummaryTask.objects.filter(summary_id=group['keep']).values_list('kind', 'task_id'))
+        for entry in MonthSummaryTask.objects.filter(summary__in=extra).order_by('id'):
+            if (entry.kind, entry.task_id) not in kept:
+                kept.add((entry.kind, entry.task_id))
+                MonthSummaryTask.objects.filter(id=entry.id).update(summary_id=group['keep'])
+        lists = MonthSummary.objects.filter(
+            employee_id=group['employee_id'], period=group['period']
+        ).order_by('id').values_list(*LEGACY_TASK_LISTS)
+        merged = [", ".join(filter(None, texts)) for texts in zip(*lists)]
+        MonthSummary.objects.filter(id=group['keep']).update(**dict(zip(LEGACY_TASK_LISTS, merged)))
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0034_monthsummarytask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthsummary',
+            name='period',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_periods, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='monthsummary',
+            name='period',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='monthsummary',
+            index=models.Index(fields=['period'], name='dashboard_m_period_770f3b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthsummary',
+            constraint=models.UniqueConstraint(fields=('employee_id', 'period'), name='unique_month_summary_period'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0035_monthsummary_period'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='monthsummary',
+            name='dashboard_m_period_770f3b_idx',
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='params',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='monthsummary',
+            index=models.Index(fields=['period', 'employee_id'], name='dashboard_m_period_886a5f_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+STALE = 'dashboard_summarycubestalemonth'
+
+
+def mark_months_stale(apps, schema_editor):
+    # Every month with summaries starts stale, so the first read builds the cube. The
+    # triggers that keep marking them are installed after the migrate run (triggers.py)
+    schema_editor.execute(f"INSERT INTO {STALE} (period) SELECT DISTINCT period FROM dashboard_monthsummary")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0036_month_summary_filters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryCubeStaleMonth',
+            fields=[
+                ('period', models.DateField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SummaryCubeCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('employee_months', models.PositiveIntegerField(default=0)),
+                ('workdays', models.PositiveIntegerField(default=0)),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('holidays_taken', models.PositiveIntegerField(default=0)),
+                ('tasks_assigned', models.PositiveIntegerField(default=0)),
+                ('tasks_completed', models.PositiveIntegerField(default=0)),
+                ('position', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='dashboard.position')),
+                ('sector', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='dashboard.sector')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period'], name='dashboard_s_period_4fc4fc_idx')],
+            },
+        ),
+        migrations.RunPython(mark_months_stale, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0037_summary_cube'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthsummary',
+            name='total_early_leaves',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthsummary',
+            name='total_early_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthsummary',
+            name='total_late_arrivals',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthsummary',
+            name='total_late_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthsummary',
+            name='total_overtime_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthsummary',
+            name='total_worked_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0038_month_summary_timesheet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthsummary',
+            name='presence_bits',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
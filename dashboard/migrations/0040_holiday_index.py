@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:01
+
+from django.db import migrations, models
+
+def fill_index(apps, schema_editor):
+    # Index the leave recorded so far (other databases read EmployeeHoliday directly)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "INSERT OR IGNORE INTO dashboard_holidayindexentry (holiday_date, employee_id, sector_id) "
+        "SELECT holiday.holiday_date, holiday.employee_id, employee.sector_id FROM dashboard_employeeholiday holiday "
+        "JOIN dashboard_employee employee ON employee.id = holiday.employee_id"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0039_month_summary_presence_bits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HolidayIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('holiday_date', models.DateField()),
+                ('employee_id', models.PositiveIntegerField()),
+                ('sector_id', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sector_id', 'holiday_date'], name='dashboard_h_sector__b7b06b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('holiday_date', 'employee_id'), name='unique_holiday_index_entry')],
+            },
+        ),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
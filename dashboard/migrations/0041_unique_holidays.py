@@ -0,0 +1,41 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+DUPLICATE_KEYS = {
+    'dashboard_employeeholiday': 'employee_id, holiday_date',
+    'dashboard_multidefaultholiday': 'holiday_date',
+}
+
+
+def remove_duplicates(apps, schema_editor):
+    # Keep the first row of every repeated submission; the holiday index is resynced after the migrate run
+    for table, key in DUPLICATE_KEYS.items():
+        schema_editor.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {key})")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0040_holiday_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='employeeholiday',
+            name='dashboard_e_employe_6493df_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='multidefaultholiday',
+            name='dashboard_m_holiday_cc600c_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='employeeholiday',
+            constraint=models.UniqueConstraint(fields=('employee', 'holiday_date'), name='unique_employee_holiday'),
+        ),
+        migrations.AddConstraint(
+            model_name='multidefaultholiday',
+            constraint=models.UniqueConstraint(fields=('holiday_date',), name='unique_occasional_holiday'),
+        ),
+    ]
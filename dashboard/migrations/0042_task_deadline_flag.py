@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0041_unique_holidays'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='deadline_flagged_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0042_task_deadline_flag'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskhistorykeeper',
+            name='action_taken',
+            field=models.CharField(choices=[('Approved', 'Approved'), ('Rejected', 'Rejected'), ('Extended', 'Extended'), ('Deleted', 'Deleted')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0043_task_history_actions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['end_date', 'id'], name='dashboard_t_end_dat_0aba79_idx'),
+        ),
+    ]
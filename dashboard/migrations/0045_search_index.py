@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# FTS5 table -> (content table, indexed columns, bm25 column weights). External content
+# tables: the text stays in the source table, the index holds only the terms
+SEARCH_TABLES = {
+    'dashboard_task_search': ('dashboard_task', ['title', 'description'], [10.0, 1.0]),
+    'dashboard_taskhistorykeeper_search': (
+        'dashboard_taskhistorykeeper', ['task_title', 'description', 'assigned_to'], [10.0, 1.0, 5.0],
+    ),
+    'dashboard_messagebox_search': ('dashboard_messagebox', ['message'], [1.0]),
+}
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is a SQLite extension: on other databases search.py falls back to LIKE scans
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for fts, (table, columns, weights) in SEARCH_TABLES.items():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({', '.join(columns)}, "
+            f"content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        # ORDER BY rank uses the weighted bm25 without naming it in every query
+        schema_editor.execute(
+            f"INSERT INTO {fts} ({fts}, rank) VALUES ('rank', 'bm25({', '.join(map(str, weights))})')"
+        )
+        schema_editor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for fts in SEARCH_TABLES:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0044_task_board_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0045_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='kind',
+            field=models.CharField(choices=[('task_history', 'Task History'), ('month_summary', 'Month Summary'), ('activity_summary', 'Activity Summary'), ('payroll', 'Payroll')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:34
+
+import dashboard.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0046_export_job_payroll_kind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='monthsummary',
+            name='month',
+            field=models.CharField(default=dashboard.models.current_month_name, max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='monthsummary',
+            name='year',
+            field=models.PositiveIntegerField(default=dashboard.models.current_year),
+        ),
+    ]
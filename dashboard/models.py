@@ -1,7 +1,8 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Case, Count, IntegerField, Q, Value, When
 from datetime import date
-from django.utils.timezone import now
+from django.utils.timezone import now, localdate
 from datetime import datetime
 
 class Position(models.Model):
@@ -25,13 +26,56 @@ class Employee(models.Model):
 
 class Attendance(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=date.today)
     time = models.TimeField(default=now)
     quit_time = models.TimeField(null=True, blank=True)  # Quit time, nullable
 
+    class Meta:
+        constraints = [
+            # One check-in per employee per day; also serves the month-range lookups
+            models.UniqueConstraint(fields=['employee', 'date'], name='unique_attendance_per_day'),
+        ]
+
     def __str__(self):
         return f"{self.employee.user.username} - {self.date} {self.time} / {self.quit_time if self.quit_time else 'Not Quit Yet'}"
 
+class AttendanceArchive(models.Model):
+    # Attendance of closed months, moved out of the hot Attendance table by the month close.
+    # Stores the employee id instead of a ForeignKey so payroll history survives employee removal.
+    employee_id = models.PositiveIntegerField()
+    date = models.DateField()
+    time = models.TimeField()
+    quit_time = models.TimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee_id', 'date'], name='unique_archived_attendance_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.date} {self.time} / {self.quit_time if self.quit_time else 'Not Quit'}"
+
+class AttendanceEvent(models.Model):
+    # Every event received from a badge reader / kiosk, kept so retries get the same answer
+    event_id = models.CharField(max_length=64, unique=True)
+    employee_id = models.PositiveIntegerField()
+    kind = models.CharField(max_length=3, choices=[('in', 'In'), ('out', 'Out')])
+    timestamp = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=[
+        ('recorded', 'Recorded'),
+        ('duplicate', 'Duplicate'),
+        ('rejected', 'Rejected'),
+    ])
+    detail = models.CharField(max_length=100, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_id}: {self.kind} {self.employee_id} ({self.status})"
+
 class AttendanceTimeSettings(models.Model):
     start_time = models.TimeField()  # Allowed check-in time
     end_time = models.TimeField()    # Allowed check-out time
@@ -67,6 +111,13 @@ class DefaultHoliday(models.Model):
 
 class MultiDefaultHoliday(models.Model):
     holiday_date = models.DateField()
+
+    class Meta:
+        constraints = [
+            # One row per date, so repeated submissions are ignored; also serves the date lookups
+            models.UniqueConstraint(fields=['holiday_date'], name='unique_occasional_holiday'),
+        ]
+
     def __str__(self):
         return f"Holidays on {self.holiday_date}" 
     
@@ -76,6 +127,12 @@ class EmployeeHoliday(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="holidays")
     holiday_date = models.DateField()
 
+    class Meta:
+        constraints = [
+            # One row per employee and date; also serves the per-employee date lookups
+            models.UniqueConstraint(fields=['employee', 'holiday_date'], name='unique_employee_holiday'),
+        ]
+
     def __str__(self):
         return f"Holiday for {self.employee.name} on {self.holiday_date}"
     
@@ -90,6 +147,64 @@ class MessageBox(models.Model):
     
     
 
+# Task statuses in board order; the position is the sort rank used by `with_status()`
+TASK_STATUSES = ["Date Over", "Pending Approval", "In Revision", "In Process", "Completed"]
+
+
+def status_key(label):
+    """"Pending Approval" -> "pending_approval" (aggregate aliases cannot contain spaces)."""
+    return label.lower().replace(' ', '_')
+
+
+class TaskQuerySet(models.QuerySet):
+    def with_status(self, today=None):
+        """
+        Annotate `status_label` (same rules as `Task.status()`, without the revision
+        count) and `status_rank` (index in TASK_STATUSES) so status can be filtered,
+        sorted and counted in the database.
+        """
+        today = today or localdate()
+        rules = [
+            When(is_completed=True, then=Value("Completed")),
+            When(is_delivered=True, then=Value("Pending Approval")),
+            When(Q(extended_date__isnull=False) & ~Q(revision_count=0), then=Value("In Revision")),
+            When(end_date__lt=today, extended_date__isnull=True, then=Value("Date Over")),
+        ]
+        return self.annotate(
+            status_label=Case(*rules, default=Value("In Process"), output_field=models.CharField()),
+            status_rank=Case(
+                *[When(status_label=label, then=Value(rank)) for rank, label in enumerate(TASK_STATUSES)],
+                output_field=IntegerField(),
+            ),
+        )
+
+    def with_status_label(self, label, today=None):
+        """
+        Tasks whose status is `label`, as plain column conditions rather than a filter on
+        the `with_status()` CASE, so the database can use the indexes.
+        """
+        today = today or localdate()
+        open_tasks = Q(is_completed=False, is_delivered=False)
+        in_revision = Q(extended_date__isnull=False) & ~Q(revision_count=0)
+        date_over = Q(end_date__lt=today, extended_date__isnull=True)
+        conditions = {
+            "Completed": Q(is_completed=True),
+            "Pending Approval": Q(is_completed=False, is_delivered=True),
+            "In Revision": open_tasks & in_revision,
+            "Date Over": open_tasks & ~in_revision & date_over,
+            "In Process": open_tasks & ~in_revision & ~date_over,
+        }
+        return self.filter(conditions[label])
+
+    def status_counts(self, today=None):
+        """One grouped query: {employee_id: {'total': n, 'completed': n, 'date_over': n, ...}}."""
+        rows = self.with_status(today).order_by().values('employee_id').annotate(
+            total=Count('id'),
+            **{status_key(label): Count('id', filter=Q(status_label=label)) for label in TASK_STATUSES},
+        )
+        return {row.pop('employee_id'): row for row in rows}
+
+
 class Task(models.Model):
     employee = models.ForeignKey('Employee', on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
@@ -101,9 +216,20 @@ class Task(models.Model):
     extended_date = models.DateField(null=True, blank=True)
     revision_count = models.IntegerField(default=0)  # Tracks the number of revisions
     rejected_count = models.IntegerField(default=0) # Tracks the number of rejected
+    # Set when a holiday change left the deadline on a day off (deadlines.reschedule_deadlines)
+    deadline_flagged_at = models.DateTimeField(null=True, blank=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The task board's keyset order; also serves deadline ranges and the overdue filter
+            models.Index(fields=['end_date', 'id']),
+        ]
 
     def status(self):
-        today = date.today()
+        # Same day as with_status(): the local date, not the server's
+        today = localdate()
         if self.is_completed:
             return "Completed"
         elif self.is_delivered:
@@ -130,15 +256,36 @@ class TaskHistoryKeeper(models.Model):
     revision_count = models.IntegerField(default=0)
     rejected_count = models.IntegerField(default=0)
     status = models.CharField(max_length=50)
-    action_taken = models.CharField(max_length=50, choices=[('Approved', 'Approved'), ('Deleted', 'Deleted')])  # Track if task was approved or deleted
+    action_taken = models.CharField(max_length=50, choices=[
+        ('Approved', 'Approved'), ('Rejected', 'Rejected'), ('Extended', 'Extended'), ('Deleted', 'Deleted'),
+    ])  # Track what was done to the task
     action_date = models.DateTimeField(auto_now_add=True)  # Timestamp when stored
 
     def __str__(self):
         return f"{self.task_title} ({self.action_taken})"
     
+def current_month_name():
+    return datetime.now().strftime("%B")
+
+
+def current_year():
+    return datetime.now().year
+
+
+class MonthSummaryQuerySet(models.QuerySet):
+    def for_month(self, year, month):
+        return self.filter(period=date(year, month, 1))
+
+    def between(self, first, last):
+        """Summaries of the months from `first` to `last` inclusive; any day of those months will do."""
+        return self.filter(period__range=(first.replace(day=1), last.replace(day=1)))
+
+
 class MonthSummary(models.Model):
-    month = models.CharField(max_length=10, default=datetime.now().strftime("%B"))  # Example: "January"
-    year = models.PositiveIntegerField(default=datetime.now().year)  # Example: 2024
+    month = models.CharField(max_length=10, default=current_month_name)  # Example: "January"
+    year = models.PositiveIntegerField(default=current_year)  # Example: 2024
+    # First day of the month: the sortable, indexed form of month/year that lookups use. Set by save()
+    period = models.DateField(editable=False)
 
     # Store employee details instead of ForeignKey (to keep records even if employee is deleted)
     employee_id = models.PositiveIntegerField()  
@@ -150,11 +297,22 @@ class MonthSummary(models.Model):
     total_occasional_holidays = models.PositiveIntegerField()
 
     total_task_assigned = models.PositiveIntegerField(default=0)
-    assigned_task_ids_with_title = models.TextField(blank=True, null=True)  # Store task IDs with titles
+    # Legacy comma-joined "id: title" lists, replaced by MonthSummaryTask (see backfill_month_tasks)
+    assigned_task_ids_with_title = models.TextField(blank=True, null=True)
 
     total_task_completed = models.PositiveIntegerField(default=0)
-    completed_task_ids_with_title = models.TextField(blank=True, null=True)  # Store completed task IDs with titles
-    
+    completed_task_ids_with_title = models.TextField(blank=True, null=True)
+
+    # Timesheet of the month, see timesheet.employee_timesheets()
+    total_worked_minutes = models.PositiveIntegerField(default=0)
+    total_late_arrivals = models.PositiveIntegerField(default=0)
+    total_late_minutes = models.PositiveIntegerField(default=0)
+    total_early_leaves = models.PositiveIntegerField(default=0)
+    total_early_minutes = models.PositiveIntegerField(default=0)
+    total_overtime_minutes = models.PositiveIntegerField(default=0)
+    # Bit d-1 set when the employee checked in on day d, see presence.py
+    presence_bits = models.PositiveIntegerField(default=0)
+
     joining_date = models.DateTimeField(null=True, blank=True)
     leaving_date = models.DateTimeField(null=True, blank=True)
 
@@ -163,13 +321,63 @@ class MonthSummary(models.Model):
         ("Removed", "Removed"),
     ], default="Running")
 
+    objects = MonthSummaryQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee_id', 'period'], name='unique_month_summary_period'),
+        ]
+        indexes = [
+            # Month-range scans, in the (period, employee) order the pages and exports walk them
+            models.Index(fields=['period', 'employee_id']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Bulk writes skip save() and set period themselves (see month_summary.month_fields)
+        self.period = date(int(self.year), datetime.strptime(self.month, "%B").month, 1)
+        super().save(*args, **kwargs)
+
     @property
     def total_absent_days(self):
         """Dynamically calculates total absent days"""
         return self.total_workdays - self.total_present_days
 
+    @property
+    def total_worked_hours(self):
+        return round(self.total_worked_minutes / 60, 2)
+
+    @property
+    def assigned_task_list(self):
+        """"id: title" of the tasks assigned this month; use prefetch_related('task_entries') for lists."""
+        return [str(entry) for entry in self.task_entries.all() if entry.kind == 'assigned']
+
+    @property
+    def completed_task_list(self):
+        return [str(entry) for entry in self.task_entries.all() if entry.kind == 'completed']
+
     def __str__(self):
         return f"{self.employee_name} ({self.employee_id}) - {self.month} {self.year}"
+
+
+class MonthSummaryTask(models.Model):
+    # One row per task assigned / completed in a month. Keeps the task id and title
+    # instead of a ForeignKey so the month's record survives the task being deleted.
+    summary = models.ForeignKey(MonthSummary, on_delete=models.CASCADE, related_name="task_entries")
+    kind = models.CharField(max_length=10, choices=[('assigned', 'Assigned'), ('completed', 'Completed')])
+    task_id = models.IntegerField()
+    task_title = models.CharField(max_length=255)
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['summary', 'kind', 'task_id'], name='unique_month_summary_task'),
+        ]
+        indexes = [
+            models.Index(fields=['task_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id}: {self.task_title}"
     
     
 
@@ -179,10 +387,99 @@ class SystemState(models.Model):
 
     def __str__(self):
         return f"Last Reset: {self.last_processed_month} {self.last_processed_year}"
-    
 
 
+class TableVersion(models.Model):
+    # Change counter per source table, bumped by database triggers on every insert / update / delete.
+    # Export artifacts are cached under the versions of the tables they read.
+    table_name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
 
-    
-    
+    def __str__(self):
+        return f"{self.table_name} v{self.version}"
+
+
+class SummaryCubeCell(models.Model):
+    # MonthSummary pre-aggregated by month x sector x position (see analytics.py). Only
+    # additive figures are stored, so any slice is a sum of cells; rates are derived.
+    # Employees count under their current sector and position; None is "not set".
+    period = models.DateField()
+    sector = models.ForeignKey(Sector, on_delete=models.CASCADE, null=True, blank=True)
+    position = models.ForeignKey(Position, on_delete=models.CASCADE, null=True, blank=True)
+    employee_months = models.PositiveIntegerField(default=0)
+    workdays = models.PositiveIntegerField(default=0)
+    present_days = models.PositiveIntegerField(default=0)
+    holidays_taken = models.PositiveIntegerField(default=0)
+    tasks_assigned = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['period']),
+        ]
 
+    def __str__(self):
+        return f"{self.period:%Y-%m} / {self.sector or '-'} / {self.position or '-'}"
+
+
+class SummaryCubeStaleMonth(models.Model):
+    # Months whose cube cells are out of date. Filled by database triggers on
+    # MonthSummary and on employees' sector / position (triggers.py), since
+    # most MonthSummary writes are bulk updates that skip signals.
+    period = models.DateField(primary_key=True)
+
+    def __str__(self):
+        return f"{self.period:%Y-%m}"
+
+
+class HolidayIndexEntry(models.Model):
+    # Date -> employee index of individual leave (EmployeeHoliday), with the employee's
+    # sector copied in. Kept in line by database triggers (triggers.py), see holiday_index.py
+    holiday_date = models.DateField()
+    employee_id = models.PositiveIntegerField()
+    sector_id = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['holiday_date', 'employee_id'], name='unique_holiday_index_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['sector_id', 'holiday_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.holiday_date}: employee {self.employee_id}"
+
+
+class ExportJob(models.Model):
+    kind = models.CharField(max_length=30, choices=[
+        ('task_history', 'Task History'),
+        ('month_summary', 'Month Summary'),
+        ('activity_summary', 'Activity Summary'),
+        ('payroll', 'Payroll'),
+    ])
+    file_format = models.CharField(max_length=4, choices=[('xlsx', 'XLSX'), ('csv', 'CSV')], default='xlsx')
+    cache_key = models.CharField(max_length=200)  # kind, scope and source table versions of the artifact
+    status = models.CharField(max_length=10, choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], default='queued')
+    file_name = models.CharField(max_length=255, blank=True)  # Artifact file inside EXPORT_ROOT
+    download_name = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, blank=True)  # Filters of the export, e.g. the month range
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['cache_key']),
+        ]
+
+    def __str__(self):
+        return f"Export #{self.id} {self.get_kind_display()} ({self.status})"
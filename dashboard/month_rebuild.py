@@ -0,0 +1,124 @@
+"""
+Rebuild MonthSummary over many months at once.
+
+Months are independent of each other, so each (year, month) is handed to a worker
+process that runs `close_month()` on it. The reads and the pandas work, which are
+most of the cost, run side by side; only the short write transactions queue on the
+database's write lock. A consistency check over the same months runs at the end.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from django.db import OperationalError, connections
+from django.db.models import Min
+from django.utils.timezone import localdate
+
+from .holiday_calendar import month_calendar
+from .models import Attendance, AttendanceArchive, Employee, MonthSummary
+from .month_summary import FIGURE_FIELDS, close_month, joined_employees, month_figures, month_name
+
+LOCK_RETRIES = 5  # A write that waited out the busy timeout is retried, after 1, 2, 4... seconds
+
+
+def month_range(first, last):
+    """Every (year, month) from `first` to `last` inclusive, both (year, month) pairs."""
+    year, month = first
+    while (year, month) <= tuple(last):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def history_months(today=None):
+    """From the month of the first employee or check-in, whichever is earlier, up to this month."""
+    today = today or localdate()
+    starts = [
+        Employee.objects.aggregate(first=Min('user__date_joined'))['first'],
+        Attendance.objects.aggregate(first=Min('date'))['first'],
+        AttendanceArchive.objects.aggregate(first=Min('date'))['first'],
+    ]
+    starts = [start.date() if hasattr(start, 'date') else start for start in starts if start]
+    first = min(starts, default=today)
+    return list(month_range((first.year, first.month), (today.year, today.month)))
+
+
+def check_month(year, month):
+    """
+    Problems left in a month's MonthSummary rows, as counts: employees with no row
+    and running rows whose figures differ from the source tables. (Two rows for the
+    same employee and month are ruled out by the unique period constraint.)
+    """
+    month_cal = month_calendar(year, month)
+    summaries = MonthSummary.objects.for_month(year, month)
+    running = pd.DataFrame(
+        list(summaries.filter(employee_present_status="Running").values_list('employee_id', *FIGURE_FIELDS)),
+        columns=['employee_id', *FIGURE_FIELDS],
+    )
+
+    figures = month_figures(month_cal, sorted(set(running['employee_id'].tolist())))
+    target = figures.loc[running['employee_id'], FIGURE_FIELDS].to_numpy()
+    mismatched = int((running[FIGURE_FIELDS].to_numpy() != target).any(axis=1).sum())
+    return {
+        'missing': len(set(joined_employees(month_cal)) - set(summaries.values_list('employee_id', flat=True))),
+        'mismatched': mismatched,
+    }
+
+
+def _close_month_retrying(year, month):
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return close_month(year, month)
+        except OperationalError as error:
+            if 'locked' not in str(error) or attempt == LOCK_RETRIES - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+
+def _init_worker():
+    # Spawned workers (macOS, Windows) start without Django; forked ones already have it
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _run(func, months, workers):
+    """Yield ((year, month), func(year, month)) in completion order, inline or from a process pool."""
+    if workers == 1:
+        for year, month in months:
+            yield (year, month), func(year, month)
+        return
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(func, year, month): (year, month) for year, month in months}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def rebuild_month_summaries(months, workers=None, log=print):
+    """
+    Run `close_month()` on every (year, month) of `months`, `workers` processes at a
+    time (default: one per CPU; 1 runs in this process), logging progress as months
+    finish, then check them all. Returns {'created', 'updated', 'problems'} where
+    problems maps (year, month) to the non-zero counts of `check_month()`.
+    """
+    months = list(months)
+    started = time.perf_counter()
+    created = updated = 0
+    for done, ((year, month), result) in enumerate(_run(_close_month_retrying, months, workers), 1):
+        created += result['created']
+        updated += result['updated']
+        elapsed = time.perf_counter() - started
+        log(
+            f"[{done}/{len(months)}] {month_name(month)} {year}: {result['created']} created, "
+            f"{result['updated']} updated ({elapsed:.1f}s elapsed, ~{elapsed / done * (len(months) - done):.0f}s left)"
+        )
+
+    log(f"Checking {len(months)} months...")
+    problems = {}
+    for (year, month), counts in _run(check_month, months, workers):
+        counts = {name: count for name, count in counts.items() if count}
+        if counts:
+            problems[(year, month)] = counts
+    return {'created': created, 'updated': updated, 'problems': dict(sorted(problems.items()))}
@@ -0,0 +1,389 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .holiday_calendar import month_bounds, month_calendar
+from .models import Employee, EmployeeHoliday, MonthSummary, MonthSummaryTask
+from .presence import frame_bits
+from .reports import extra_holiday_frame, grouped_frame
+from .timesheet import TIMESHEET_FIELDS, check_in_days, employee_timesheets, sum_days
+
+UPDATE_CHUNK_SIZE = 5000  # ids per UPDATE ... WHERE id IN (...), well under SQLite's variable limit
+CLOSE_BATCH_SIZE = 500  # rows per bulk_update CASE statement in close_month(); Django lowers it to SQLite's variable limit
+
+# MonthSummary fields recomputed from the source tables by `close_month()`
+FIGURE_FIELDS = [
+    'total_workdays', 'total_present_days', 'total_holidays_taken', 'total_occasional_holidays',
+    'total_task_assigned', 'total_task_completed', *TIMESHEET_FIELDS, 'presence_bits',
+]
+
+
+def month_name(month):
+    """MonthSummary labels the month by name, e.g. "January"."""
+    return date(2000, month, 1).strftime("%B")
+
+
+def month_fields(year, month):
+    """The month, year and period of a MonthSummary, for writes that skip save() such as bulk_create."""
+    return {'month': month_name(month), 'year': year, 'period': date(year, month, 1)}
+
+
+def parse_month(value):
+    """"2025-03" -> date(2025, 3, 1); None when blank or malformed."""
+    try:
+        return datetime.strptime((value or '').strip(), "%Y-%m").date()
+    except ValueError:
+        return None
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summary_filters(params, today):
+    """
+    The month summary filters from request parameters: `from` / `to` months as
+    YYYY-MM (this month when both are missing, one month when only one is given),
+    `sector` and `position` ids, and `group` - 'month' for one row per employee and
+    month, 'employee' for one row of totals per employee.
+    """
+    first, last = parse_month(params.get('from')), parse_month(params.get('to'))
+    first = first or last or today.replace(day=1)
+    last = last or first
+    if first > last:
+        first, last = last, first
+    return {
+        'first': first,
+        'last': last,
+        'sector': _parse_id(params.get('sector')),
+        'position': _parse_id(params.get('position')),
+        'group': 'employee' if params.get('group') == 'employee' else 'month',
+    }
+
+
+def filter_params(filters):
+    """`summary_filters()` back as request parameters, for links, forms and export jobs."""
+    params = {'from': filters['first'].strftime("%Y-%m"), 'to': filters['last'].strftime("%Y-%m")}
+    for name in ('sector', 'position'):
+        if filters[name] is not None:
+            params[name] = str(filters[name])
+    if filters['group'] == 'employee':
+        params['group'] = 'employee'
+    return params
+
+
+def filtered_month_summaries(filters):
+    """MonthSummary rows in the filtered month range, of employees in the sector / position if given."""
+    summaries = MonthSummary.objects.between(filters['first'], filters['last'])
+    employees = Employee.objects.all()
+    if filters['sector'] is not None:
+        employees = employees.filter(sector_id=filters['sector'])
+    if filters['position'] is not None:
+        employees = employees.filter(position_id=filters['position'])
+    if filters['sector'] is not None or filters['position'] is not None:
+        summaries = summaries.filter(employee_id__in=employees.values('id'))
+    return summaries
+
+
+def employee_totals(summaries):
+    """One row of sums per employee across the months of `summaries`, grouped by the database."""
+    return summaries.values('employee_id').annotate(
+        name=Max('employee_name'),
+        months=Count('id'),
+        workdays=Sum('total_workdays'),
+        present_days=Sum('total_present_days'),
+        absent_days=Sum('total_workdays') - Sum('total_present_days'),
+        holidays_taken=Sum('total_holidays_taken'),
+        occasional_holidays=Sum('total_occasional_holidays'),
+        tasks_assigned=Sum('total_task_assigned'),
+        tasks_completed=Sum('total_task_completed'),
+    )
+
+
+def ensure_month_summaries(year, month, employee_ids):
+    """
+    Create the missing MonthSummary rows of a month for the given employees in one
+    bulk insert. Rows created meanwhile by a concurrent request are left as they are.
+    """
+    existing = set(
+        MonthSummary.objects.for_month(year, month).filter(employee_id__in=employee_ids).values_list('employee_id', flat=True)
+    )
+    missing = list(Employee.objects.filter(id__in=set(employee_ids) - existing).select_related('user'))
+    if not missing:
+        return 0
+
+    # Fill the holiday fields up front rather than refreshing the new rows afterwards
+    month_cal = month_calendar(year, month)
+    counts = month_cal.summarize(
+        [employee.id for employee in missing],
+        EmployeeHoliday.objects.filter(
+            employee__in=missing, **month_cal.range_filter('holiday_date')
+        ).values_list('employee_id', 'holiday_date'),
+    )
+    created = MonthSummary.objects.bulk_create([
+        MonthSummary(
+            **month_fields(year, month),
+            employee_id=employee.id,
+            employee_name=employee.user.get_full_name() or employee.user.username,
+            total_workdays=int(workdays),
+            total_present_days=0,
+            total_holidays_taken=int(extra),
+            total_occasional_holidays=len(month_cal.occasional_holidays),
+            total_task_assigned=0,
+            assigned_task_ids_with_title="",
+            total_task_completed=0,
+            completed_task_ids_with_title="",
+            employee_present_status="Running"
+        )
+        for employee, extra, workdays in zip(missing, counts['extra_holidays'], counts['workdays'])
+    ], ignore_conflicts=True)
+    return len(created)
+
+
+def record_month_task(employee_id, task, kind, day):
+    """
+    Add `task` to the employee's MonthSummary of `day`'s month as 'assigned' or 'completed'.
+
+    The ledger row and the matching counter are written in one transaction, and the
+    (summary, kind, task) unique constraint makes recording the same task twice a
+    no-op. Returns False when the task was already recorded.
+    """
+    counter = 'total_task_assigned' if kind == 'assigned' else 'total_task_completed'
+    with transaction.atomic():
+        ensure_month_summaries(day.year, day.month, [employee_id])
+        summary_id = MonthSummary.objects.for_month(day.year, day.month).get(employee_id=employee_id).id
+        try:
+            with transaction.atomic():
+                MonthSummaryTask.objects.create(summary_id=summary_id, kind=kind, task_id=task.id, task_title=task.title)
+        except IntegrityError:
+            return False
+        MonthSummary.objects.filter(id=summary_id).update(**{counter: F(counter) + 1})
+    return True
+
+
+def record_month_tasks(entries, kind, day):
+    """
+    Bulk form of `record_month_task()`: `entries` are (employee_id, task) pairs. Writes
+    the missing summaries, the ledger rows not recorded yet in one bulk insert and the
+    counters with one UPDATE per number of new tasks per employee - a single UPDATE when
+    each employee got one task - in one transaction. Tasks already in the ledger are
+    skipped, as `record_month_task()` does, so they neither fail the batch nor count
+    twice. Returns the number of tasks recorded.
+    """
+    if not entries:
+        return 0
+    counter = 'total_task_assigned' if kind == 'assigned' else 'total_task_completed'
+    employee_ids = list({employee_id for employee_id, _ in entries})
+    with transaction.atomic():
+        ensure_month_summaries(day.year, day.month, employee_ids)
+        summary_ids = dict(
+            MonthSummary.objects.for_month(day.year, day.month).filter(
+                employee_id__in=employee_ids
+            ).values_list('employee_id', 'id')
+        )
+        task_ids = [task.id for _, task in entries]
+        recorded = set()
+        for start in range(0, len(task_ids), UPDATE_CHUNK_SIZE):
+            recorded.update(MonthSummaryTask.objects.filter(
+                kind=kind, task_id__in=task_ids[start:start + UPDATE_CHUNK_SIZE]
+            ).values_list('summary_id', 'task_id'))
+
+        new_entries = []
+        for employee_id, task in entries:
+            key = (summary_ids[employee_id], task.id)
+            if key not in recorded:
+                recorded.add(key)  # Also drops repeats within the batch
+                new_entries.append((employee_id, task))
+        MonthSummaryTask.objects.bulk_create([
+            MonthSummaryTask(summary_id=summary_ids[employee_id], kind=kind, task_id=task.id, task_title=task.title)
+            for employee_id, task in new_entries
+        ])
+
+        by_increment = defaultdict(list)
+        for employee_id, count in Counter(employee_id for employee_id, _ in new_entries).items():
+            by_increment[count].append(summary_ids[employee_id])
+        for count, ids in by_increment.items():
+            for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+                MonthSummary.objects.filter(id__in=ids[start:start + UPDATE_CHUNK_SIZE]).update(
+                    **{counter: F(counter) + count}
+                )
+    return len(new_entries)
+
+
+def refresh_month_summaries(year, month, employee_ids=None):
+    """
+    Recompute the workday and holiday fields of a month's MonthSummary rows.
+
+    Runs one query for the summaries, two for the calendar and one for the extra
+    holidays, then writes every row back with a single bulk_update. Only running
+    employees are touched so removed employees keep their last figures.
+    """
+    summaries = MonthSummary.objects.for_month(year, month).filter(employee_present_status="Running")
+    if employee_ids is not None:
+        summaries = summaries.filter(employee_id__in=employee_ids)
+    summaries = list(summaries.only('id', 'employee_id'))
+    if not summaries:
+        return 0
+
+    month_cal = month_calendar(year, month)
+    holidays = EmployeeHoliday.objects.filter(**month_cal.range_filter('holiday_date'))
+    if employee_ids is not None:
+        holidays = holidays.filter(employee_id__in=employee_ids)
+
+    counts = month_cal.summarize(
+        [summary.employee_id for summary in summaries],
+        holidays.values_list('employee_id', 'holiday_date'),
+    )
+    occasional_count = len(month_cal.occasional_holidays)
+    for summary, extra, workdays in zip(summaries, counts['extra_holidays'], counts['workdays']):
+        summary.total_occasional_holidays = occasional_count
+        summary.total_holidays_taken = int(extra)
+        summary.total_workdays = int(workdays)
+
+    return MonthSummary.objects.bulk_update(
+        summaries, ['total_occasional_holidays', 'total_holidays_taken', 'total_workdays']
+    )
+
+
+def month_figures(month_cal, employee_ids):
+    """
+    Every FIGURE_FIELDS value of a month for the given employees, as an int DataFrame
+    indexed by employee_id. Five grouped queries, whatever the headcount: the
+    check-ins for the timesheet and presence bitmap (hot table and archive in one),
+    extra holidays, the month's task ledger and the task counts stored on summaries
+    with no ledger entries - history not backfilled yet (`manage.py
+    backfill_month_tasks`), whose counts would otherwise drop to 0.
+    """
+    days = check_in_days(month_cal.first_day, month_cal.next_month)
+    sheets = sum_days(days).join(frame_bits(days))
+    holidays = extra_holiday_frame(month_cal)
+    tasks = grouped_frame(
+        MonthSummaryTask.objects.filter(summary__period=month_cal.first_day),
+        key='summary__employee_id',
+        assigned=Count('task_id', distinct=True, filter=Q(kind='assigned')),
+        completed=Count('task_id', distinct=True, filter=Q(kind='completed')),
+    )
+    unrecorded = grouped_frame(
+        MonthSummary.objects.filter(period=month_cal.first_day)
+        .filter(~Exists(MonthSummaryTask.objects.filter(summary=OuterRef('pk')))),
+        assigned=Max('total_task_assigned'),
+        completed=Max('total_task_completed'),
+    )
+    tasks = pd.concat([tasks, unrecorded])  # One summary per employee and month: no overlap
+
+    figures = pd.DataFrame(index=pd.Index(list(employee_ids), name='employee_id'))
+    figures = figures.join([sheets, holidays, tasks], how='left').fillna(0).astype(np.int64)
+    total_holidays = len(month_cal.holidays) + figures['extra_holidays'] - figures['overlap']
+    return pd.DataFrame({
+        'total_workdays': month_cal.total_days - total_holidays,
+        'total_present_days': figures['days'],
+        'total_holidays_taken': figures['extra_holidays'],
+        'total_occasional_holidays': len(month_cal.occasional_holidays),
+        'total_task_assigned': figures['assigned'],
+        'total_task_completed': figures['completed'],
+        **{field: figures[field] for field in TIMESHEET_FIELDS},
+        'presence_bits': figures['presence_bits'],
+    }, index=figures.index)
+
+
+def refresh_month_timesheets(year, month, employee_ids):
+    """
+    Recompute the TIMESHEET_FIELDS of the employees' running MonthSummary rows for a
+    month, after their check-ins or check-outs changed: one check-in query and one
+    bulk_update.
+    """
+    summaries = list(
+        MonthSummary.objects.for_month(year, month)
+        .filter(employee_id__in=employee_ids, employee_present_status="Running")
+        .only('id', 'employee_id')
+    )
+    if not summaries:
+        return 0
+
+    sheets = employee_timesheets(*month_bounds(year, month), employee_ids)
+    for summary in summaries:
+        values = sheets.loc[summary.employee_id] if summary.employee_id in sheets.index else None
+        for field in TIMESHEET_FIELDS:
+            setattr(summary, field, 0 if values is None else int(values[field]))
+    return MonthSummary.objects.bulk_update(summaries, TIMESHEET_FIELDS)
+
+
+def joined_employees(month_cal):
+    """{employee_id: (first_name, last_name, username, date_joined)} of employees who had joined by the month's end."""
+    month_end = timezone.make_aware(datetime.combine(month_cal.next_month, time.min))
+    return {
+        employee_id: (first_name, last_name, username, date_joined)
+        for employee_id, first_name, last_name, username, date_joined in Employee.objects.filter(
+            user__date_joined__lt=month_end
+        ).values_list('id', 'user__first_name', 'user__last_name', 'user__username', 'user__date_joined')
+    }
+
+
+def close_month(year, month):
+    """
+    Recompute the MonthSummary of every employee for a month from the source tables.
+
+    Employees who had joined by the end of the month get a row if they have none
+    (one bulk_create); every running summary of the month is then brought in line
+    with `month_figures()`: the changed rows are written with one bulk_update, a CASE
+    statement per CLOSE_BATCH_SIZE rows covering only the fields that changed in any
+    row. Worked minutes and presence bitmaps differ per employee, so grouping rows by
+    their new values would be an UPDATE per row. Removed employees keep their last
+    figures. Rerunning on unchanged data writes nothing. Returns {'created': n, 'updated': n}.
+
+    The figures are read before the write transaction opens, so several months can
+    be computed side by side (see `rebuild_month_summaries()`) and only the short
+    write phase holds the database's write lock.
+    """
+    month_cal = month_calendar(year, month)
+    summaries = MonthSummary.objects.for_month(year, month)
+    employees = joined_employees(month_cal)
+    figures = month_figures(month_cal, sorted(set(employees) | set(summaries.values_list('employee_id', flat=True))))
+
+    with transaction.atomic():
+        # Rows may have been added since the figures were read; leave those to the next run
+        missing = set(employees) - set(summaries.values_list('employee_id', flat=True))
+        current = pd.DataFrame(
+            list(summaries.filter(employee_present_status="Running").values_list('id', 'employee_id', *FIGURE_FIELDS)),
+            columns=['id', 'employee_id', *FIGURE_FIELDS],
+        )
+        current = current[current['employee_id'].isin(figures.index)]
+
+        new_rows = []
+        for employee_id, values in zip(sorted(missing), figures.loc[sorted(missing), FIGURE_FIELDS].values.tolist()):
+            first_name, last_name, username, date_joined = employees[employee_id]
+            new_rows.append(MonthSummary(
+                **month_fields(year, month),
+                employee_id=employee_id,
+                employee_name=f"{first_name} {last_name}".strip() or username,
+                assigned_task_ids_with_title="",
+                completed_task_ids_with_title="",
+                joining_date=date_joined,
+                employee_present_status="Running",
+                **dict(zip(FIGURE_FIELDS, values)),
+            ))
+        MonthSummary.objects.bulk_create(new_rows, batch_size=1000)
+
+        target = figures.loc[current['employee_id'], FIGURE_FIELDS].to_numpy()
+        changed = current[FIGURE_FIELDS].to_numpy() != target
+        rows = np.flatnonzero(changed.any(axis=1))
+        columns = np.flatnonzero(changed.any(axis=0))  # Only the fields that changed somewhere
+        fields = [FIGURE_FIELDS[column] for column in columns]
+        ids = current['id'].to_numpy()
+        if fields:
+            MonthSummary.objects.bulk_update(
+                [MonthSummary(id=int(ids[row]), **{field: int(target[row, column]) for field, column in zip(fields, columns)})
+                 for row in rows],
+                fields,
+                batch_size=CLOSE_BATCH_SIZE,
+            )
+
+    return {'created': len(new_rows), 'updated': len(rows)}
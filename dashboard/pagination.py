@@ -0,0 +1,55 @@
+"""
+Keyset ("seek") pagination: each page starts after the sort key of the previous
+page's last row instead of at an OFFSET, so page 1000 costs the same index seek as
+page 1 and rows inserted meanwhile don't shift the pages.
+"""
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+CURSOR_SEPARATOR = '~'
+
+
+def _key_values(row, keys):
+    return [row[key] if isinstance(row, dict) else getattr(row, key) for key in keys]
+
+
+def _key_field(queryset, key):
+    # A model field, or the output field of an annotation such as a computed sort rank
+    annotation = queryset.query.annotations.get(key)
+    return annotation.output_field if annotation is not None else queryset.model._meta.get_field(key)
+
+
+def decode_cursor(queryset, keys, cursor):
+    """Cursor string -> key values, parsed by the model (or annotation) fields; None when blank or malformed."""
+    parts = (cursor or '').split(CURSOR_SEPARATOR)
+    if not cursor or len(parts) != len(keys):
+        return None
+    try:
+        return [_key_field(queryset, key).to_python(part) for key, part in zip(keys, parts)]
+    except (ValidationError, ValueError):
+        return None
+
+
+def after(keys, values):
+    """Q for rows sorting after `values` on `keys` (ascending), e.g. (a > x) OR (a = x AND b > y)."""
+    condition = Q()
+    for position in range(len(keys)):
+        equal = {key: value for key, value in zip(keys[:position], values[:position])}
+        condition |= Q(**equal, **{f'{keys[position]}__gt': values[position]})
+    return condition
+
+
+def keyset_page(queryset, keys, cursor, page_size):
+    """
+    One page of `queryset` ordered by `keys`, which must identify a row uniquely.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by(*keys)
+    values = decode_cursor(queryset, keys, cursor)
+    if values is not None:
+        queryset = queryset.filter(after(keys, values))
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, CURSOR_SEPARATOR.join(str(value) for value in _key_values(rows[-1], keys))
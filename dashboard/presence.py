@@ -0,0 +1,130 @@
+"""
+Presence bitmaps: bit d-1 of MonthSummary.presence_bits is set when the employee
+checked in on day d of the month.
+
+check_in() and the badge-reader batches set the bit in the same UPDATE as the
+present-day counter, and close_month() recomputes it from the check-ins. Coverage
+questions - how many were present each day, who was absent on a day, the longest
+absence streaks - are then bitwise NumPy operations over one int per employee, read
+from MonthSummary instead of scanning Attendance.
+"""
+import numpy as np
+import pandas as pd
+
+from .holiday_calendar import month_calendar
+from .models import Employee, EmployeeHoliday, MonthSummary
+
+
+def day_bit(day):
+    """The presence_bits bit of `day` within its month."""
+    return 1 << (day.day - 1)
+
+
+def frame_bits(days):
+    """presence_bits per employee_id of a timesheet `day_frame()` covering one month."""
+    bits = np.left_shift(1, days['date'].dt.day.to_numpy(dtype=np.int64) - 1)
+    # One check-in per employee and day, so summing the bits ORs them
+    return pd.Series(bits, index=days['employee_id'].to_numpy()).groupby(level=0).sum().rename('presence_bits')
+
+
+def month_bitmaps(year, month, employee_ids=None):
+    """(employee ids, presence bits) of the month's running summaries, as arrays: one query."""
+    summaries = MonthSummary.objects.for_month(year, month).filter(employee_present_status="Running")
+    if employee_ids is not None:
+        summaries = summaries.filter(employee_id__in=employee_ids)
+    rows = np.array(list(summaries.order_by('employee_id').values_list('employee_id', 'presence_bits')), dtype=np.int64)
+    rows = rows.reshape(-1, 2)
+    return rows[:, 0], rows[:, 1]
+
+
+def presence_matrix(bits, total_days):
+    """Bitmaps -> employees x days boolean matrix."""
+    return ((bits[:, None] >> np.arange(total_days)) & 1).astype(bool)
+
+
+def daily_headcount(year, month, employee_ids=None):
+    """How many employees checked in on each day of the month, as an int array (index 0 = day 1)."""
+    _, bits = month_bitmaps(year, month, employee_ids)
+    return presence_matrix(bits, month_calendar(year, month).total_days).sum(axis=0)
+
+
+def _leave_matrix(month_cal, employee_ids):
+    """employees x days matrix of individual leave (EmployeeHoliday), rows in the sorted `employee_ids` order."""
+    leave = np.zeros((len(employee_ids), month_cal.total_days), dtype=bool)
+    pairs = list(EmployeeHoliday.objects.filter(**month_cal.range_filter('holiday_date')).values_list(
+        'employee_id', 'holiday_date'
+    ))
+    if pairs and len(employee_ids):
+        ids = np.array([employee_id for employee_id, _ in pairs], dtype=np.int64)
+        days = np.array([holiday_date.day - 1 for _, holiday_date in pairs], dtype=np.int64)
+        rows = np.clip(np.searchsorted(employee_ids, ids), 0, len(employee_ids) - 1)
+        known = employee_ids[rows] == ids
+        leave[rows[known], days[known]] = True
+    return leave
+
+
+def absent_on(day, employee_ids=None):
+    """
+    Ids of the employees with a running summary for `day`'s month who did not check
+    in that day, leaving out those on leave. Nobody is absent on a shared holiday.
+    """
+    month_cal = month_calendar(day.year, day.month)
+    if month_cal.is_holiday(day):
+        return []
+    ids, bits = month_bitmaps(day.year, day.month, employee_ids)
+    absent = ids[(bits & day_bit(day)) == 0]
+    on_leave = set(EmployeeHoliday.objects.filter(holiday_date=day).values_list('employee_id', flat=True))
+    return [employee_id for employee_id in absent.tolist() if employee_id not in on_leave]
+
+
+def absence_streaks(year, month, until, employee_ids=None):
+    """
+    Per employee, the longest run of consecutive workdays without a check-in, up to
+    and including `until`: a pandas Series indexed by employee_id. Shared holidays
+    and the employee's own leave days neither count nor break a run.
+    """
+    month_cal = month_calendar(year, month)
+    ids, bits = month_bitmaps(year, month, employee_ids)
+    present = presence_matrix(bits, month_cal.total_days)
+    skipped = _leave_matrix(month_cal, ids) | month_cal.holiday_mask[None, :]
+    skipped[:, max(0, min((until - month_cal.first_day).days + 1, month_cal.total_days)):] = True
+    absent = ~present & ~skipped
+
+    # Running count of absent days, restarted at every check-in
+    count = np.cumsum(absent, axis=1)
+    restart = np.maximum.accumulate(np.where(present, count, 0), axis=1)
+    return pd.Series((count - restart).max(axis=1), index=pd.Index(ids, name='employee_id'), name='longest_absence')
+
+
+def coverage_heatmap(year, month):
+    """
+    Daily presence per sector for the month, from the bitmaps: {'days': [...], 'rows':
+    [{'sector', 'headcount', 'cells': [{'day', 'present', 'rate', 'holiday'}]}]}.
+    Employees without a sector are grouped under "No sector".
+    """
+    month_cal = month_calendar(year, month)
+    ids, bits = month_bitmaps(year, month)
+    present = pd.DataFrame(presence_matrix(bits, month_cal.total_days), index=ids)
+    sectors = pd.Series(dict(Employee.objects.values_list('id', 'sector__sector')), dtype=object)
+    sector_names = sectors.reindex(ids).fillna("No sector").to_numpy()
+
+    holidays = month_cal.holiday_mask
+    counts = present.groupby(sector_names).sum()
+    headcounts = present.groupby(sector_names).size()
+    rows = []
+    for sector, day_counts in counts.iterrows():
+        headcount = int(headcounts[sector])
+        rows.append({
+            'sector': sector,
+            'headcount': headcount,
+            'cells': [
+                {
+                    'day': day + 1,
+                    'present': int(count),
+                    'rate': round(int(count) / headcount, 2) if headcount else 0,
+                    'holiday': bool(holidays[day]),
+                }
+                for day, count in enumerate(day_counts.to_numpy())
+            ],
+        })
+    return {'days': list(range(1, month_cal.total_days + 1)), 'rows': rows}
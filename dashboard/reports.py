@@ -0,0 +1,84 @@
+import pandas as pd
+from django.db.models import Count, Q
+
+from .exports import write_xlsx_rows
+from .holiday_calendar import month_calendar
+from .models import Attendance, Employee, EmployeeHoliday, Task, status_key
+
+# Report column -> key of `TaskQuerySet.status_counts()`
+TASK_COLUMNS = {
+    "total_tasks": "total",
+    "completed_tasks": status_key("Completed"),
+    "pending_tasks": status_key("Pending Approval"),
+    "in_process_tasks": status_key("In Process"),
+    "in_revision_tasks": status_key("In Revision"),
+    "date_over_tasks": status_key("Date Over"),
+}
+
+
+def grouped_frame(queryset, key='employee_id', **aggregates):
+    """DataFrame indexed by `key` from a `values(key).annotate(...)` query."""
+    rows = list(queryset.order_by().values(key).annotate(**aggregates))
+    return pd.DataFrame(rows, columns=[key, *aggregates]).set_index(key)
+
+
+def extra_holiday_frame(month_cal, employee_ids=None):
+    """Per employee: extra holidays in the month (unique per date), and how many fall on a shared holiday."""
+    holidays = EmployeeHoliday.objects.filter(**month_cal.range_filter('holiday_date'))
+    if employee_ids is not None:
+        holidays = holidays.filter(employee_id__in=employee_ids)
+    shared = [day.item() for day in month_cal.holidays]
+    return grouped_frame(
+        holidays,
+        extra_holidays=Count('holiday_date'),
+        overlap=Count('holiday_date', filter=Q(holiday_date__in=shared)),
+    )
+
+
+def activity_summary(today):
+    """
+    The all-employee attendance / task report of `today`'s month as a DataFrame.
+
+    Runs a fixed number of queries whatever the headcount: employees, the calendar
+    (two), one grouped attendance count, one grouped extra-holiday count and one
+    grouped task-status aggregate. Rows are then joined column-wise by pandas.
+    """
+    month_cal = month_calendar(today.year, today.month)
+
+    employees = pd.DataFrame(
+        list(Employee.objects.order_by('id').values_list('id', 'user__username')),
+        columns=['employee_id', 'employee_name'],
+    ).set_index('employee_id')
+
+    present = grouped_frame(
+        Attendance.objects.filter(**month_cal.range_filter('date')),
+        present=Count('id'),
+    )
+    holidays = extra_holiday_frame(month_cal)
+    tasks = pd.DataFrame.from_dict(Task.objects.status_counts(today), orient='index')
+
+    report = employees.join([present, holidays], how='left')
+    report = report.join(tasks.reindex(columns=list(TASK_COLUMNS.values())), how='left')
+    report = report.fillna(0)
+    numeric = report.columns.drop('employee_name')
+    report[numeric] = report[numeric].astype(int)
+
+    total_holidays = len(month_cal.holidays) + report['extra_holidays'] - report['overlap']
+    workdays = month_cal.total_days - total_holidays
+
+    return pd.DataFrame({
+        "employee_name": report['employee_name'],
+        "total_workdays": workdays,
+        "present": report['present'],
+        "absent": workdays - report['present'],
+        "default_holidays": len(month_cal.default_holidays),
+        "occasional_holidays": len(month_cal.occasional_holidays),
+        "extra_holidays": report['extra_holidays'],
+        "total_holidays": total_holidays,
+        **{column: report[key] for column, key in TASK_COLUMNS.items()},
+    }).reset_index(drop=True)
+
+
+def write_xlsx(output, sheet_name, df):
+    """Write a DataFrame to `output` (a file or HttpResponse) as a single-sheet XLSX."""
+    write_xlsx_rows(output, sheet_name, df.columns, df.values.tolist())
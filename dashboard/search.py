@@ -0,0 +1,100 @@
+"""
+Full-text search over tasks, task history and contact messages.
+
+On SQLite each source table has an FTS5 index (migration 0045): external content
+tables, so the text is not stored twice, kept in sync by the triggers of triggers.py.
+Queries are ranked by a column-weighted bm25 (titles count more than descriptions),
+and each kind is one index query that returns only the top of the ranking, so a
+search reads the posting lists of its words rather than the rows. Other databases
+have no FTS5, so there the tables are scanned with LIKE, newest first.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import MessageBox, Task, TaskHistoryKeeper
+
+# kind -> (model, FTS5 table, indexed columns; the first is the result title)
+SEARCH_KINDS = {
+    'task': (Task, 'dashboard_task_search', ['title', 'description']),
+    'history': (TaskHistoryKeeper, 'dashboard_taskhistorykeeper_search', ['task_title', 'description', 'assigned_to']),
+    'message': (MessageBox, 'dashboard_messagebox_search', ['message']),
+}
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGES = 50
+MAX_SEARCH_TERMS = 8
+TITLE_LENGTH = 120
+SNIPPET_TOKENS = 12
+
+
+def search_terms(text):
+    """The words of a search box, punctuation dropped (so no FTS5 query syntax gets through)."""
+    return re.findall(r'\w+', text or '')[:MAX_SEARCH_TERMS]
+
+
+def match_expression(terms):
+    # Every term must match, each as a prefix: "rep" finds "report"
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _ranked(kind, terms, limit):
+    """[(rank, kind, id, title, snippet)] of the best `limit` matches of one kind."""
+    model, fts, columns = SEARCH_KINDS[kind]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            # Ties go to the newest row, the order search() merges in, so pages never overlap
+            cursor.execute(
+                f"SELECT rank, rowid, {columns[0]}, snippet({fts}, -1, '', '', '…', {SNIPPET_TOKENS}) "
+                f"FROM {fts} WHERE {fts} MATCH %s ORDER BY rank, rowid DESC LIMIT %s",
+                [match_expression(terms), limit],
+            )
+            return [(rank, kind, row_id, title, snippet) for rank, row_id, title, snippet in cursor.fetchall()]
+
+    rows = model.objects.all()
+    for term in terms:
+        rows = rows.filter(reduce(or_, [Q(**{f'{column}__icontains': term}) for column in columns]))
+    rows = rows.order_by('-id').values_list('id', *columns)[:limit]
+    return [(0.0, kind, row[0], row[1], row[-1][:TITLE_LENGTH]) for row in rows]
+
+
+def search(text, kinds=None, page=1, page_size=SEARCH_PAGE_SIZE):
+    """
+    One page of matches for `text` across `kinds` (all of SEARCH_KINDS by default), best
+    first. Returns {'terms', 'page', 'has_next', 'results': [{kind, id, title, snippet, score}]};
+    pages past MAX_SEARCH_PAGES are clamped to it.
+    """
+    terms = search_terms(text)
+    page = min(max(page, 1), MAX_SEARCH_PAGES)
+    if not terms:
+        return {'terms': [], 'page': page, 'has_next': False, 'results': []}
+
+    # Each kind's best page * page_size + 1 rows are enough to merge this page
+    limit = page * page_size + 1
+    matches = []
+    for kind in kinds or SEARCH_KINDS:
+        matches += _ranked(kind, terms, limit)
+    matches.sort(key=lambda match: (match[0], match[1], -match[2]))
+
+    start = (page - 1) * page_size
+    return {
+        'terms': terms,
+        'page': page,
+        'has_next': len(matches) > start + page_size and page < MAX_SEARCH_PAGES,
+        'results': [
+            {'kind': kind, 'id': row_id, 'title': title[:TITLE_LENGTH], 'snippet': snippet, 'score': -rank}
+            for rank, kind, row_id, title, snippet in matches[start:start + page_size]
+        ],
+    }
+
+
+def rebuild_search_index():
+    """Re-read every source table into its FTS5 index (SQLite only); returns the tables rebuilt."""
+    if connection.vendor != 'sqlite':
+        return 0
+    with connection.cursor() as cursor:
+        for _, fts, _ in SEARCH_KINDS.values():
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+    return len(SEARCH_KINDS)
@@ -0,0 +1,39 @@
+from datetime import date
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.dateparse import parse_date
+from django.utils.timezone import localdate
+
+from .deadlines import reschedule_deadlines
+from .models import DefaultHoliday, EmployeeHoliday, MultiDefaultHoliday
+from .month_summary import refresh_month_summaries
+
+
+def _as_date(value):
+    # Views sometimes create holidays straight from the submitted "YYYY-MM-DD" string
+    return value if isinstance(value, date) else parse_date(str(value).strip())
+
+
+@receiver([post_save, post_delete], sender=DefaultHoliday)
+def default_holiday_changed(sender, instance, **kwargs):
+    # The weekly holiday only affects the month that is still open
+    today = localdate()
+    refresh_month_summaries(today.year, today.month)
+    reschedule_deadlines(flag_only=True)
+
+
+@receiver([post_save, post_delete], sender=MultiDefaultHoliday)
+def occasional_holiday_changed(sender, instance, **kwargs):
+    holiday_date = _as_date(instance.holiday_date)
+    if holiday_date:
+        refresh_month_summaries(holiday_date.year, holiday_date.month)
+    # Shared holidays move every sector's workdays; individual leave does not
+    reschedule_deadlines(flag_only=True)
+
+
+@receiver([post_save, post_delete], sender=EmployeeHoliday)
+def employee_holiday_changed(sender, instance, **kwargs):
+    holiday_date = _as_date(instance.holiday_date)
+    if holiday_date:
+        refresh_month_summaries(holiday_date.year, holiday_date.month, [instance.employee_id])
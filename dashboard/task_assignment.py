@@ -0,0 +1,48 @@
+"""
+One task given to many employees at once: picked by hand, or everyone in a sector
+and / or position.
+
+The Task rows go in with bulk_create and the month summaries' ledger and assigned
+counters are written set-based by `record_month_tasks()`, all in one transaction,
+so a company-wide task costs a handful of statements instead of a form post, a
+save() and a summary read-modify-write per employee.
+"""
+from django.db import transaction
+from django.utils.timezone import localdate
+
+from .models import Employee, Task
+from .month_summary import record_month_tasks
+
+
+def assignment_targets(employee_ids=(), sector_id=None, position_id=None):
+    """
+    The employees to assign: `employee_ids` when given, else everyone in the sector
+    and / or position. An Employee queryset, empty when nothing was picked.
+    """
+    if employee_ids:
+        return Employee.objects.filter(id__in=list(employee_ids))
+    if sector_id is None and position_id is None:
+        return Employee.objects.none()
+    employees = Employee.objects.all()
+    if sector_id is not None:
+        employees = employees.filter(sector_id=sector_id)
+    if position_id is not None:
+        employees = employees.filter(position_id=position_id)
+    return employees
+
+
+def assign_task(employees, title, description, start_date, end_date, day=None):
+    """
+    Create the task for every employee of the `employees` queryset and count it in
+    their MonthSummary of `day`'s month (today by default). Returns the new tasks.
+    """
+    day = day or localdate()
+    employee_ids = list(employees.order_by('id').values_list('id', flat=True))
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create([
+            Task(employee_id=employee_id, title=title, description=description,
+                 start_date=start_date, end_date=end_date)
+            for employee_id in employee_ids
+        ])
+        record_month_tasks([(task.employee_id, task) for task in tasks], 'assigned', day)
+    return tasks
@@ -0,0 +1,149 @@
+"""
+Approve, reject or extend many tasks at once.
+
+Each function takes a list of task ids and returns one {task_id, status, detail}
+dict per id, in input order: the new state when the transition applied, 'failed'
+with the reason otherwise (unknown task, not delivered, date not after the
+deadline, ...). The tasks that pass are updated with set-based UPDATEs, their
+month summary counters with `record_month_tasks()`, and a TaskHistoryKeeper row
+per task is written with one bulk_create - all in one transaction, so a review
+of hundreds of delivered tasks is one request.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils.timezone import localdate
+
+from .deadlines import add_business_days, business_calendar, next_workday
+from .models import Task, TaskHistoryKeeper
+from .month_summary import UPDATE_CHUNK_SIZE, record_month_tasks
+
+MAX_TASKS_PER_BATCH = 1000
+
+
+def parse_task_ids(values):
+    """Task ids from request values: ints or comma-separated strings; None for anything else."""
+    ids = []
+    for value in values:
+        for part in str(value).split(','):
+            part = part.strip()
+            if part:
+                ids.append(int(part) if part.isdigit() else None)
+    return ids
+
+
+def _review(task_ids, check):
+    """
+    Load the tasks and sort them into results: `check(task)` returns the reason a task
+    cannot make the transition, or None. Returns (results, tasks that pass).
+    """
+    results = [None] * len(task_ids)
+    wanted = {}
+    for index, task_id in enumerate(task_ids):
+        if task_id is None:
+            results[index] = {'task_id': None, 'status': 'failed', 'detail': "invalid task id"}
+        elif task_id in wanted:
+            results[index] = {'task_id': task_id, 'status': 'failed', 'detail': "repeated in batch"}
+        else:
+            wanted[task_id] = index
+
+    tasks = Task.objects.filter(id__in=list(wanted)).select_related('employee__user').in_bulk()
+    passed = []
+    for task_id, index in wanted.items():
+        task = tasks.get(task_id)
+        reason = "unknown task" if task is None else check(task)
+        if reason:
+            results[index] = {'task_id': task_id, 'status': 'failed', 'detail': reason}
+        else:
+            passed.append((index, task))
+    return results, passed
+
+
+def _history(task, action):
+    user = task.employee.user
+    return TaskHistoryKeeper(
+        task_id=task.id,
+        task_title=task.title,
+        description=task.description,
+        assigned_to=f"{user.first_name} {user.last_name}",
+        start_date=task.start_date,
+        end_date=task.end_date,
+        extended_date=task.extended_date,
+        revision_count=task.revision_count,
+        rejected_count=task.rejected_count,
+        status=task.status(),
+        action_taken=action,
+    )
+
+
+def _update(ids, **values):
+    for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+        Task.objects.filter(id__in=ids[start:start + UPDATE_CHUNK_SIZE]).update(**values)
+
+
+def approve_tasks(task_ids, day=None):
+    """Complete the delivered tasks and count them in their month summaries of `day`'s month (today)."""
+    with transaction.atomic():
+        results, passed = _review(task_ids, lambda task: None if task.is_delivered else (
+            "already completed" if task.is_completed else "not delivered"
+        ))
+        _update([task.id for _, task in passed], is_completed=True, is_delivered=False)
+        for index, task in passed:
+            task.is_completed, task.is_delivered = True, False
+            results[index] = {'task_id': task.id, 'status': 'approved', 'detail': task.title}
+        record_month_tasks([(task.employee_id, task) for _, task in passed], 'completed', day or localdate())
+        TaskHistoryKeeper.objects.bulk_create([_history(task, 'Approved') for _, task in passed])
+    return results
+
+
+def reject_tasks(task_ids):
+    """Send the delivered tasks back to their employees, counting the rejection."""
+    with transaction.atomic():
+        results, passed = _review(task_ids, lambda task: None if task.is_delivered else (
+            "already completed" if task.is_completed else "not delivered"
+        ))
+        _update([task.id for _, task in passed], is_delivered=False, rejected_count=F('rejected_count') + 1)
+        for index, task in passed:
+            task.is_delivered = False
+            task.rejected_count += 1
+            results[index] = {'task_id': task.id, 'status': 'rejected', 'detail': task.title}
+        TaskHistoryKeeper.objects.bulk_create([_history(task, 'Rejected') for _, task in passed])
+    return results
+
+
+def extend_tasks(task_ids, new_end_date=None, business_days=None, today=None):
+    """
+    Move the deadlines of open tasks: to `new_end_date` (the next workday if it is a
+    day off), or `business_days` workdays after each task's deadline - or after today
+    for overdue tasks. Counts a revision, like a single extension. One UPDATE per
+    distinct new deadline.
+    """
+    today = today or localdate()
+    with transaction.atomic():
+        results, passed = _review(task_ids, lambda task: "already completed" if task.is_completed else None)
+        calendar = business_calendar()
+        if business_days is not None:
+            starts = [max(task.end_date, today) for _, task in passed]
+            new_dates = add_business_days(starts, business_days, calendar).tolist() if passed else []
+        else:
+            new_dates = [next_workday(new_end_date, calendar)] * len(passed)
+
+        by_date = defaultdict(list)
+        extended = []
+        for (index, task), new_date in zip(passed, new_dates):
+            if new_date < today:
+                results[index] = {'task_id': task.id, 'status': 'failed', 'detail': "Extended date must be greater than or equal today."}
+            elif new_date <= task.end_date:
+                results[index] = {'task_id': task.id, 'status': 'failed', 'detail': "Extended date must be greater than the current end date."}
+            else:
+                by_date[new_date].append(task.id)
+                task.end_date = task.extended_date = new_date
+                task.revision_count += 1
+                extended.append(task)
+                results[index] = {'task_id': task.id, 'status': 'extended', 'detail': new_date.isoformat()}
+        for new_date, ids in by_date.items():
+            _update(ids, end_date=new_date, extended_date=new_date,
+                    revision_count=F('revision_count') + 1, deadline_flagged_at=None)
+        TaskHistoryKeeper.objects.bulk_create([_history(task, 'Extended') for task in extended])
+    return results
@@ -1,3 +1,1200 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
 
-# Create your tests here.
+import openpyxl
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.timezone import localdate, localtime
+
+from .analytics import cube_slice, refresh_stale_cells
+from .attendance import archive_attendance, check_in, check_out, ingest_events
+from .deadlines import add_business_days, business_calendar, due_date, next_workday, reschedule_deadlines
+from .export_jobs import ARTIFACT_MAX_AGE, EXPORT_KINDS, cache_key, enqueue_export, run_worker
+from .exports import EXPORT_CHUNK_SIZE
+from .holiday_calendar import MonthCalendar, expand_holiday_dates, month_calendar, weekmask_for
+from .holiday_index import add_occasional_holidays, coverage_forecast, employees_off
+from .models import (
+    Attendance, AttendanceArchive, AttendanceTimeSettings, DefaultHoliday, Employee, EmployeeHoliday, ExportJob, HolidayIndexEntry, MessageBox, MonthSummary,
+    MonthSummaryTask, MultiDefaultHoliday, Position, Sector, SummaryCubeStaleMonth, TableVersion, Task, TaskHistoryKeeper, TASK_STATUSES,
+)
+from .management.commands.backfill_month_tasks import parse_task_list
+from .month_rebuild import check_month, month_range, rebuild_month_summaries
+from .month_summary import close_month, record_month_task, summary_filters
+from .presence import absence_streaks, absent_on, coverage_heatmap, daily_headcount
+from .reports import activity_summary
+from .search import rebuild_search_index, search
+from .task_assignment import assign_task, assignment_targets
+from .task_review import approve_tasks
+from .timesheet import check_in_rows, employee_timesheets
+from .triggers import TRIGGER_GROUPS, drop_before_migrate, install_after_migrate
+
+
+class MonthCalendarTests(TestCase):
+    def test_weekmask_switches_off_default_day(self):
+        self.assertEqual(weekmask_for('friday'), '1111011')
+        self.assertEqual(weekmask_for(None), '1111111')
+
+    def test_default_and_occasional_holidays(self):
+        # February 2025 has four Fridays; the 7th and 21st are also occasional holidays
+        cal = MonthCalendar(2025, 2, 'friday', [date(2025, 2, 7), date(2025, 2, 21), date(2025, 2, 10), date(2025, 3, 1)])
+        self.assertEqual(cal.total_days, 28)
+        self.assertEqual(len(cal.default_holidays), 4)
+        self.assertEqual(len(cal.occasional_holidays), 3)
+        self.assertEqual(len(cal.holidays), 5)
+        self.assertEqual(cal.workdays, 23)
+
+    def test_employee_summary_matches_summarize(self):
+        cal = MonthCalendar(2025, 2, 'friday', [date(2025, 2, 10)])
+        extra = [date(2025, 2, 3), date(2025, 2, 3), date(2025, 2, 14), date(2025, 1, 30)]
+        single = cal.employee_summary(extra)
+        self.assertEqual(single['extra_holidays'], ['2025-02-03 (Monday)', '2025-02-14 (Friday)'])
+        self.assertEqual(single['total_holidays'], 6)
+        self.assertEqual(single['workdays'], 22)
+
+        summary = cal.summarize([7, 3], [(3, d) for d in extra] + [(99, date(2025, 2, 4))])
+        self.assertEqual(summary['extra_holidays'].tolist(), [0, 2])
+        self.assertEqual(summary['total_holidays'].tolist(), [5, 6])
+        self.assertEqual(summary['workdays'].tolist(), [23, 22])
+
+    def test_month_calendar_reads_holiday_tables(self):
+        DefaultHoliday.objects.create(day='sunday')
+        MultiDefaultHoliday.objects.create(holiday_date=date(2024, 12, 25))
+        MultiDefaultHoliday.objects.create(holiday_date=date(2025, 1, 1))
+        cal = month_calendar(2024, 12)
+        self.assertEqual(cal.occasional_holidays.tolist(), [date(2024, 12, 25)])
+        self.assertEqual(cal.workdays, 31 - 5 - 1)
+
+        user = User.objects.create_user('alice')
+        employee = Employee.objects.create(user=user)
+        EmployeeHoliday.objects.create(employee=employee, holiday_date=date(2024, 12, 2))
+        summary = cal.summarize([employee.id], EmployeeHoliday.objects.values_list('employee_id', 'holiday_date'))
+        self.assertEqual(summary['workdays'].tolist(), [24])
+
+
+class MonthScopedQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('bob', password='secret')
+        self.employee = Employee.objects.create(user=self.user)
+        self.today = localdate()
+        last_month = self.today.replace(day=1) - timedelta(days=1)
+
+        old = Attendance.objects.create(employee=self.employee)
+        Attendance.objects.filter(pk=old.pk).update(date=last_month)
+        Attendance.objects.create(employee=self.employee)
+        EmployeeHoliday.objects.create(employee=self.employee, holiday_date=last_month)
+
+    def test_dashboard_counts_only_current_month(self):
+        self.client.login(username='bob', password='secret')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['present_count'], 1)
+        self.assertEqual(response.context['extra_holiday_count'], 0)
+
+    def test_admin_dashboard_lists_only_this_months_occasional_holidays(self):
+        next_month = (self.today.replace(day=1) + timedelta(days=32)).replace(day=1)
+        MultiDefaultHoliday.objects.create(holiday_date=self.today)
+        MultiDefaultHoliday.objects.create(holiday_date=next_month)
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual([label.split(' ')[0] for label in response.context['occasional_holi_days']], [str(self.today)])
+
+
+class MonthSummaryRefreshTests(TestCase):
+    def setUp(self):
+        self.today = localdate()
+        self.admin = User.objects.create_user('admin', password='secret', is_staff=True)
+        self.employee = Employee.objects.create(user=User.objects.create_user('carol'))
+        self.summary = MonthSummary.objects.create(
+            month=self.today.strftime("%B"), year=self.today.year, employee_id=self.employee.id,
+            employee_name='carol', total_workdays=0, total_present_days=0,
+            total_holidays_taken=0, total_occasional_holidays=0,
+        )
+
+    def test_holiday_changes_refresh_summary(self):
+        month_cal = month_calendar(self.today.year, self.today.month)
+        holiday = EmployeeHoliday.objects.create(employee=self.employee, holiday_date=self.today)
+        self.summary.refresh_from_db()
+        self.assertEqual(self.summary.total_holidays_taken, 1)
+        self.assertEqual(self.summary.total_workdays, month_cal.employee_summary([self.today])['workdays'])
+
+        holiday.delete()
+        MultiDefaultHoliday.objects.create(holiday_date=self.today)
+        self.summary.refresh_from_db()
+        self.assertEqual(self.summary.total_holidays_taken, 0)
+        self.assertEqual(self.summary.total_occasional_holidays, 1)
+
+    def test_holiday_submissions_are_one_insert_and_ignore_repeats(self):
+        first = self.today.replace(day=1)
+        third = self.today.replace(day=3)
+        self.assertEqual(expand_holiday_dates([f"{third}, {first}..{third}", ""]),
+                         [first, first.replace(day=2), third])
+        with self.assertRaises(ValueError):
+            expand_holiday_dates(f"{third}..{first}")
+
+        self.client.login(username='admin', password='secret')
+        form = {'employee': self.employee.id, 'holiday_dates': f"{first}..{third}", 'employee_holiday': ''}
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(reverse('dashboard'), form)
+            self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('INSERT')]), 1)
+        self.client.post(reverse('dashboard'), {'holiday_dates': f"{first}, {first}", 'occasional_holidays': ''})
+        self.assertEqual(EmployeeHoliday.objects.count(), 3)
+        self.assertEqual(MultiDefaultHoliday.objects.count(), 1)
+        self.summary.refresh_from_db()
+        self.assertEqual((self.summary.total_holidays_taken, self.summary.total_occasional_holidays), (3, 1))
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            MultiDefaultHoliday.objects.create(holiday_date=first)
+
+        # A team at once through add_employee_holiday
+        other = Employee.objects.create(user=User.objects.create_user('dave'))
+        self.client.post(reverse('add_employee_holiday'), {
+            'employee_id': [self.employee.id, other.id], 'holiday_dates': [f"{third}..{self.today.replace(day=4)}"],
+        })
+        self.assertEqual(EmployeeHoliday.objects.filter(employee=other).count(), 2)
+        self.assertEqual(EmployeeHoliday.objects.filter(employee=self.employee).count(), 4)
+
+    def test_dashboard_get_is_read_only(self):
+        MonthSummary.objects.filter(pk=self.summary.pk).update(total_workdays=99)
+        self.client.login(username='admin', password='secret')
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        self.summary.refresh_from_db()
+        self.assertEqual(self.summary.total_workdays, 99)
+
+
+class ConcurrentCheckInTests(TransactionTestCase):
+    THREADS = 16
+    EMPLOYEES = 20
+    TAPS_PER_EMPLOYEE = 15
+
+    def test_simultaneous_check_ins_are_counted_exactly(self):
+        today = localdate()
+        employees = [
+            Employee.objects.create(user=User.objects.create_user(f'worker{i}'))
+            for i in range(self.EMPLOYEES)
+        ]
+        for employee in employees:
+            MonthSummary.objects.create(
+                month=today.strftime("%B"), year=today.year, employee_id=employee.id,
+                employee_name=employee.user.username, total_workdays=0, total_present_days=0,
+                total_holidays_taken=0, total_occasional_holidays=0,
+            )
+
+        taps = [employee for employee in employees for _ in range(self.TAPS_PER_EMPLOYEE)]
+        barrier = threading.Barrier(self.THREADS)
+
+        def tap(employee):
+            try:
+                return check_in(employee, today, localtime().time()) is not None
+            finally:
+                connection.close()
+
+        def worker(chunk):
+            barrier.wait()
+            return [tap(employee) for employee in chunk]
+
+        chunks = [taps[i::self.THREADS] for i in range(self.THREADS)]
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            results = [ok for chunk in pool.map(worker, chunks) for ok in chunk]
+
+        self.assertEqual(sum(results), self.EMPLOYEES)
+        self.assertEqual(Attendance.objects.filter(date=today).count(), self.EMPLOYEES)
+        self.assertEqual(
+            sorted(MonthSummary.objects.values_list('total_present_days', flat=True)),
+            [1] * self.EMPLOYEES,
+        )
+
+
+@override_settings(ATTENDANCE_DEVICE_TOKEN='reader-secret')
+class AttendanceEventsApiTests(TestCase):
+    def setUp(self):
+        self.today = localdate()
+        self.employees = [
+            Employee.objects.create(user=User.objects.create_user(f'badge{i}')) for i in range(3)
+        ]
+        # Keep the test independent of the weekday it runs on
+        DefaultHoliday.objects.create(day=(self.today + timedelta(days=1)).strftime('%A').lower())
+        EmployeeHoliday.objects.create(employee=self.employees[2], holiday_date=self.today)
+
+    def post(self, events, token='reader-secret'):
+        return self.client.post(
+            reverse('attendance_events_api'), data=json.dumps({'events': events}),
+            content_type='application/json', headers={'X-Device-Token': token},
+        )
+
+    def stamp(self, hour):
+        return datetime.combine(self.today, time(hour, 0)).isoformat()
+
+    def test_rejects_bad_token(self):
+        self.assertEqual(self.post([], token='nope').status_code, 403)
+
+    def test_batch_is_applied_once(self):
+        first, second, on_leave = self.employees
+        events = [
+            {'event_id': 'a1', 'employee_id': first.id, 'kind': 'in', 'timestamp': self.stamp(9)},
+            {'event_id': 'a2', 'employee_id': first.id, 'kind': 'out', 'timestamp': self.stamp(17)},
+            {'event_id': 'b1', 'employee_id': second.id, 'kind': 'in', 'timestamp': self.stamp(10)},
+            {'event_id': 'b2', 'employee_id': second.id, 'kind': 'in', 'timestamp': self.stamp(11)},
+            {'event_id': 'c1', 'employee_id': on_leave.id, 'kind': 'in', 'timestamp': self.stamp(9)},
+            {'event_id': 'd1', 'employee_id': 999999, 'kind': 'in', 'timestamp': self.stamp(9)},
+            {'event_id': 'e1', 'employee_id': first.id, 'kind': 'sideways', 'timestamp': self.stamp(9)},
+        ]
+        response = self.post(events)
+        self.assertEqual(response.status_code, 200)
+        statuses = [result['status'] for result in response.json()['results']]
+        self.assertEqual(statuses, ['recorded', 'recorded', 'recorded', 'duplicate', 'rejected', 'rejected', 'rejected'])
+
+        # A retried batch replays the stored outcomes and writes nothing new
+        retry = self.post(events).json()['results']
+        self.assertEqual([result['status'] for result in retry], statuses)
+
+        self.assertEqual(Attendance.objects.count(), 2)
+        self.assertEqual(Attendance.objects.get(employee=first).quit_time, time(17, 0))
+        self.assertEqual(
+            MonthSummary.objects.get(employee_id=first.id, month=self.today.strftime('%B'), year=self.today.year).total_present_days,
+            1,
+        )
+
+
+class AttendanceArchiveTests(TestCase):
+    def test_month_close_moves_closed_months_to_archive(self):
+        today = localdate()
+        first_day = today.replace(day=1)
+        employee = Employee.objects.create(user=User.objects.create_user('dave'))
+        for day in (first_day - timedelta(days=40), first_day - timedelta(days=1), today):
+            Attendance.objects.create(employee=employee, date=day, time=time(9, 0))
+
+        self.assertEqual(archive_attendance(before=first_day, chunk_size=1), 2)
+        self.assertEqual(list(Attendance.objects.values_list('date', flat=True)), [today])
+        self.assertEqual(AttendanceArchive.objects.count(), 2)
+        self.assertEqual(archive_attendance(before=first_day), 0)
+
+        # Timesheets and the attendance detail page still see the archived days
+        history = check_in_rows(first_day - timedelta(days=60), today + timedelta(days=1), [employee.id])
+        self.assertEqual(sorted(row[1] for row in history),
+                         [str(first_day - timedelta(days=40)), str(first_day - timedelta(days=1)), str(today)])
+
+
+class TaskStatusAnnotationTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.employee = Employee.objects.create(user=User.objects.create_user('erin'))
+        past, future = self.today - timedelta(days=3), self.today + timedelta(days=3)
+        for end_date, fields in [
+            (past, {'is_completed': True}),
+            (past, {'is_delivered': True}),
+            (past, {'extended_date': future, 'revision_count': 2}),
+            (past, {}),
+            (past, {}),
+            (future, {}),
+        ]:
+            Task.objects.create(employee=self.employee, title="t", description="d",
+                                start_date=past, end_date=end_date, **fields)
+
+    def test_annotation_matches_status_method(self):
+        for task in Task.objects.with_status(self.today):
+            self.assertEqual(task.status_label, task.status().split(' (')[0])
+
+    def test_status_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = Task.objects.status_counts(self.today)
+        self.assertEqual(counts[self.employee.id], {
+            'total': 6, 'date_over': 2, 'pending_approval': 1, 'in_revision': 1, 'in_process': 1, 'completed': 1,
+        })
+
+    def test_task_board_filters_and_sorts_by_status(self):
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        response = self.client.get(reverse('view_all_tasks'), {'status': 'Date Over'})
+        self.assertEqual({task.status_label for task in response.context['tasks']}, {'Date Over'})
+        self.assertEqual(len(response.context['tasks']), 2)
+
+        response = self.client.get(reverse('view_all_tasks'), {'sort': 'status'})
+        ranks = [task.status_rank for task in response.context['tasks']]
+        self.assertEqual(ranks, sorted(ranks))
+
+
+class TaskBoardTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.employee = Employee.objects.create(user=User.objects.create_user('erin'))
+        past, future = self.today - timedelta(days=3), self.today + timedelta(days=3)
+        # One task per status, two of them past their deadline
+        for end_date, fields in [
+            (past, {'is_completed': True}),
+            (past, {'is_delivered': True}),
+            (past, {'extended_date': future, 'revision_count': 2}),
+            (past, {}),
+            (past, {}),
+            (future, {}),
+        ]:
+            Task.objects.create(employee=self.employee, title="t", description="d",
+                                start_date=past, end_date=end_date, **fields)
+
+    def test_status_label_filter_matches_annotation(self):
+        tasks = Task.objects.with_status(self.today)
+        for label in TASK_STATUSES:
+            self.assertEqual(
+                set(tasks.with_status_label(label, self.today).values_list('id', flat=True)),
+                set(tasks.filter(status_label=label).values_list('id', flat=True)),
+            )
+
+    def test_task_board_pages_by_deadline_with_filters(self):
+        sales = Sector.objects.create(sector="Sales")
+        other = Employee.objects.create(user=User.objects.create_user('finn'), sector=sales)
+        Task.objects.create(employee=other, title="t", description="d", start_date=self.today, end_date=self.today)
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        url = reverse('view_all_tasks')
+
+        seen, params = [], {}
+        with mock.patch('dashboard.views.TASK_PAGE_SIZE', 2):
+            while True:
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, params)
+                seen += [(task.end_date, task.id) for task in response.context['tasks']]
+                if not response.context['next_cursor']:
+                    break
+                params = {'after': response.context['next_cursor']}
+                self.assertLessEqual(len(queries), 8)  # constant per page, not per task
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 7)
+
+        def ids(**params):
+            return {task.id for task in self.client.get(url, params).context['tasks']}
+        self.assertEqual(ids(employee='finn'), set(other.task_set.values_list('id', flat=True)))
+        self.assertEqual(ids(employee=str(other.id)), ids(sector=str(sales.id)))
+        # Past the deadline, not delivered and not extended: what the status badge calls "Date Over"
+        self.assertEqual(ids(overdue='1'), ids(status="Date Over"))
+        self.assertEqual(len(ids(overdue='1')), 2)
+        self.assertEqual(len(ids(**{'from': self.today.isoformat(), 'to': self.today.isoformat()})), 1)
+        self.assertEqual(len(ids(**{'from': '2025-02-30'})), 7)  # impossible dates are ignored
+
+
+class DeadlineTests(TestCase):
+    def setUp(self):
+        DefaultHoliday.objects.create(day='friday')
+        MultiDefaultHoliday.objects.create(holiday_date=date(2025, 3, 11))
+        self.sales = Sector.objects.create(sector="Sales")
+        self.ann = Employee.objects.create(user=User.objects.create_user('ann'), sector=self.sales)
+        self.ben = Employee.objects.create(user=User.objects.create_user('ben'))
+
+    def task(self, employee, end_date, **fields):
+        return Task.objects.create(employee=employee, title="t", description="d",
+                                   start_date=date(2025, 3, 3), end_date=end_date, **fields)
+
+    def test_due_dates_skip_days_off(self):
+        with self.assertNumQueries(2):
+            calendar = business_calendar()
+        due = add_business_days([date(2025, 3, 6), date(2025, 3, 7), date(2025, 3, 10)], [1, 0, 2], calendar)
+        # Thu + 1 skips Friday; Friday rolls to Saturday; Mon + 2 skips the occasional holiday
+        self.assertEqual(due.tolist(), [date(2025, 3, 8), date(2025, 3, 8), date(2025, 3, 13)])
+        self.assertEqual(next_workday(date(2025, 3, 11), calendar), date(2025, 3, 12))
+
+    def test_deadlines_on_days_off_are_moved_or_flagged_per_sector(self):
+        friday = self.task(self.ann, date(2025, 3, 7), extended_date=date(2025, 3, 7), revision_count=1)
+        holiday = self.task(self.ann, date(2025, 3, 11))
+        workday = self.task(self.ann, date(2025, 3, 10))
+        done = self.task(self.ann, date(2025, 3, 7), is_completed=True)
+        other_sector = self.task(self.ben, date(2025, 3, 7))
+
+        self.assertEqual(reschedule_deadlines(self.sales.id, today=date(2025, 3, 3), flag_only=True), 2)
+        self.assertEqual(set(Task.objects.filter(deadline_flagged_at__isnull=False).values_list('id', flat=True)),
+                         {friday.id, holiday.id})
+        MultiDefaultHoliday.objects.all().delete()
+        reschedule_deadlines(self.sales.id, today=date(2025, 3, 3), flag_only=True)
+        self.assertEqual(list(Task.objects.filter(deadline_flagged_at__isnull=False).values_list('id', flat=True)),
+                         [friday.id])
+
+        with self.assertNumQueries(6):  # Last deadline, calendar (2), one UPDATE in a transaction
+            self.assertEqual(reschedule_deadlines(self.sales.id, today=date(2025, 3, 3)), 1)
+        friday.refresh_from_db()
+        self.assertEqual((friday.end_date, friday.extended_date, friday.deadline_flagged_at),
+                         (date(2025, 3, 8), date(2025, 3, 8), None))
+        self.assertEqual(list(Task.objects.filter(id__in=[holiday.id, workday.id, done.id, other_sector.id])
+                              .values_list('end_date', flat=True)),
+                         [date(2025, 3, 11), date(2025, 3, 10), date(2025, 3, 7), date(2025, 3, 7)])
+
+    def test_holiday_changes_flag_deadlines_on_their_own(self):
+        day = localdate() + timedelta(days=10)
+        if day.weekday() == 4:  # Not the default Friday holiday
+            day += timedelta(days=1)
+        task = self.task(self.ben, day)
+        flagged = lambda: Task.objects.filter(id=task.id, deadline_flagged_at__isnull=False).exists()
+
+        add_occasional_holidays([day])
+        self.assertTrue(flagged())
+        MultiDefaultHoliday.objects.filter(holiday_date=day).delete()
+        self.assertFalse(flagged())
+        default_holiday = DefaultHoliday.objects.get()
+        default_holiday.day = day.strftime('%A').lower()
+        default_holiday.save()
+        self.assertTrue(flagged())
+        self.assertEqual(Task.objects.get(id=task.id).end_date, day)  # Flagged, not moved
+
+    def test_extension_in_workdays(self):
+        task = self.task(self.ann, localdate())
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        self.client.post(reverse('extend_task_date', args=[task.id]), {'business_days': '3'})
+        task.refresh_from_db()
+        self.assertEqual(task.end_date, due_date(localdate(), 3))
+        self.assertEqual(task.revision_count, 1)
+
+
+class TaskBatchReviewTests(TestCase):
+    def setUp(self):
+        self.today = localdate()
+        self.employees = [Employee.objects.create(user=User.objects.create_user(name, first_name=name)) for name in ('ivy', 'jon')]
+        self.tasks = [
+            Task.objects.create(employee=self.employees[n % 2], title=f"t{n}", description="d", start_date=self.today,
+                                end_date=self.today, is_delivered=n < 4)
+            for n in range(5)
+        ]
+        self.ids = [task.id for task in self.tasks]
+
+    def test_batch_approve_reports_each_task_and_counts_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            results = approve_tasks([self.ids[0], self.ids[1], self.ids[0], self.ids[4], 999999, None])
+        self.assertEqual([result['status'] for result in results],
+                         ['approved', 'approved', 'failed', 'failed', 'failed', 'failed'])
+        self.assertEqual([result['detail'] for result in results[2:]],
+                         ["repeated in batch", "not delivered", "unknown task", "invalid task id"])
+        writes = [q['sql'].split()[0] for q in queries.captured_queries if q['sql'].split()[0] in ('INSERT', 'UPDATE')]
+        # Tasks, summaries, ledger, counters, history
+        self.assertEqual(writes, ['UPDATE', 'INSERT', 'INSERT', 'UPDATE', 'INSERT'])
+
+        self.assertEqual(set(Task.objects.filter(is_completed=True).values_list('id', flat=True)), set(self.ids[:2]))
+        self.assertEqual(sorted(MonthSummary.objects.values_list('total_task_completed', flat=True)), [1, 1])
+        self.assertEqual(set(TaskHistoryKeeper.objects.values_list('task_id', 'action_taken', 'status')),
+                         {(self.ids[0], 'Approved', 'Completed'), (self.ids[1], 'Approved', 'Completed')})
+        self.assertEqual(approve_tasks([self.ids[0]])[0]['detail'], "already completed")
+
+    def test_batch_approve_skips_tasks_already_in_the_ledger(self):
+        record_month_task(self.employees[0].id, self.tasks[2], 'completed', self.today)
+        results = approve_tasks(self.ids[2:4])
+        self.assertEqual([result['status'] for result in results], ['approved', 'approved'])
+        self.assertEqual(list(MonthSummary.objects.order_by('employee_id').values_list('total_task_completed', flat=True)), [1, 1])
+        self.assertEqual(MonthSummaryTask.objects.filter(kind='completed').count(), 2)
+
+    def test_batch_endpoints_reject_and_extend(self):
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        json_accept = {'HTTP_ACCEPT': 'application/json'}
+        data = self.client.post(reverse('task_batch_action', args=['reject']),
+                                {'task_ids': f"{self.ids[2]},{self.ids[3]},{self.ids[4]}"}, **json_accept).json()
+        self.assertEqual((data['done'], data['failed']), (2, 1))
+        self.assertEqual(list(Task.objects.filter(id__in=self.ids[2:4]).values_list('rejected_count', 'is_delivered')),
+                         [(1, False), (1, False)])
+
+        data = self.client.post(reverse('task_batch_action', args=['extend']),
+                                {'task_ids': self.ids[2:], 'business_days': '2'}, **json_accept).json()
+        self.assertEqual(data['done'], 3)
+        self.assertEqual(set(Task.objects.filter(id__in=self.ids[2:]).values_list('end_date', 'revision_count')),
+                         {(due_date(self.today, 2), 1)})
+        self.assertEqual(TaskHistoryKeeper.objects.filter(action_taken='Extended').count(), 3)
+
+        response = self.client.post(reverse('task_batch_action', args=['extend']),
+                                    {'task_ids': self.ids[2:], 'new_end_date': str(self.today)}, **json_accept)
+        self.assertEqual({result['status'] for result in response.json()['results']}, {'failed'})
+        self.assertEqual(self.client.post(reverse('task_batch_action', args=['approve']), {}, **json_accept).status_code, 400)
+
+    def test_impossible_dates_are_refused_not_errors(self):
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        response = self.client.post(reverse('task_batch_action', args=['extend']),
+                                    {'task_ids': self.ids[2:], 'new_end_date': '2025-02-30'}, HTTP_ACCEPT='application/json')
+        self.assertEqual((response.status_code, response.json()['error']), (400, "Invalid date."))
+        response = self.client.post(reverse('extend_task_date', args=[self.ids[2]]), {'new_end_date': '2025-02-30'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Invalid date.")
+        self.assertEqual(Task.objects.get(id=self.ids[2]).revision_count, 0)
+
+
+class ActivitySummaryReportTests(TestCase):
+    def test_fixed_query_count_and_figures(self):
+        today = localdate()
+        DefaultHoliday.objects.create(day='friday')
+        month_cal = month_calendar(today.year, today.month)
+        workday = next(day for day in range(1, 29) if not month_cal.is_holiday(today.replace(day=day)))
+        shared_holiday = next(day for day in range(1, 29) if month_cal.is_holiday(today.replace(day=day)))
+
+        def add_employees(count):
+            for _ in range(count):
+                employee = Employee.objects.create(user=User.objects.create_user(f'user{Employee.objects.count()}'))
+                Attendance.objects.create(employee=employee, date=today.replace(day=workday), time=time(9, 0))
+                EmployeeHoliday.objects.create(employee=employee, holiday_date=today.replace(day=workday))
+                EmployeeHoliday.objects.create(employee=employee, holiday_date=today.replace(day=shared_holiday))
+                Task.objects.create(employee=employee, title="t", description="d", start_date=today,
+                                    end_date=today + timedelta(days=1), is_completed=True)
+            return Employee.objects.count()
+
+        add_employees(2)
+        with self.assertNumQueries(6):
+            small = activity_summary(today)
+        add_employees(8)
+        with self.assertNumQueries(6):
+            report = activity_summary(today)
+
+        self.assertEqual(len(small), 2)
+        self.assertEqual(len(report), 10)
+        row = report.iloc[0]
+        self.assertEqual(row['present'], 1)
+        self.assertEqual(row['extra_holidays'], 2)
+        self.assertEqual(row['total_holidays'], len(month_cal.holidays) + 1)
+        self.assertEqual(row['total_workdays'], month_cal.workdays - 1)
+        self.assertEqual(row['absent'], month_cal.workdays - 2)
+        self.assertEqual((row['total_tasks'], row['completed_tasks'], row['date_over_tasks']), (1, 1, 0))
+
+
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        today = date.today()
+        TaskHistoryKeeper.objects.bulk_create([
+            TaskHistoryKeeper(task_id=i, task_title=f"Task {i}", description="d", assigned_to="erin",
+                              start_date=today, end_date=today, status="Completed", action_taken="Approved")
+            for i in range(EXPORT_CHUNK_SIZE + 5)
+        ])
+
+    def test_task_history_csv_streams_every_row(self):
+        response = self.client.get(reverse('export_task_history'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ["Task ID", "Title", "Description"])
+        self.assertEqual(len(lines), EXPORT_CHUNK_SIZE + 6)
+        self.assertIn("N/A", lines[1])
+
+    def test_task_history_xlsx_is_a_readable_workbook(self):
+        response = self.client.get(reverse('export_task_history'))
+        self.assertTrue(response.streaming)
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook["Task History"].values)
+        self.assertEqual(len(rows), EXPORT_CHUNK_SIZE + 6)
+        self.assertEqual(rows[1][:2], (0, "Task 0"))
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        export_root = tempfile.TemporaryDirectory()
+        self.addCleanup(export_root.cleanup)
+        self.settings_override = override_settings(EXPORT_ROOT=export_root.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.export_root = export_root.name
+        self.add_history(3)
+
+    def add_history(self, count):
+        today = date.today()
+        TaskHistoryKeeper.objects.bulk_create([
+            TaskHistoryKeeper(task_id=i, task_title=f"Task {i}", description="d", assigned_to="erin",
+                              start_date=today, end_date=today, status="Completed", action_taken="Approved")
+            for i in range(count)
+        ])
+
+    def test_every_export_kind_is_a_job_choice(self):
+        self.assertEqual({kind for kind, _ in ExportJob._meta.get_field('kind').choices}, set(EXPORT_KINDS))
+        job = enqueue_export('payroll', 'csv')
+        job.full_clean()
+        self.assertEqual(job.get_kind_display(), "Payroll")
+
+    def test_worker_builds_once_and_serves_cached_artifact_until_data_changes(self):
+        job = enqueue_export('task_history', 'csv')
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(enqueue_export('task_history', 'csv').id, job.id)  # Already queued
+
+        self.assertEqual(run_worker(once=True, log=lambda message: None), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        with open(os.path.join(self.export_root, job.file_name), encoding='utf-8') as artifact:
+            self.assertEqual(len(artifact.read().splitlines()), 4)
+
+        # Unchanged data: done straight away, nothing left for the worker
+        cached = enqueue_export('task_history', 'csv')
+        self.assertEqual((cached.status, cached.file_name), ('done', job.file_name))
+        self.assertEqual(run_worker(once=True, log=lambda message: None), 0)
+
+        # bulk_create bypasses signals but still bumps the table version
+        self.add_history(1)
+        fresh = enqueue_export('task_history', 'csv')
+        self.assertEqual(fresh.status, 'queued')
+        run_worker(once=True, log=lambda message: None)
+        fresh.refresh_from_db()
+        self.assertNotEqual(fresh.file_name, job.file_name)
+        self.assertEqual(os.listdir(self.export_root), [fresh.file_name])  # Stale artifact pruned
+
+    def test_artifacts_of_other_scopes_are_pruned_by_age(self):
+        # Yesterday's activity summary: no key names it again
+        old = os.path.join(self.export_root, 'activity_summary-2025-03-02-csv-0123456789abcdef.csv')
+        recent = os.path.join(self.export_root, 'month_summary-from2025-01-csv-0123456789abcdef.csv')
+        for path in (old, recent):
+            open(path, 'w').close()
+        expired = (timezone.now() - ARTIFACT_MAX_AGE - timedelta(minutes=1)).timestamp()
+        os.utime(old, (expired, expired))
+
+        enqueue_export('task_history', 'csv')
+        run_worker(once=True, log=lambda message: None)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_request_status_and_download(self):
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        response = self.client.post(reverse('request_export', args=['month_summary']), {'format': 'xlsx'},
+                                    HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+
+        run_worker(once=True, log=lambda message: None)
+        status = self.client.get(reverse('export_job_status', args=[job_id])).json()
+        self.assertEqual(status['status'], 'done')
+
+        response = self.client.get(status['download_url'])
+        self.assertIn(f'month_summary_{date.today().strftime("%B")}', response['Content-Disposition'])
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        self.assertEqual(next(workbook["Month Summary"].values)[0], 'Employee Name')
+
+        response = self.client.post(reverse('request_export', args=['activity_summary']))
+        self.assertRedirects(response, reverse('export_job_detail', args=[ExportJob.objects.latest('id').id]))
+
+
+class TriggerRegistryTests(TestCase):
+    def installed(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            return {name for name, in cursor.fetchall()}
+
+    def test_migrate_run_drops_and_reinstalls_every_trigger(self):
+        registered = {name for _, triggers, _ in TRIGGER_GROUPS.values() for name in triggers}
+        self.assertLessEqual(registered, self.installed())
+        version = lambda: TableVersion.objects.get(table_name='dashboard_task').version
+        employee = Employee.objects.create(user=User.objects.create_user('nia'))
+
+        drop_before_migrate(using='default')
+        self.assertFalse(registered & self.installed())
+        before = version()
+        Task.objects.create(employee=employee, title="t", description="d", start_date=date(2025, 3, 3), end_date=date(2025, 3, 3))
+        self.assertEqual(version(), before)  # Missed while the triggers were off...
+
+        install_after_migrate(using='default', plan=[('migration', False)])
+        self.assertLessEqual(registered, self.installed())
+        self.assertEqual(version(), before + 1)  # ...and caught up
+        Task.objects.filter(employee=employee).update(title="u")
+        self.assertEqual(version(), before + 2)
+
+
+class MonthTaskLedgerTests(TestCase):
+    def setUp(self):
+        self.today = localdate()
+        self.employee = Employee.objects.create(user=User.objects.create_user('frank'))
+        self.task = Task.objects.create(employee=self.employee, title="Quarterly report, draft", description="d",
+                                        start_date=self.today, end_date=self.today)
+
+    def summary(self):
+        return MonthSummary.objects.prefetch_related('task_entries').get(employee_id=self.employee.id)
+
+    def test_record_is_atomic_and_idempotent(self):
+        self.assertTrue(record_month_task(self.employee.id, self.task, 'assigned', self.today))
+        self.assertFalse(record_month_task(self.employee.id, self.task, 'assigned', self.today))
+        self.assertTrue(record_month_task(self.employee.id, self.task, 'completed', self.today))
+
+        summary = self.summary()
+        self.assertEqual((summary.total_task_assigned, summary.total_task_completed), (1, 1))
+        self.assertEqual(summary.assigned_task_list, [f"{self.task.id}: Quarterly report, draft"])
+        self.assertEqual(summary.completed_task_list, [f"{self.task.id}: Quarterly report, draft"])
+
+    def test_month_summaries_page_reads_task_lists_with_one_prefetch(self):
+        record_month_task(self.employee.id, self.task, 'assigned', self.today)
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        with CaptureQueriesContext(connection) as one_summary:
+            response = self.client.get(reverse('view_all_month_summaries'))
+        self.assertContains(response, "Quarterly report, draft")
+
+        for name in ('gina', 'hank'):
+            employee = Employee.objects.create(user=User.objects.create_user(name))
+            task = Task.objects.create(employee=employee, title="t", description="d", start_date=self.today, end_date=self.today)
+            record_month_task(employee.id, task, 'assigned', self.today)
+        with self.assertNumQueries(len(one_summary)):
+            self.client.get(reverse('view_all_month_summaries'))
+
+    def test_backfill_parses_titles_with_commas_and_is_rerunnable(self):
+        self.assertEqual(parse_task_list("12: Fix login, 15: Report, part 2"), [(12, "Fix login"), (15, "Report, part 2")])
+        MonthSummary.objects.create(
+            month="March", year=2025, employee_id=self.employee.id, employee_name="frank", total_workdays=20,
+            total_present_days=0, total_holidays_taken=0, total_occasional_holidays=0,
+            assigned_task_ids_with_title="12: Fix login, 15: Report, part 2", completed_task_ids_with_title="12: Fix login",
+        )
+        call_command('backfill_month_tasks', stdout=io.StringIO())
+        call_command('backfill_month_tasks', stdout=io.StringIO())
+        self.assertEqual(MonthSummaryTask.objects.count(), 3)
+
+
+class BulkTaskAssignmentTests(TestCase):
+    def setUp(self):
+        self.today = localdate()
+        self.employee = Employee.objects.create(user=User.objects.create_user('frank'))
+        self.task = Task.objects.create(employee=self.employee, title="Quarterly report, draft", description="d",
+                                        start_date=self.today, end_date=self.today)
+
+    def test_bulk_assignment_to_a_sector_in_fixed_statements(self):
+        sales = Sector.objects.create(sector="Sales")
+        lead = Position.objects.create(position="Lead")
+        team = [Employee.objects.create(user=User.objects.create_user(f"s{n}"), sector=sales) for n in range(5)]
+        Employee.objects.filter(id=team[0].id).update(position=lead)
+        record_month_task(team[1].id, self.task, 'assigned', self.today)  # One summary exists already
+
+        with CaptureQueriesContext(connection) as queries:
+            tasks = assign_task(assignment_targets(sector_id=sales.id), "Stocktake", "d", self.today, self.today)
+        self.assertEqual(len(tasks), 5)
+        writes = [q['sql'].split()[0] for q in queries.captured_queries if q['sql'].split()[0] in ('INSERT', 'UPDATE')]
+        # Tasks, missing summaries, ledger, one counter UPDATE
+        self.assertEqual(writes, ['INSERT', 'INSERT', 'INSERT', 'UPDATE'])
+
+        counts = dict(MonthSummary.objects.filter(employee_id__in=[e.id for e in team]).values_list('employee_id', 'total_task_assigned'))
+        self.assertEqual(counts, {e.id: 2 if e == team[1] else 1 for e in team})
+        self.assertEqual(MonthSummaryTask.objects.filter(task_title="Stocktake").count(), 5)
+        self.assertEqual(list(assignment_targets(sector_id=sales.id, position_id=lead.id)), [team[0]])
+
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        form = {'title': "Badge", 'description': "d", 'start_date': self.today, 'end_date': self.today}
+        self.client.post(reverse('assign_task_bulk'), {**form, 'employees': [team[2].id, self.employee.id]})
+        self.assertEqual(set(Task.objects.filter(title="Badge").values_list('employee_id', flat=True)), {team[2].id, self.employee.id})
+        response = self.client.post(reverse('assign_task_bulk'), form)
+        self.assertContains(response, "Pick employees, a sector or a position.")
+
+
+class CloseMonthTests(TestCase):
+    def test_recomputes_every_summary_from_source_tables(self):
+        DefaultHoliday.objects.create(day='friday')
+        month_cal = month_calendar(2025, 3)
+        workdays = [day for day in (date(2025, 3, d) for d in range(1, 32)) if not month_cal.is_holiday(day)]
+        MultiDefaultHoliday.objects.create(holiday_date=workdays[-1])
+
+        ivy = Employee.objects.create(user=User.objects.create_user('ivy'))
+        jack = Employee.objects.create(user=User.objects.create_user('jack', first_name="Jack", last_name="Hill"))
+        User.objects.update(date_joined=timezone.make_aware(datetime(2025, 1, 1)))
+        Employee.objects.create(user=User.objects.create_user('kim'))  # Joined after March: no summary
+        AttendanceArchive.objects.create(employee_id=ivy.id, date=workdays[0], time=time(9, 0))
+        Attendance.objects.create(employee=ivy, date=workdays[1], time=time(9, 0))
+        EmployeeHoliday.objects.create(employee=ivy, holiday_date=workdays[2])
+        task = Task.objects.create(employee=ivy, title="t", description="d", start_date=workdays[0], end_date=workdays[0])
+        record_month_task(ivy.id, task, 'assigned', workdays[0])
+        MonthSummary.objects.filter(employee_id=ivy.id).update(total_present_days=17, total_workdays=0)  # Drifted
+
+        self.assertEqual(close_month(2025, 3), {'created': 1, 'updated': 1})
+        month_cal = month_calendar(2025, 3)
+        ivy_summary = MonthSummary.objects.get(employee_id=ivy.id, month="March", year=2025)
+        self.assertEqual(
+            (ivy_summary.total_present_days, ivy_summary.total_holidays_taken, ivy_summary.total_occasional_holidays,
+             ivy_summary.total_workdays, ivy_summary.total_task_assigned, ivy_summary.total_task_completed),
+            (2, 1, 1, month_cal.workdays - 1, 1, 0),
+        )
+        jack_summary = MonthSummary.objects.get(employee_id=jack.id, month="March", year=2025)
+        self.assertEqual((jack_summary.employee_name, jack_summary.total_workdays), ("Jack Hill", month_cal.workdays))
+
+        # Rerunnable: nothing left to change
+        self.assertEqual(close_month(2025, 3), {'created': 0, 'updated': 0})
+        self.assertEqual(MonthSummary.objects.filter(month="March", year=2025).count(), 2)
+
+    def test_months_missing_from_the_task_ledger_keep_their_counts(self):
+        lee = Employee.objects.create(user=User.objects.create_user('lee'))
+        User.objects.update(date_joined=timezone.make_aware(datetime(2025, 1, 1)))
+        MonthSummary.objects.create(
+            month="February", year=2025, employee_id=lee.id, employee_name="lee", total_workdays=0,
+            total_present_days=0, total_holidays_taken=0, total_occasional_holidays=0, total_task_assigned=3,
+            assigned_task_ids_with_title="1: a, 2: b, 3: c", total_task_completed=2,
+            completed_task_ids_with_title="1: a, 2: b",
+        )
+        close_month(2025, 2)
+        summary = MonthSummary.objects.get(employee_id=lee.id, period=date(2025, 2, 1))
+        self.assertEqual((summary.total_task_assigned, summary.total_task_completed), (3, 2))
+
+        # Once backfilled, the ledger is the source
+        call_command('backfill_month_tasks', stdout=io.StringIO())
+        MonthSummaryTask.objects.filter(task_id=3).delete()
+        close_month(2025, 2)
+        summary.refresh_from_db()
+        self.assertEqual((summary.total_task_assigned, summary.total_task_completed), (2, 2))
+
+
+class TimesheetTests(TestCase):
+    def setUp(self):
+        AttendanceTimeSettings.objects.create(start_time=time(9, 0), end_time=time(17, 0))
+        self.employee = Employee.objects.create(user=User.objects.create_user('nia'))
+
+    def test_hours_lateness_and_overtime_reach_month_summary_and_payroll(self):
+        AttendanceArchive.objects.create(employee_id=self.employee.id, date=date(2025, 3, 3), time=time(9, 0),
+                                         quit_time=time(17, 30))  # 30 min overtime
+        check_in(self.employee, date(2025, 3, 4), time(9, 20, 45))  # 20 min late
+        check_out(self.employee, date(2025, 3, 4), time(16, 0))  # An hour early
+        check_in(self.employee, date(2025, 3, 5), time(9, 0))  # Not checked out
+
+        sheet = employee_timesheets(date(2025, 3, 1), date(2025, 4, 1)).loc[self.employee.id]
+        self.assertEqual(sheet.to_dict(), {
+            'days': 3, 'open_days': 1, 'total_worked_minutes': 510 + 400, 'total_late_arrivals': 1,
+            'total_late_minutes': 20, 'total_early_leaves': 1, 'total_early_minutes': 60, 'total_overtime_minutes': 30,
+        })
+
+        # Kept current by check-in / check-out, and recomputed the same by the month close
+        summary = MonthSummary.objects.get(employee_id=self.employee.id, period=date(2025, 3, 1))
+        self.assertEqual((summary.total_worked_minutes, summary.total_late_minutes, summary.total_overtime_minutes),
+                         (910, 20, 30))
+        User.objects.update(date_joined=timezone.make_aware(datetime(2025, 1, 1)))
+        close_month(2025, 3)
+        summary.refresh_from_db()
+        self.assertEqual((summary.total_present_days, summary.total_worked_hours, summary.total_early_leaves),
+                         (3, 15.17, 1))
+
+        output = io.BytesIO()
+        EXPORT_KINDS['payroll']['build'](output, 'csv', date(2025, 3, 10), {'from': '2025-03'})
+        header, row = output.getvalue().decode().splitlines()
+        self.assertTrue(header.startswith("Employee Name,Employee ID,Month,Year,Workdays,Present Days"))
+        self.assertTrue(row.endswith(",3,28,0,15.17,1,20,1,60,0.5"), row)
+
+    def test_attendance_detail_shows_the_day_figures(self):
+        today = localdate()
+        check_in(self.employee, today, time(9, 5))
+        check_out(self.employee, today, time(18, 0))
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        response = self.client.get(reverse('employee_attendance_detail', args=[self.employee.id]))
+        self.assertEqual(response.context['attendance'][0]['worked'], "8h 55m")
+        self.assertContains(response, "Late arrivals: 1 (5 min)")
+        self.assertEqual(response.context['overtime_hours'], "1h 00m")
+
+
+class PresenceBitmapTests(TestCase):
+    def setUp(self):
+        DefaultHoliday.objects.create(day='friday')
+        sales = Sector.objects.create(sector="Sales")
+        self.ann, self.ben, self.cal = [
+            Employee.objects.create(user=User.objects.create_user(name), sector=sector)
+            for name, sector in (('ann', sales), ('ben', sales), ('cal', None))
+        ]
+        User.objects.update(date_joined=timezone.make_aware(datetime(2025, 1, 1)))
+        for day in (3, 4, 5, 6):
+            check_in(self.ann, date(2025, 3, day), time(9, 0))
+        check_in(self.ben, date(2025, 3, 3), time(9, 0))
+        EmployeeHoliday.objects.create(employee=self.ben, holiday_date=date(2025, 3, 5))
+        ingest_events([{'event_id': 'c4', 'employee_id': self.cal.id, 'kind': 'in',
+                        'timestamp': datetime(2025, 3, 4, 9, 0).isoformat()}])
+
+    def bits(self):
+        return dict(MonthSummary.objects.for_month(2025, 3).values_list('employee_id', 'presence_bits'))
+
+    def test_bits_are_set_at_check_in_and_match_the_month_close(self):
+        self.assertEqual(self.bits(), {self.ann.id: 0b1111 << 2, self.ben.id: 0b1 << 2, self.cal.id: 0b1 << 3})
+        before = self.bits()
+        close_month(2025, 3)
+        self.assertEqual(self.bits(), before)
+
+    def test_coverage_questions_read_only_the_bitmaps(self):
+        with self.assertNumQueries(3):  # Bitmaps, default holiday, occasional holidays
+            self.assertEqual(daily_headcount(2025, 3)[:7].tolist(), [0, 0, 2, 2, 1, 1, 0])
+        self.assertEqual(absent_on(date(2025, 3, 5)), [self.cal.id])  # Ben is on leave
+        self.assertEqual(absent_on(date(2025, 3, 7)), [])  # Friday
+        # Up to the 10th; Friday the 7th and Ben's leave neither count nor break a run
+        self.assertEqual(absence_streaks(2025, 3, date(2025, 3, 10)).to_dict(),
+                         {self.ann.id: 3, self.ben.id: 5, self.cal.id: 5})
+
+        heatmap = coverage_heatmap(2025, 3)
+        self.assertEqual([(row['sector'], row['headcount']) for row in heatmap['rows']], [("No sector", 1), ("Sales", 2)])
+        self.assertEqual(heatmap['rows'][1]['cells'][2], {'day': 3, 'present': 2, 'rate': 1.0, 'holiday': False})
+        self.assertTrue(heatmap['rows'][1]['cells'][6]['holiday'])
+
+
+class HolidayIndexTests(TestCase):
+    def setUp(self):
+        DefaultHoliday.objects.create(day='friday')
+        MultiDefaultHoliday.objects.create(holiday_date=date(2025, 3, 11))
+        self.sales, self.ops = Sector.objects.create(sector="Sales"), Sector.objects.create(sector="Ops")
+        self.ann, self.ben, self.cal = [
+            Employee.objects.create(user=User.objects.create_user(name), sector=sector)
+            for name, sector in (('ann', self.sales), ('ben', self.sales), ('cal', self.ops))
+        ]
+
+    def entries(self):
+        return set(HolidayIndexEntry.objects.values_list('holiday_date', 'employee_id', 'sector_id'))
+
+    def test_index_follows_every_leave_write(self):
+        leave = EmployeeHoliday.objects.create(employee=self.ann, holiday_date=date(2025, 3, 3))
+        EmployeeHoliday.objects.bulk_create([
+            EmployeeHoliday(employee=self.ben, holiday_date=date(2025, 3, 3)),
+            EmployeeHoliday(employee=self.cal, holiday_date=date(2025, 3, 4)),
+        ])
+        self.assertEqual(self.entries(), {
+            (date(2025, 3, 3), self.ann.id, self.sales.id),
+            (date(2025, 3, 3), self.ben.id, self.sales.id),
+            (date(2025, 3, 4), self.cal.id, self.ops.id),
+        })
+
+        EmployeeHoliday.objects.filter(employee=self.cal).update(holiday_date=date(2025, 3, 5))
+        Employee.objects.filter(id=self.ben.id).update(sector=self.ops)
+        leave.delete()
+        self.assertEqual(self.entries(), {
+            (date(2025, 3, 3), self.ben.id, self.ops.id),
+            (date(2025, 3, 5), self.cal.id, self.ops.id),
+        })
+        self.assertEqual(employees_off(date(2025, 3, 3), self.ops.id), [self.ben.id])
+        self.assertEqual(employees_off(date(2025, 3, 7)), sorted([self.ann.id, self.ben.id, self.cal.id]))  # Friday
+
+    def test_migrate_run_resyncs_the_index(self):
+        kept = EmployeeHoliday.objects.create(employee=self.ann, holiday_date=date(2025, 3, 3))
+        gone = EmployeeHoliday.objects.create(employee=self.cal, holiday_date=date(2025, 3, 4))
+
+        drop_before_migrate(using='default')
+        gone.delete()
+        EmployeeHoliday.objects.create(employee=self.ben, holiday_date=date(2025, 3, 5))
+        Employee.objects.filter(id=self.ann.id).update(sector=self.ops)
+        self.assertEqual(len(self.entries()), 2)  # Still the entries of before
+
+        install_after_migrate(using='default', plan=[('migration', False)])
+        self.assertEqual(self.entries(), {
+            (kept.holiday_date, self.ann.id, self.ops.id),
+            (date(2025, 3, 5), self.ben.id, self.sales.id),
+        })
+
+    def test_coverage_forecast_endpoint(self):
+        EmployeeHoliday.objects.bulk_create([
+            EmployeeHoliday(employee=self.ann, holiday_date=date(2025, 3, 3)),
+            EmployeeHoliday(employee=self.ben, holiday_date=date(2025, 3, 3)),
+            EmployeeHoliday(employee=self.ben, holiday_date=date(2025, 3, 10)),
+            EmployeeHoliday(employee=self.cal, holiday_date=date(2025, 3, 4)),
+        ])
+        with self.assertNumQueries(4):  # Headcount, leave per day, default and occasional holidays
+            forecast = coverage_forecast(date(2025, 3, 3), 2, self.sales.id)
+        self.assertEqual(forecast['headcount'], 2)
+        self.assertEqual(len(forecast['days']), 14)
+        self.assertEqual([(day['off'], day['available']) for day in forecast['days'][:2]], [(2, 0), (0, 2)])
+        self.assertEqual(forecast['days'][4], {'date': '2025-03-07', 'holiday': True, 'off': 2, 'available': 0})
+        self.assertEqual([day['off'] for day in forecast['days'][7:9]], [1, 2])  # Ben's leave, occasional holiday
+
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        url = reverse('holiday_coverage')
+        response = self.client.get(url, {'employee': self.cal.id, 'from': '2025-03-03', 'weeks': 1})
+        data = response.json()
+        self.assertEqual((data['sector'], data['headcount'], data['weeks']), (self.ops.id, 1, 1))
+        self.assertEqual([day['off'] for day in data['days'][:2]], [0, 1])
+        self.assertEqual(self.client.get(url, {'sector': 999}).status_code, 404)
+
+        self.client.force_login(User.objects.create_user('staffless'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class MonthRebuildTests(TestCase):
+    def test_rebuilds_each_month_and_checks_the_result(self):
+        self.assertEqual(list(month_range((2024, 11), (2025, 2))), [(2024, 11), (2024, 12), (2025, 1), (2025, 2)])
+
+        employee = Employee.objects.create(user=User.objects.create_user('lee'))
+        User.objects.update(date_joined=timezone.make_aware(datetime(2024, 12, 15)))
+        AttendanceArchive.objects.create(employee_id=employee.id, date=date(2025, 1, 6), time=time(9, 0))
+        close_month(2025, 1)
+        MonthSummary.objects.filter(month="January").update(total_present_days=5)
+        self.assertEqual(check_month(2025, 1), {'missing': 0, 'mismatched': 1})
+        self.assertEqual(check_month(2024, 12), {'missing': 1, 'mismatched': 0})
+
+        logged = []
+        result = rebuild_month_summaries(month_range((2024, 11), (2025, 1)), workers=1, log=logged.append)
+
+        self.assertEqual((result['created'], result['updated']), (1, 1))  # December created, January repaired
+        self.assertEqual(result['problems'], {})
+        self.assertEqual(len([line for line in logged if line.startswith("[")]), 3)
+        self.assertFalse(MonthSummary.objects.filter(month="November").exists())
+        self.assertEqual(MonthSummary.objects.get(month="January").total_present_days, 1)
+
+
+class MonthSummaryPeriodTests(TestCase):
+    def summary(self, month, year, employee_id=1):
+        return MonthSummary.objects.create(
+            month=month, year=year, employee_id=employee_id, employee_name="x", total_workdays=0,
+            total_present_days=0, total_holidays_taken=0, total_occasional_holidays=0,
+        )
+
+    def test_period_is_unique_per_employee_and_range_queryable(self):
+        for month, year in (("November", 2024), ("December", 2024), ("January", 2025), ("April", 2025)):
+            self.summary(month, year)
+        self.assertEqual(MonthSummary.objects.get(month="December").period, date(2024, 12, 1))
+
+        in_range = MonthSummary.objects.between(date(2024, 12, 15), date(2025, 3, 31)).order_by('period')
+        self.assertEqual([(s.month, s.year) for s in in_range], [("December", 2024), ("January", 2025)])
+        self.assertEqual(MonthSummary.objects.for_month(2025, 4).get().month, "April")
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.summary("April", 2025)
+        self.summary("April", 2025, employee_id=2)
+
+    def test_first_check_in_of_a_month_creates_its_summary(self):
+        employee = Employee.objects.create(user=User.objects.create_user('mia'))
+        check_in(employee, date(2025, 2, 3), time(9, 0))
+        check_in(employee, date(2025, 2, 4), time(9, 0))
+        summary = MonthSummary.objects.for_month(2025, 2).get(employee_id=employee.id)
+        self.assertEqual((summary.month, summary.year, summary.total_present_days), ("February", 2025, 2))
+
+
+class MonthSummaryBrowsingTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        sales, support = Sector.objects.create(sector="Sales"), Sector.objects.create(sector="Support")
+        self.sales = sales
+        for name, sector in (('nia', sales), ('omar', support), ('pia', sales)):
+            employee = Employee.objects.create(user=User.objects.create_user(name), sector=sector)
+            for month, present in (("January", 10), ("February", 12), ("March", 14)):
+                MonthSummary.objects.create(
+                    month=month, year=2025, employee_id=employee.id, employee_name=name, total_workdays=20,
+                    total_present_days=present, total_holidays_taken=1, total_occasional_holidays=0,
+                )
+
+    def test_month_range_and_sector_filters_page_by_keyset(self):
+        params = {'from': '2025-01', 'to': '2025-02', 'sector': self.sales.id}
+        with mock.patch('dashboard.views.MONTH_SUMMARY_PAGE_SIZE', 3):
+            first = self.client.get(reverse('view_all_month_summaries'), params)
+            rows = first.context['month_summaries']
+            self.assertEqual([(row.month, row.employee_name) for row in rows],
+                             [("January", "nia"), ("January", "pia"), ("February", "nia")])
+            self.assertContains(first, "January 2025 - February 2025")
+
+            second = self.client.get(reverse('view_all_month_summaries'), {**params, 'after': first.context['next_cursor']})
+            self.assertEqual([(row.month, row.employee_name) for row in second.context['month_summaries']],
+                             [("February", "pia")])
+            self.assertIsNone(second.context['next_cursor'])
+
+    def test_totals_per_employee_are_summed_in_the_database(self):
+        response = self.client.get(reverse('view_all_month_summaries'), {'from': '2025-03', 'to': '2025-01', 'group': 'employee'})
+        totals = {row['name']: row for row in response.context['month_summaries']}
+        self.assertEqual((totals['omar']['months'], totals['omar']['present_days'], totals['omar']['absent_days']), (3, 36, 24))
+
+        response = self.client.get(reverse('export_month_summary'), {
+            'from': '2025-02', 'to': '2025-03', 'sector': self.sales.id, 'group': 'employee', 'format': 'csv',
+        })
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ["Employee Name", "Employee ID", "Months"])
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ["nia", "pia"])
+        self.assertIn("February_2025-March_2025", response['Content-Disposition'])
+
+    def test_background_export_is_cached_per_filter(self):
+        today = date(2025, 3, 10)
+        self.assertEqual(cache_key('month_summary', 'csv', today), cache_key('month_summary', 'csv', today, {'from': '2025-03'}))
+        self.assertNotEqual(cache_key('month_summary', 'csv', today),
+                            cache_key('month_summary', 'csv', today, {'from': '2025-01', 'to': '2025-03'}))
+        job = enqueue_export('month_summary', 'csv', params={'from': '2025-01', 'to': '2025-03', 'page': '2'})
+        self.assertEqual(job.params, {'from': '2025-01', 'to': '2025-03'})
+
+
+class SummaryCubeTests(TestCase):
+    def setUp(self):
+        self.sales, self.support = Sector.objects.create(sector="Sales"), Sector.objects.create(sector="Support")
+        self.junior = Position.objects.create(position="Junior")
+        self.employees = {}
+        for name, sector, present in (('quinn', self.sales, 15), ('rita', self.sales, 5), ('sam', self.support, 18)):
+            employee = Employee.objects.create(user=User.objects.create_user(name), sector=sector, position=self.junior)
+            self.employees[name] = employee
+            for month in ("January", "February"):
+                MonthSummary.objects.create(
+                    month=month, year=2025, employee_id=employee.id, employee_name=name, total_workdays=20,
+                    total_present_days=present, total_holidays_taken=0, total_occasional_holidays=0,
+                    total_task_assigned=4, total_task_completed=2,
+                )
+        self.filters = summary_filters({'from': '2025-01', 'to': '2025-02'}, date(2025, 2, 1))
+
+    def by_sector(self):
+        return {row['sector']: row for row in cube_slice(self.filters, ['sector'])}
+
+    def test_cells_follow_bulk_updates_and_sector_moves(self):
+        self.assertEqual(refresh_stale_cells(), 2)
+        sales = self.by_sector()["Sales"]
+        self.assertEqual((sales['employee_months'], sales['present_days'], sales['attendance_rate']), (4, 40, 0.5))
+        self.assertEqual(sales['completion_rate'], 0.5)
+
+        # Bulk writes skip signals; the triggers still mark the month stale
+        MonthSummary.objects.filter(month="February").update(total_present_days=20)
+        Employee.objects.filter(id=self.employees['sam'].id).update(sector=self.sales)
+        self.assertEqual(set(SummaryCubeStaleMonth.objects.values_list('period', flat=True)),
+                         {date(2025, 1, 1), date(2025, 2, 1)})
+        refresh_stale_cells()
+        self.assertEqual(list(self.by_sector()), ["Sales"])
+        self.assertEqual(self.by_sector()["Sales"]['present_days'], 15 + 5 + 18 + 3 * 20)
+        self.assertFalse(SummaryCubeStaleMonth.objects.exists())
+
+    def test_nothing_stale_is_one_read_without_a_transaction(self):
+        refresh_stale_cells()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(refresh_stale_cells(), 0)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('SELECT'))
+
+    def test_json_endpoint_slices_by_any_dimension(self):
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        url = reverse('analytics_cube')
+        data = self.client.get(url, {'from': '2025-01', 'to': '2025-02', 'by': 'position,month'}).json()
+        self.assertEqual(data['by'], ['month', 'position'])
+        self.assertEqual([(row['month'], row['position'], row['employee_months']) for row in data['rows']],
+                         [("2025-01", "Junior", 3), ("2025-02", "Junior", 3)])
+
+        total = self.client.get(url, {'from': '2025-01', 'to': '2025-02', 'sector': self.support.id, 'by': ''}).json()
+        self.assertEqual(total['rows'], [{
+            'employee_months': 2, 'workdays': 40, 'present_days': 36, 'holidays_taken': 0, 'tasks_assigned': 8,
+            'tasks_completed': 4, 'absent_days': 4, 'attendance_rate': 0.9, 'absence_rate': 0.1, 'completion_rate': 0.5,
+        }])
+        self.assertContains(self.client.get(reverse('analytics'), {'from': '2025-01'}), "Support")
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(user=User.objects.create_user('gail', first_name="Gail", last_name="Hart"))
+        day = date(2025, 3, 3)
+        self.titled = Task.objects.create(employee=self.employee, title="Quarterly report", description="numbers",
+                                          start_date=day, end_date=day)
+        self.described = Task.objects.create(employee=self.employee, title="Cleanup", description="old report drafts",
+                                             start_date=day, end_date=day)
+        self.history = TaskHistoryKeeper.objects.create(task_id=99, task_title="Audit", description="report review",
+                                                        assigned_to="Gail Hart", start_date=day, end_date=day,
+                                                        status="Completed", action_taken="Approved")
+        self.message = MessageBox.objects.create(name="Ivy", email="ivy@example.com", message="Where is the reports page?")
+
+    def found(self, text, kinds=None, **options):
+        return [(result['kind'], result['id']) for result in search(text, kinds, **options)['results']]
+
+    def test_ranked_prefix_matches_across_kinds(self):
+        found = self.found("repor")
+        self.assertEqual(set(found), {('task', self.titled.id), ('task', self.described.id),
+                                      ('history', self.history.id), ('message', self.message.id)})
+        # A title match outranks the same word in a description
+        self.assertLess(found.index(('task', self.titled.id)), found.index(('task', self.described.id)))
+        self.assertEqual(self.found("report gail", ['history']), [('history', self.history.id)])
+        self.assertEqual(self.found('"report", (draft*'), [('task', self.described.id)])  # syntax is dropped
+        self.assertEqual(search("  !! ")['results'], [])
+
+    def test_index_follows_bulk_writes_and_pages(self):
+        Task.objects.filter(id=self.described.id).update(description="old drafts")
+        self.message.delete()
+        self.assertEqual(self.found("report", ['task', 'message']), [('task', self.titled.id)])
+        Task.objects.bulk_create([
+            Task(employee=self.employee, title=f"Weekly report {n}", description="", start_date=date(2025, 3, 3),
+                 end_date=date(2025, 3, 3)) for n in range(5)
+        ])
+        rebuild_search_index()
+        first, second = search("weekly", page_size=3), search("weekly", page=2, page_size=3)
+        self.assertTrue(first['has_next'])
+        self.assertFalse(second['has_next'])
+        self.assertEqual(len({result['id'] for result in first['results'] + second['results']}), 5)
+
+    def test_migrate_run_reindexes_missed_writes(self):
+        drop_before_migrate(using='default')
+        Task.objects.filter(id=self.titled.id).update(title="Quarterly budget")
+        self.assertIn(('task', self.titled.id), self.found("report", ['task']))
+
+        install_after_migrate(using='default', plan=[('migration', False)])
+        self.assertEqual(self.found("report", ['task']), [('task', self.described.id)])
+        self.assertEqual(self.found("budget"), [('task', self.titled.id)])
+
+    def test_search_endpoint(self):
+        url = reverse('search')
+        self.client.force_login(User.objects.create_user('worker'))
+        self.assertEqual(self.client.get(url, {'q': 'report'}, HTTP_ACCEPT='application/json').status_code, 403)
+        self.client.force_login(User.objects.create_user('boss', is_staff=True))
+        data = self.client.get(url, {'q': 'report', 'kind': 'task'}, HTTP_ACCEPT='application/json').json()
+        self.assertEqual([result['id'] for result in data['results']], [self.titled.id, self.described.id])
+        self.assertContains(self.client.get(url, {'q': 'audit'}), "Audit")
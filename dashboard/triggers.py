@@ -0,0 +1,201 @@
+"""
+The raw SQLite triggers of the dashboard app, defined once.
+
+Bulk writes (bulk_create, queryset update / delete) send no model signals, so the
+tables derived from others are kept by triggers in the database itself. Only SQLite
+gets them, the project's database; other vendors fall back to application code
+where it matters (see each consumer).
+
+No migration creates these. Django rebuilds a SQLite table for many schema changes
+(an AddField with a default, an AlterField, an AddConstraint): the triggers on the
+old table go with it, and a trigger elsewhere that reads the table fails the rename.
+So a pre_migrate receiver drops them all before a migrate run and a post_migrate
+receiver installs the ones whose tables exist afterwards. When migrations did run,
+each group's catch-up statements then replay what the triggers missed meanwhile.
+"""
+from django.db import connections
+
+from .search import SEARCH_KINDS
+
+# Tables read by the exports (export_jobs.py); auth_user only for the username in the reports
+VERSION_TABLES = [
+    'dashboard_attendance',
+    'dashboard_defaultholiday',
+    'dashboard_employee',
+    'dashboard_employeeholiday',
+    'dashboard_monthsummary',
+    'dashboard_monthsummarytask',
+    'dashboard_multidefaultholiday',
+    'dashboard_task',
+    'dashboard_taskhistorykeeper',
+]
+VERSION_WATCHED_COLUMNS = {'auth_user': 'username'}
+
+
+def _version_triggers(table):
+    triggers = {}
+    for operation in ('INSERT', 'UPDATE', 'DELETE'):
+        event = operation
+        if operation == 'UPDATE' and table in VERSION_WATCHED_COLUMNS:
+            event = f'UPDATE OF {VERSION_WATCHED_COLUMNS[table]}'
+        triggers[f'{table}_version_{operation.lower()}'] = (
+            f'{event} ON {table}',
+            f"UPDATE dashboard_tableversion SET version = version + 1 WHERE table_name = '{table}';",
+        )
+    return triggers
+
+
+CUBE_STALE = 'dashboard_summarycubestalemonth'
+MARK_EMPLOYEE_MONTHS = (
+    f"INSERT OR IGNORE INTO {CUBE_STALE} (period) "
+    f"SELECT DISTINCT period FROM dashboard_monthsummary WHERE employee_id = {{row}}.id;"
+)
+
+HOLIDAY_INDEX = 'dashboard_holidayindexentry'
+INDEX_NEW_HOLIDAY = (
+    f"INSERT OR IGNORE INTO {HOLIDAY_INDEX} (holiday_date, employee_id, sector_id) "
+    f"SELECT NEW.holiday_date, NEW.employee_id, sector_id FROM dashboard_employee WHERE id = NEW.employee_id;"
+)
+# Duplicate EmployeeHoliday rows share one entry, which goes with the last of them
+UNINDEX_OLD_HOLIDAY = (
+    f"DELETE FROM {HOLIDAY_INDEX} WHERE holiday_date = OLD.holiday_date AND employee_id = OLD.employee_id "
+    f"AND NOT EXISTS (SELECT 1 FROM dashboard_employeeholiday "
+    f"WHERE employee_id = OLD.employee_id AND holiday_date = OLD.holiday_date);"
+)
+
+def _search_triggers(fts, table, columns):
+    names = ', '.join(columns)
+    add = f"INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {', '.join(f'NEW.{c}' for c in columns)});"
+    remove = (
+        f"INSERT INTO {fts} ({fts}, rowid, {names}) "
+        f"VALUES ('delete', OLD.id, {', '.join(f'OLD.{c}' for c in columns)});"
+    )
+    # Updates only when the indexed text changes
+    return {
+        f'{fts}_insert': (f'INSERT ON {table}', add),
+        f'{fts}_update': (f'UPDATE OF {names} ON {table}', f"{remove} {add}"),
+        f'{fts}_delete': (f'DELETE ON {table}', remove),
+    }
+
+
+# group -> (tables the triggers sit on or touch, {name: (event, body)}, catch-up statements).
+# A group is installed only when all of its tables exist (e.g. after migrating backwards).
+TRIGGER_GROUPS = {
+    # Change counters the export cache is keyed on: any missed write just means a rebuild
+    **{
+        f'version:{table}': (
+            [table, 'dashboard_tableversion'],
+            _version_triggers(table),
+            [
+                f"INSERT OR IGNORE INTO dashboard_tableversion (table_name, version) VALUES ('{table}', 0)",
+                f"UPDATE dashboard_tableversion SET version = version + 1 WHERE table_name = '{table}'",
+            ],
+        )
+        for table in VERSION_TABLES + list(VERSION_WATCHED_COLUMNS)
+    },
+    # Summary cube (analytics.py): every MonthSummary write marks its month stale, and moving
+    # an employee to another sector / position (or removing them) marks all their months
+    'summary_cube': (
+        ['dashboard_monthsummary', 'dashboard_employee', CUBE_STALE],
+        {
+            'dashboard_monthsummary_cube_insert': (
+                'INSERT ON dashboard_monthsummary', f"INSERT OR IGNORE INTO {CUBE_STALE} (period) VALUES (NEW.period);",
+            ),
+            'dashboard_monthsummary_cube_update': (
+                'UPDATE ON dashboard_monthsummary',
+                f"INSERT OR IGNORE INTO {CUBE_STALE} (period) VALUES (OLD.period); "
+                f"INSERT OR IGNORE INTO {CUBE_STALE} (period) VALUES (NEW.period);",
+            ),
+            'dashboard_monthsummary_cube_delete': (
+                'DELETE ON dashboard_monthsummary', f"INSERT OR IGNORE INTO {CUBE_STALE} (period) VALUES (OLD.period);",
+            ),
+            'dashboard_employee_cube_update': (
+                'UPDATE OF sector_id, position_id ON dashboard_employee', MARK_EMPLOYEE_MONTHS.format(row='NEW'),
+            ),
+            'dashboard_employee_cube_delete': ('DELETE ON dashboard_employee', MARK_EMPLOYEE_MONTHS.format(row='OLD')),
+        },
+        # Which months the migrations touched is unknown: the next read rebuilds them all
+        [f"INSERT OR IGNORE INTO {CUBE_STALE} (period) SELECT DISTINCT period FROM dashboard_monthsummary"],
+    ),
+    # Holiday index (holiday_index.py): mirrors every EmployeeHoliday write and follows
+    # employees moving sector
+    'holiday_index': (
+        ['dashboard_employeeholiday', 'dashboard_employee', HOLIDAY_INDEX],
+        {
+            'dashboard_employeeholiday_index_insert': ('INSERT ON dashboard_employeeholiday', INDEX_NEW_HOLIDAY),
+            'dashboard_employeeholiday_index_update': (
+                'UPDATE OF employee_id, holiday_date ON dashboard_employeeholiday',
+                f"{UNINDEX_OLD_HOLIDAY} {INDEX_NEW_HOLIDAY}",
+            ),
+            'dashboard_employeeholiday_index_delete': ('DELETE ON dashboard_employeeholiday', UNINDEX_OLD_HOLIDAY),
+            'dashboard_employee_index_sector': (
+                'UPDATE OF sector_id ON dashboard_employee',
+                f"UPDATE {HOLIDAY_INDEX} SET sector_id = NEW.sector_id WHERE employee_id = NEW.id;",
+            ),
+        },
+        # Resync with EmployeeHoliday: stale entries out, missing ones in, sectors refreshed
+        [
+            f"DELETE FROM {HOLIDAY_INDEX} WHERE NOT EXISTS (SELECT 1 FROM dashboard_employeeholiday holiday "
+            f"WHERE holiday.employee_id = {HOLIDAY_INDEX}.employee_id "
+            f"AND holiday.holiday_date = {HOLIDAY_INDEX}.holiday_date)",
+            f"INSERT OR IGNORE INTO {HOLIDAY_INDEX} (holiday_date, employee_id, sector_id) "
+            f"SELECT holiday.holiday_date, holiday.employee_id, employee.sector_id FROM dashboard_employeeholiday holiday "
+            f"JOIN dashboard_employee employee ON employee.id = holiday.employee_id",
+            f"UPDATE {HOLIDAY_INDEX} SET sector_id = (SELECT sector_id FROM dashboard_employee "
+            f"WHERE id = {HOLIDAY_INDEX}.employee_id) WHERE sector_id IS NOT (SELECT sector_id "
+            f"FROM dashboard_employee WHERE id = {HOLIDAY_INDEX}.employee_id)",
+        ],
+    ),
+    # Full-text search (search.py): each FTS5 index follows the text of its source table and,
+    # being external content, is simply re-read from it to catch up
+    **{
+        f'search:{fts}': (
+            [model._meta.db_table, fts],
+            _search_triggers(fts, model._meta.db_table, columns),
+            [f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')"],
+        )
+        for model, fts, columns in SEARCH_KINDS.values()
+    },
+}
+
+
+def drop_triggers(connection):
+    """Drop every trigger of TRIGGER_GROUPS that exists."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for _, triggers, _ in TRIGGER_GROUPS.values():
+            for name in triggers:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def install_triggers(connection, catch_up=False):
+    """
+    Create the triggers of every group whose tables exist (existing ones are left as
+    they are) and, with `catch_up`, run the group's catch-up statements. Returns the
+    groups installed.
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    tables = set(connection.introspection.table_names())
+    installed = []
+    with connection.cursor() as cursor:
+        for group, (needs, triggers, statements) in TRIGGER_GROUPS.items():
+            if not tables.issuperset(needs):
+                continue
+            for name, (event, body) in triggers.items():
+                cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} BEGIN {body} END")
+            if catch_up:
+                for statement in statements:
+                    cursor.execute(statement)
+            installed.append(group)
+    return installed
+
+
+def drop_before_migrate(using, **kwargs):
+    drop_triggers(connections[using])
+
+
+def install_after_migrate(using, plan=None, **kwargs):
+    # `flush` sends post_migrate without a plan: the tables are empty, nothing to catch up
+    install_triggers(connections[using], catch_up=bool(plan))
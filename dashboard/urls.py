@@ -10,6 +10,7 @@ urlpatterns = [
     path('admin-edit/', views.admin_edit_profile, name='admin_edit'),
     path('mark_attendance/', views.mark_attendance, name='mark_attendance'),
     path('quit/', views.quit, name='quit'),
+    path('api/attendance-events/', views.attendance_events_api, name='attendance_events_api'),
     path('update_employee/<int:employee_id>/', views.update_employee, name='update_employee'),
     path('my-profile-update/', views.self_update_employee, name='my_profile_update'),
     path('add_allowed_email/', views.add_allowed_email, name='add_allowed_email'),
@@ -41,6 +42,9 @@ urlpatterns = [
     path('deliver_task/<int:task_id>/', views.deliver_task, name='deliver_task'),
     path('approve_task/<int:task_id>/', views.approve_task, name='approve_task'),
     path('extend_task_date/<int:task_id>/', views.extend_task_date, name='extend_task_date'),
+    path('tasks/reschedule-deadlines/', views.reschedule_task_deadlines, name='reschedule_task_deadlines'),
+    path('tasks/assign/', views.assign_task_bulk, name='assign_task_bulk'),
+    path('tasks/batch/<str:action>/', views.task_batch_action, name='task_batch_action'),
     path('reject_task/<int:task_id>/', views.reject_task, name='reject_task'),
     path('attendance-summary/', views.all_employee_attendance_details, name='attendance_summary'),
     path('task-history/', views.task_history_view, name='task_history'),
@@ -50,6 +54,14 @@ urlpatterns = [
     path('month-summaries/', views.view_all_month_summaries, name='view_all_month_summaries'),
     path('month-summary/delete/<int:id>/', views.delteMonthSummary, name='delete_month_summary'),
     path("export-month-summary/", views.export_month_summaries_to_excel, name="export_month_summary"),
+    path('exports/<str:kind>/request/', views.request_export, name='request_export'),
+    path('exports/jobs/<int:job_id>/', views.export_job_detail, name='export_job_detail'),
+    path('exports/jobs/<int:job_id>/status/', views.export_job_status, name='export_job_status'),
+    path('exports/jobs/<int:job_id>/download/', views.download_export, name='download_export'),
+    path('analytics/', views.analytics, name='analytics'),
+    path('analytics/cube.json', views.analytics_cube, name='analytics_cube'),
+    path('holidays/coverage.json', views.holiday_coverage, name='holiday_coverage'),
+    path('search/', views.search_records, name='search'),
     path('reset-attendance/', views.reset_attendance, name='reset_attendance'),
     path('add-position/', views.add_position, name='add_position'),
     path('add-sector/', views.add_sector, name='add_sector'),
@@ -4,17 +4,43 @@ from django.contrib.auth.models import User
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import AuthenticationForm, PasswordChangeForm
 from django.contrib import messages
-from .models import Employee, Attendance, AllowedEmail, DefaultHoliday, EmployeeHoliday, MessageBox, MultiDefaultHoliday, Task, TaskHistoryKeeper, MonthSummary, SystemState, AttendanceTimeSettings, Position, Sector
-from .forms import EmployeeRegistrationForm, EmployeeUpdateForm, AllowedEmailForm, AdminSetPasswordForm, UserUpdateForm, DefaultHolidayForm, MultiDateHolidayForm, MultiDefaultHolidaysForm, MessageForm, TaskForm, AdminUpdateForm, AttendanceTimeForm, PositionForm, SectorForm
+from .models import Employee, Attendance, AllowedEmail, DefaultHoliday, EmployeeHoliday, MessageBox, MultiDefaultHoliday, Task, TaskHistoryKeeper, MonthSummary, SystemState, AttendanceTimeSettings, Position, Sector, ExportJob, TASK_STATUSES
+from .forms import EmployeeRegistrationForm, EmployeeUpdateForm, AllowedEmailForm, AdminSetPasswordForm, UserUpdateForm, DefaultHolidayForm, MultiDateHolidayForm, MultiDefaultHolidaysForm, MessageForm, TaskForm, BulkTaskForm, AdminUpdateForm, AttendanceTimeForm, PositionForm, SectorForm
 from django.utils.timezone import localdate
 from calendar import monthrange
 from django.utils.dateparse import parse_date
 import calendar
 from datetime import datetime, date
-import pandas as pd
 from django.utils.timezone import now, localtime
-from django.http import HttpResponse
-    
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
+from django.urls import reverse
+from urllib.parse import urlencode
+from django.core.paginator import Paginator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.conf import settings as django_settings
+import hmac
+import json
+import os
+from .holiday_calendar import month_calendar, holiday_label, expand_holiday_dates
+from .month_summary import (
+    employee_totals, filter_params, filtered_month_summaries, record_month_task, refresh_month_summaries,
+    summary_filters,
+)
+from .reports import activity_summary, write_xlsx
+from .exports import csv_response, xlsx_response, task_history_rows, month_summary_rows, month_summary_total_rows, TASK_HISTORY_COLUMNS, MONTH_SUMMARY_COLUMNS, MONTH_SUMMARY_TOTAL_COLUMNS
+from .pagination import keyset_page
+from .analytics import cube_slice, parse_dimensions, refresh_cube
+from .export_jobs import EXPORT_KINDS, enqueue_export, artifact_path
+from .attendance import check_in, check_out, ingest_events, archive_attendance, MAX_EVENTS_PER_BATCH
+from .task_assignment import assign_task, assignment_targets
+from .task_review import MAX_TASKS_PER_BATCH, approve_tasks, extend_tasks, parse_task_ids, reject_tasks
+from .timesheet import clock_text, duration_text, sum_days, timesheet_days
+from .presence import absent_on, coverage_heatmap
+from .deadlines import reschedule_deadlines
+from .holiday_index import MAX_FORECAST_WEEKS, add_employee_holidays, add_occasional_holidays, coverage_forecast
+from .search import SEARCH_KINDS, search
+
 def home(request):
     return render(request, 'home.html')
 
@@ -49,6 +75,7 @@ def register(request):
                 joining_date = datetime.now(),
                 employee_present_status="Running"
             )
+            refresh_month_summaries(current_year, datetime.now().month, [employee.id])
             messages.success(request, "Registration successful! Please log in to access your dashboard.")
             return redirect('login')  # Redirect to the login page after successful registration
         else:
@@ -95,6 +122,12 @@ def filtered_employees(request):
 
     return employees, sectors, positions, sector_id, position_id, filter_type
 
+def _date_list(dates):
+    # Long ranges read as "first .. last (N days)" in the flash message
+    if len(dates) > 5:
+        return f"{dates[0]} .. {dates[-1]} ({len(dates)} days)"
+    return ", ".join(str(day) for day in dates)
+
 @login_required
 def dashboard(request):
     if request.user.is_staff:
@@ -113,25 +146,19 @@ def dashboard(request):
                 form = MultiDateHolidayForm(request.POST)
                 if form.is_valid():
                     employee = form.cleaned_data['employee']
-                    holiday_dates = form.cleaned_data['holiday_dates'].split(",")  # Split the dates by comma
-                    
-                    for date in holiday_dates:
-                        date = date.strip()
-                        EmployeeHoliday.objects.create(employee=employee, holiday_date=date)
+                    holiday_dates = form.cleaned_data['holiday_dates']  # Dates and "a..b" ranges, expanded
+                    add_employee_holidays([employee.id], holiday_dates)
 
-                    messages.success(request, f"Holidays added for {employee.user.username} on {', '.join(holiday_dates)}.")
+                    messages.success(request, f"Holidays added for {employee.user.username} on {_date_list(holiday_dates)}.")
                     return redirect('dashboard')
             
             elif 'occasional_holidays' in request.POST:
                 form = MultiDefaultHolidaysForm(request.POST)
                 if form.is_valid():
-                    holiday_dates = form.cleaned_data['holiday_dates'].split(",")  # Split the dates by comma
-                    
-                    for date in holiday_dates:
-                        date = date.strip()
-                        MultiDefaultHoliday.objects.create(holiday_date=date)
-                        
-                    messages.success(request, f"Occasional holidays added on {', '.join(holiday_dates)}.")
+                    holiday_dates = form.cleaned_data['holiday_dates']
+                    add_occasional_holidays(holiday_dates)
+
+                    messages.success(request, f"Occasional holidays added on {_date_list(holiday_dates)}.")
                     return redirect('dashboard')
             
             elif 'set_attendance_time' in request.POST:
@@ -147,65 +174,26 @@ def dashboard(request):
                 
 
         today = localdate()
-        total_days = monthrange(today.year, today.month)[1]
 
         # Get default holiday
         default_holiday = DefaultHoliday.objects.first()
-        default_holiday_day = default_holiday.day if default_holiday else "friday"
-        
+
         # filtering employees
         all_filtered_employees, sectors, positions, sector_id, position_id, filter_type = filtered_employees(request)
 
-        # Subtract default holidays from total workdays
-        all_holidays = []  # Initialize a list to track all holidays
         employees = Employee.objects.all()
 
-        # Add all default holidays for the current month
-        for day in range(1, total_days + 1):
-            date = today.replace(day=day)
-            if default_holiday and date.strftime("%A").lower() == default_holiday.day.lower():
-                all_holidays.append(date)
-
-        # Add employee-specific extra holidays
-        for employee in employees:
-            employee_holidays = EmployeeHoliday.objects.filter(employee=employee)
-            for emp_holiday in employee_holidays:
-                all_holidays.append(emp_holiday.holiday_date)
-                
-        total_occasional_holidays = MultiDefaultHoliday.objects.all()
-        occasional_holidays = list(set([
-            f"{holiday.holiday_date} ({holiday.holiday_date.strftime('%A')})"
-            for holiday in total_occasional_holidays
-        ])) 
-        occasional_holidays.sort(key=lambda x: x.split(" ")[0])
-        
-        for occasional_day in total_occasional_holidays:
-            all_holidays.append(occasional_day.holiday_date)
+        # Default and occasional holidays of this month, shared by every employee
+        month_cal = month_calendar(today.year, today.month)
+        all_holidays = month_cal.holidays.tolist()
+        workdays = month_cal.workdays
 
-        all_holidays = sorted(set(all_holidays))  # Remove duplicates and sort the holidays
+        occasional_holidays = [holiday_label(holiday) for holiday in month_cal.occasional_holidays]
 
-        total_holidays = len(all_holidays)
-        workdays = total_days - total_holidays
-        
-        #updating month summary
-        for employee in employees:
-            employee_holidays_taken = EmployeeHoliday.objects.filter(employee=employee).count()
-            
-            # Calculate workdays for the employee
-            total_holidays = len(all_holidays) + len(employee_holidays)
-            workdays = total_days - total_holidays
-
-            # Update the existing MonthSummary for the employee
-            MonthSummary.objects.filter(
-                month=today.strftime("%B"),
-                year=today.year,
-                employee_id=employee.id
-            ).update(
-                total_occasional_holidays=len(occasional_holidays),
-                total_holidays_taken=employee_holidays_taken,
-                total_workdays=workdays
-            )
-        
+        # MonthSummary holiday/workday fields are refreshed by the holiday signals, not here
+
+        # Team coverage heatmap from the MonthSummary presence bitmaps, not the Attendance rows
+        coverage = coverage_heatmap(today.year, today.month)
 
         occasional_holidays_form = MultiDefaultHolidaysForm()
         multi_date_form = MultiDateHolidayForm()
@@ -229,7 +217,10 @@ def dashboard(request):
             'positions': positions,
             'selected_sector': sector_id,
             'selected_position': position_id,
-            'filter_type': filter_type
+            'filter_type': filter_type,
+            'coverage': coverage,
+            'absent_today': len(absent_on(today)),
+            'today': today,
         }
         return render(request, 'admin_dashboard.html', context)
 
@@ -237,45 +228,29 @@ def dashboard(request):
         employee = Employee.objects.get(user=request.user)
         tasks = Task.objects.filter(employee=employee).order_by('end_date')
         today = localdate()
-        attendance = Attendance.objects.filter(employee=employee)
+        month_cal = month_calendar(today.year, today.month)
+        attendance = Attendance.objects.filter(employee=employee, **month_cal.range_filter('date'))
         attendance_day = Attendance.objects.filter(employee=employee, date=today).first()
         today_with_day = today.strftime("%Y-%m-%d (%A)")
-        total_days = monthrange(today.year, today.month)[1]
-        
+
         # Fetch holidays for the employee
-        default_holiday = DefaultHoliday.objects.first()
-        employee_holidays = EmployeeHoliday.objects.filter(employee=employee)
-        total_occasional_holidays = MultiDefaultHoliday.objects.all()
-        # Create a formatted list of holidays for occasional holidays
-        occasional_holidays = list(set([
-            f"{holiday.holiday_date} ({holiday.holiday_date.strftime('%A')})"
-            for holiday in total_occasional_holidays
-        ])) 
-        occasional_holidays.sort(key=lambda x: x.split(" ")[0])
-
-        # Collect and format default holidays
-        default_holidays = []
-        if default_holiday:
-            for day in range(1, total_days + 1):
-                date = today.replace(day=day)
-                if date.strftime("%A").lower() == default_holiday.day.lower():
-                    default_holidays.append(f"{date} ({date.strftime('%A')})")
-
-        # Collect and format extra holidays
-        extra_holidays = list(set([f"{holiday.holiday_date} ({holiday.holiday_date.strftime('%A')})" for holiday in employee_holidays]))
-        extra_holidays.sort(key=lambda x: x.split(" ")[0])
-            
-        # Combine all holidays for total calculation
-        all_holiday_dates = sorted(set([h.split(" ")[0] for h in default_holidays + extra_holidays + occasional_holidays]))  # Remove duplicates
-        
+        holidays = month_cal.employee_summary(
+            EmployeeHoliday.objects.filter(
+                employee=employee, **month_cal.range_filter('holiday_date')
+            ).values_list('holiday_date', flat=True)
+        )
+        default_holidays = holidays['default_holidays']
+        extra_holidays = holidays['extra_holidays']
+        occasional_holidays = holidays['occasional_holidays']
+
         #holidays counting
-        extra_holiday_count = len(extra_holidays)
-        default_holiday_count = len(default_holidays)
-        occasional_holiday_count = len(occasional_holidays)
-        total_holidays = len(all_holiday_dates)
+        extra_holiday_count = holidays['extra_holiday_count']
+        default_holiday_count = holidays['default_holiday_count']
+        occasional_holiday_count = holidays['occasional_holiday_count']
+        total_holidays = holidays['total_holidays']
         tasks = Task.objects.filter(employee=employee)
-    
-        workdays = total_days - total_holidays
+
+        workdays = holidays['workdays']
         present_count = attendance.count()
         absent_count = workdays - present_count
         
@@ -331,9 +306,6 @@ def mark_attendance(request):
     today = localdate()
     current_time = localtime().time() 
     
-    current_month = today.strftime("%B")
-    current_year = today.year
-    
     settings = AttendanceTimeSettings.objects.first()
     if settings and not (settings.start_time <= current_time <= settings.end_time):
         messages.error(request, "You can only mark attendance during the allowed time.")
@@ -347,42 +319,12 @@ def mark_attendance(request):
 
     # Check if today is an individual holiday for the employee
     is_employee_holiday = EmployeeHoliday.objects.filter(employee=employee, holiday_date=today).exists()
-    
-    attendance = Attendance.objects.filter(employee=employee, date=today).first()
-    
+
     if is_default_holiday or is_employee_holiday:
         messages.error(request, "It's your holiday, enjoy your day!")
-    elif attendance:
+    elif check_in(employee, today, current_time) is None:
         messages.error(request, "Attendance already given for today!")
     else:
-        Attendance.objects.create(employee=employee, date=today, time=current_time)
-        # Filter and update the employee's MonthSummary
-        month_summary = MonthSummary.objects.filter(
-            employee_id=employee.id,
-            month=current_month,
-            year=current_year
-        ).first()
-
-        if month_summary:
-            month_summary.total_present_days += 1
-            month_summary.save()
-        else:
-            # If no record exists, create a new one
-            MonthSummary.objects.create(
-                month=current_month,
-                year=current_year,
-                employee_id=employee.id,
-                employee_name=employee.user.get_full_name() or employee.user.username,
-                total_workdays=0,
-                total_present_days=1,  # First attendance for the month
-                total_holidays_taken=0,
-                total_occasional_holidays=0,
-                total_task_assigned=0,
-                assigned_task_ids_with_title="",
-                total_task_completed=0,
-                completed_task_ids_with_title="",
-                employee_present_status="Running"
-            )
         messages.success(request, f"Attendance marked successfully at {current_time.strftime('%I:%M %p')}!")
 
     return redirect('dashboard')
@@ -391,20 +333,41 @@ def mark_attendance(request):
 def quit(request):
     employee = Employee.objects.get(user=request.user)
     today = localdate()
+    quit_time = localtime().time()
 
-    # Get the attendance record for today
-    attendance = Attendance.objects.filter(employee=employee, date=today).first()
-
-    if attendance and attendance.quit_time is None:
-        # Update quit time
-        attendance.quit_time = localtime().time()
-        attendance.save()
-        messages.success(request, f"Quit time recorded at {attendance.quit_time.strftime('%I:%M %p')}")
+    # Update quit time only if today's attendance exists and has none yet
+    if check_out(employee, today, quit_time):
+        messages.success(request, f"Quit time recorded at {quit_time.strftime('%I:%M %p')}")
     else:
         messages.error(request, "You have not marked attendance yet or quit time is already recorded.")
 
     return redirect('dashboard') 
 
+@csrf_exempt
+@require_POST
+def attendance_events_api(request):
+    """Bulk check-in/check-out endpoint for badge readers and kiosks (JSON in, JSON out)."""
+    token = getattr(django_settings, "ATTENDANCE_DEVICE_TOKEN", "")
+    if not token or not hmac.compare_digest(request.headers.get('X-Device-Token', ''), token):
+        return JsonResponse({'error': "Invalid device token."}, status=403)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': "Request body must be JSON."}, status=400)
+
+    events = payload.get('events') if isinstance(payload, dict) else payload
+    if not isinstance(events, list):
+        return JsonResponse({'error': "Expected a list of events."}, status=400)
+    if len(events) > MAX_EVENTS_PER_BATCH:
+        return JsonResponse({'error': f"At most {MAX_EVENTS_PER_BATCH} events per request."}, status=400)
+
+    results = ingest_events(events)
+    return JsonResponse({
+        'recorded': sum(1 for result in results if result['status'] == 'recorded'),
+        'results': results,
+    })
+
 @login_required
 def update_employee(request, employee_id):
     if not request.user.is_staff:
@@ -531,45 +494,45 @@ def employee_attendance_detail(request, employee_id):
         return redirect('dashboard')
 
     employee = get_object_or_404(Employee, id=employee_id)
-    attendance = Attendance.objects.filter(employee=employee)
 
     today = localdate()
     total_days = monthrange(today.year, today.month)[1]
+    month_cal = month_calendar(today.year, today.month)
+    # This month's check-ins with their worked / late / early / overtime minutes, in one query
+    days = timesheet_days(month_cal.first_day, month_cal.next_month, [employee.id])
+    attendance = [
+        {
+            'date': day.date,
+            'time': clock_text(day.check_in),
+            'quit_time': clock_text(day.quit),
+            'worked': "-" if day.open else duration_text(day.worked_minutes),
+            'late_minutes': int(day.late_minutes),
+            'early_minutes': int(day.early_minutes),
+            'overtime': duration_text(day.overtime_minutes) if day.overtime_minutes else "",
+        }
+        for day in days.itertuples()
+    ]
+    sheet = sum_days(days)
+    timesheet = sheet.iloc[0].to_dict() if len(sheet) else dict.fromkeys(sheet.columns, 0)
 
     # Fetch holidays
-    default_holiday = DefaultHoliday.objects.first()
-    total_occasional_holidays = MultiDefaultHoliday.objects.all()
-    occasional_holidays = list(set([
-        f"{holiday.holiday_date} ({holiday.holiday_date.strftime('%A')})"
-        for holiday in total_occasional_holidays
-    ]))
-    occasional_holidays.sort(key=lambda x: datetime.strptime(x.split(" ")[0], "%Y-%m-%d"))
-
-    employee_holidays = EmployeeHoliday.objects.filter(employee=employee)
-
-    # Collect default holidays
-    default_holidays = []
-    if default_holiday:
-        for day in range(1, total_days + 1):
-            date = today.replace(day=day)
-            if date.strftime("%A").lower() == default_holiday.day.lower():
-                default_holidays.append(f"{date} ({date.strftime('%A')})")
-
-    # Collect extra holidays
-    extra_holidays = list(set([f"{holiday.holiday_date} ({holiday.holiday_date.strftime('%A')})" for holiday in employee_holidays]))
-    extra_holidays.sort(key=lambda x: x.split(" ")[0])
-
-    all_holiday_dates = sorted(set([h.split(" ")[0] for h in default_holidays + extra_holidays + occasional_holidays]))  
+    holidays = month_cal.employee_summary(
+        EmployeeHoliday.objects.filter(
+            employee=employee, **month_cal.range_filter('holiday_date')
+        ).values_list('holiday_date', flat=True)
+    )
+    default_holidays = holidays['default_holidays']
+    extra_holidays = holidays['extra_holidays']
 
     # Holiday calculations
-    extra_holiday_count = len(extra_holidays)
-    default_holiday_count = len(default_holidays)
-    occasional_holiday_count = len(occasional_holidays)
-    total_holidays = len(all_holiday_dates)
-    
-    workdays = total_days - total_holidays
+    extra_holiday_count = holidays['extra_holiday_count']
+    default_holiday_count = holidays['default_holiday_count']
+    occasional_holiday_count = holidays['occasional_holiday_count']
+    total_holidays = holidays['total_holidays']
 
-    present_count = attendance.count()
+    workdays = holidays['workdays']
+
+    present_count = len(attendance)
     absent_count = workdays - present_count
     
     workday_percentage = (workdays / total_days) * 100 if workdays > 0 else 0
@@ -587,28 +550,8 @@ def employee_attendance_detail(request, employee_id):
             task.employee = employee
             task.save()
             
-            # Get or create the MonthSummary for the employee for the current month
-            today = localdate()
-            month_summary, created = MonthSummary.objects.get_or_create(
-                month=today.strftime("%B"),
-                year=today.year,
-                employee_id=employee.id,
-                defaults={"employee_name": employee.user.get_full_name() or employee.user.username}
-            )
-
-            # Add the new task to the assigned task list in MonthSummary
-            assigned_task_ids_with_title = month_summary.assigned_task_ids_with_title
-            task_info = f"{task.id}: {task.title}"
-            
-            # If there are already assigned tasks, append the new task
-            if assigned_task_ids_with_title:
-                assigned_task_ids_with_title += f", {task_info}"
-            else:
-                assigned_task_ids_with_title = task_info
-
-            month_summary.assigned_task_ids_with_title = assigned_task_ids_with_title
-            month_summary.total_task_assigned += 1
-            month_summary.save()
+            # Record the new task in the employee's MonthSummary for the current month
+            record_month_task(employee.id, task, 'assigned', localdate())
             
             messages.success(request, "Task assigned successfully!")
             return redirect('employee_attendance_detail', employee_id=employee.id)
@@ -618,6 +561,9 @@ def employee_attendance_detail(request, employee_id):
     context = {
         'employee': employee,
         'attendance': attendance,
+        'timesheet': timesheet,
+        'worked_hours': duration_text(timesheet['total_worked_minutes']),
+        'overtime_hours': duration_text(timesheet['total_overtime_minutes']),
         'present_count': present_count,
         'absent_count': absent_count,
         'extra_holiday_count': extra_holiday_count,
@@ -650,23 +596,23 @@ def add_employee_holiday(request):
     if not request.user.is_staff:
         return redirect('dashboard')
     if request.method == "POST":
-        employee_id = request.POST.get('employee_id')
-        selected_dates = request.POST.getlist('holiday_dates')  # Multiple dates
+        # One or more employees (a whole team at once), dates and "a..b" ranges
+        employee_ids = [value for value in request.POST.getlist('employee_id') if value.isdigit()]
+        try:
+            selected_dates = expand_holiday_dates(request.POST.getlist('holiday_dates'))
+        except ValueError as error:
+            messages.error(request, str(error))
+            return redirect('dashboard')
 
-        if not employee_id or not selected_dates:
+        employees = list(Employee.objects.filter(id__in=employee_ids).select_related('user'))
+        if not employees or not selected_dates:
             messages.error(request, "Please select an employee and dates.")
             return redirect('dashboard')
 
-        employee = Employee.objects.get(id=employee_id)
-        
-
-        for date in selected_dates:
-            holiday_date = parse_date(date)  # Ensure it's a valid date
-            
-            if holiday_date:
-                EmployeeHoliday.objects.create(employee=employee, holiday_date=holiday_date)
+        add_employee_holidays([employee.id for employee in employees], selected_dates)
 
-        messages.success(request, f"Holidays added successfully for {employee.user.username}.")
+        names = ", ".join(employee.user.username for employee in employees)
+        messages.success(request, f"Holidays added successfully for {names}.")
         return redirect('dashboard')
 
     employees = Employee.objects.all()
@@ -767,6 +713,28 @@ def delete_message(request, message_id):
     messages.success(request, "Message deleted successfully!")
     return redirect('admin_messages') 
 
+@login_required
+def assign_task_bulk(request):
+    if not request.user.is_staff:
+        return redirect('dashboard')
+    if request.method == 'POST':
+        form = BulkTaskForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            employees = assignment_targets(
+                [employee.id for employee in data['employees']],
+                data['sector'].id if data['sector'] else None,
+                data['position'].id if data['position'] else None,
+            )
+            tasks = assign_task(employees, data['title'], data['description'], data['start_date'], data['end_date'])
+            if tasks:
+                messages.success(request, f"Task '{data['title']}' assigned to {len(tasks)} employee(s).")
+                return redirect('view_all_tasks')
+            messages.error(request, "No employee matches that sector and position.")
+    else:
+        form = BulkTaskForm()
+    return render(request, 'assign_task_bulk.html', {'form': form})
+
 # Edit Task
 @login_required
 def edit_task(request, task_id):
@@ -776,6 +744,8 @@ def edit_task(request, task_id):
     if request.method == 'POST':
         form = TaskForm(request.POST, instance=task)
         if form.is_valid():
+            if 'end_date' in form.changed_data:
+                form.instance.deadline_flagged_at = None  # The new deadline has been chosen by hand
             form.save()
             messages.success(request, "Task updated successfully!")
             return redirect('view_all_tasks')
@@ -810,13 +780,85 @@ def delete_task(request, task_id):
     messages.success(request, "Task deleted successfully!")
     return redirect('employee_attendance_detail', employee_id=employee_id) 
 
+def _parse_day(value):
+    # "YYYY-MM-DD" -> date; None when blank, malformed or impossible (2025-02-30)
+    try:
+        return parse_date((value or '').strip())
+    except ValueError:
+        return None
+
+TASK_PAGE_SIZE = 100
+TASK_BOARD_PARAMS = ('employee', 'sector', 'status', 'from', 'to', 'overdue', 'sort')
+
+def _task_board_filters(params):
+    sector = params.get('sector', '')
+    return {
+        'employee': params.get('employee', '').strip(),
+        'sector': int(sector) if sector.isdigit() else None,
+        'status': params.get('status', ''),
+        'from': _parse_day(params.get('from')),
+        'to': _parse_day(params.get('to')),
+        'overdue': params.get('overdue') == '1',
+        'sort': 'status' if params.get('sort') == 'status' else '',
+    }
+
 @login_required
 def view_all_tasks(request):
     if not request.user.is_staff:
         return redirect('dashboard')
     today = localdate()
-    tasks = Task.objects.select_related('employee').order_by('-start_date')  # Fetch all tasks sorted by start date
-    return render(request, 'view_all_tasks.html', {'tasks': tasks, 'today': today})
+    filters = _task_board_filters(request.GET)
+    tasks = Task.objects.select_related('employee__user', 'employee__sector').with_status(today)
+
+    # Server-side filters: ?employee= (id or username), ?sector=, ?status=, ?from= / ?to= on the
+    # deadline, ?overdue=1 (status "Date Over"); written as column conditions so the (end_date, id)
+    # index does the work
+    if filters['employee']:
+        employee = filters['employee']
+        tasks = tasks.filter(employee_id=int(employee)) if employee.isdigit() else tasks.filter(employee__user__username=employee)
+    if filters['sector'] is not None:
+        tasks = tasks.filter(employee__sector_id=filters['sector'])
+    if filters['status'] in TASK_STATUSES:
+        tasks = tasks.with_status_label(filters['status'], today)
+    if filters['from']:
+        tasks = tasks.filter(end_date__gte=filters['from'])
+    if filters['to']:
+        tasks = tasks.filter(end_date__lte=filters['to'])
+    if filters['overdue']:
+        tasks = tasks.with_status_label("Date Over", today)  # Same rule as the status badge
+
+    # Keyset pages in deadline order (or by status, then deadline): ?after= is the previous page's last key
+    keys = ['status_rank', 'end_date', 'id'] if filters['sort'] == 'status' else ['end_date', 'id']
+    rows, next_cursor = keyset_page(tasks, keys, request.GET.get('after'), TASK_PAGE_SIZE)
+
+    params = {name: value for name, value in request.GET.items() if name in TASK_BOARD_PARAMS and value}
+    return render(request, 'view_all_tasks.html', {
+        'tasks': rows,
+        'today': today,
+        'statuses': TASK_STATUSES,
+        'status_filter': filters['status'],
+        'sort': filters['sort'],
+        'filters': filters,
+        'query': urlencode(params),
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('after'),
+        'sectors': Sector.objects.all(),
+    })
+
+
+@login_required
+@require_POST
+def reschedule_task_deadlines(request):
+    # After a holiday change: move open deadlines that fall on a day off to the next
+    # workday, or only flag them (?mode=flag), for one sector or all
+    if not request.user.is_staff:
+        return redirect('dashboard')
+    sector_id = request.POST.get('sector', '')
+    sector_id = int(sector_id) if sector_id.isdigit() else None
+    flag_only = request.POST.get('mode') == 'flag'
+    count = reschedule_deadlines(sector_id, flag_only=flag_only)
+    messages.success(request, f"{count} task deadline(s) on a day off {'flagged' if flag_only else 'moved to the next workday'}.")
+    return redirect('view_all_tasks')
 
 @login_required
 def deliver_task(request, task_id):
@@ -835,44 +877,8 @@ def approve_task(request, task_id):
         return redirect('dashboard')
 
     task = get_object_or_404(Task, id=task_id)
-    emp_id = task.employee.id
-    if task.is_delivered:
-        task.is_completed = True  # Mark task as completed
-        task.is_delivered = False  # Reset delivery request
-        task.save()
-
-        # Get the current month and year
-        today = localdate()
-        current_month = today.strftime("%B")
-        current_year = today.year
-
-        # Filter MonthSummary by employee and current month/year
-        month_summary = MonthSummary.objects.filter(
-            employee_id=emp_id,
-            month=current_month,
-            year=current_year
-        ).first()
-
-        if month_summary:
-            # Add the completed task to the completed_task_ids_with_title field
-            completed_task_ids_with_title = month_summary.completed_task_ids_with_title
-            task_info = f"{task.id}: {task.title}"
-
-            # If there are already completed tasks, append the new task
-            if completed_task_ids_with_title:
-                completed_task_ids_with_title += f", {task_info}"
-            else:
-                completed_task_ids_with_title = task_info
-
-            # Update the completed tasks field
-            month_summary.completed_task_ids_with_title = completed_task_ids_with_title
-
-            # Increment the total_task_completed count by 1
-            month_summary.total_task_completed += 1
-
-            # Save the updated MonthSummary
-            month_summary.save()
-            
+    # Completes the task, counts it in the employee's MonthSummary and keeps an "Approved" history row
+    if approve_tasks([task.id])[0]['status'] == 'approved':
         messages.success(request, f"Task '{task.title}' has been marked as completed.")
 
     return redirect(request.META.get('HTTP_REFERER', 'view_all_tasks'))
@@ -884,10 +890,7 @@ def reject_task(request, task_id):
 
     task = get_object_or_404(Task, id=task_id)
 
-    if task.is_delivered:
-        task.is_delivered = False  # Reset delivery status
-        task.rejected_count += 1 # Number of rejected tasks
-        task.save()
+    if reject_tasks([task.id])[0]['status'] == 'rejected':
         messages.warning(request, f"Task '{task.title}' has been rejected. The employee can deliver again.")
 
     return redirect(request.META.get('HTTP_REFERER', 'view_all_tasks'))  # Redirect back to admin panel
@@ -901,136 +904,100 @@ def extend_task_date(request, task_id):
 
     if request.method == 'POST':
         new_end_date_str = request.POST.get('new_end_date')
-
-        if new_end_date_str:
-            new_end_date = datetime.strptime(new_end_date_str, "%Y-%m-%d").date()  # Convert to date format
-            today = date.today()
-
-            # Validation checks
-            if new_end_date < today:
-                messages.error(request, "Extended date must be greater than or equal today.")
-            elif new_end_date <= task.end_date:
-                messages.error(request, "Extended date must be greater than the current end date.")
+        business_days = request.POST.get('business_days', '')
+
+        new_end_date = _parse_day(new_end_date_str)
+        if new_end_date_str and not new_end_date and not business_days.isdigit():
+            messages.error(request, "Invalid date.")
+        elif new_end_date or business_days.isdigit():
+            # Either a date, moved onto the next workday if it is a day off, or a number of workdays past the deadline
+            if business_days.isdigit():
+                result = extend_tasks([task.id], business_days=int(business_days))[0]
             else:
-                # Update end_date with the new extension
-                task.end_date = new_end_date  
-                task.extended_date = new_end_date
-                task.revision_count += 1  # Increase revision count
-                task.save()
+                result = extend_tasks([task.id], new_end_date)[0]
 
-                messages.success(request, f"Task '{task.title}' deadline extended to {new_end_date}. Revision count: {task.revision_count}")
+            if result['status'] == 'extended':
+                messages.success(request, f"Task '{task.title}' deadline extended to {result['detail']}. Revision count: {task.revision_count + 1}")
                 return redirect('view_all_tasks')
+            messages.error(request, result['detail'])
 
     return render(request, 'extend_task_date.html', {'task': task})
 
 
-def all_employee_attendance_details(request):
+TASK_BATCH_ACTIONS = {'approve': approve_tasks, 'reject': reject_tasks, 'extend': extend_tasks}
+
+
+@login_required
+@require_POST
+def task_batch_action(request, action):
+    # task_ids (repeated or comma-separated); extend also takes new_end_date or business_days.
+    # JSON clients get the per-task results, the task board a summary message
+    wants_json = 'application/json' in request.headers.get('Accept', '')
     if not request.user.is_staff:
-        return redirect('dashboard')
-    employees = Employee.objects.all()
-    today = localdate()
-    total_days = monthrange(today.year, today.month)[1]
+        return JsonResponse({'error': "Forbidden."}, status=403) if wants_json else redirect('dashboard')
+    if action not in TASK_BATCH_ACTIONS:
+        raise Http404("Unknown action.")
+
+    task_ids = parse_task_ids(request.POST.getlist('task_ids'))
+    error = None
+    if not task_ids:
+        error = "No tasks selected."
+    elif len(task_ids) > MAX_TASKS_PER_BATCH:
+        error = f"At most {MAX_TASKS_PER_BATCH} tasks per batch."
+    elif action == 'extend':
+        business_days = request.POST.get('business_days', '')
+        new_end_date = _parse_day(request.POST.get('new_end_date'))
+        if business_days.isdigit():
+            results = extend_tasks(task_ids, business_days=int(business_days))
+        elif new_end_date:
+            results = extend_tasks(task_ids, new_end_date)
+        elif request.POST.get('new_end_date'):
+            error = "Invalid date."
+        else:
+            error = "Give a new end date or a number of workdays."
+    else:
+        results = TASK_BATCH_ACTIONS[action](task_ids)
+
+    if error:
+        if wants_json:
+            return JsonResponse({'error': error}, status=400)
+        messages.error(request, error)
+        return redirect('view_all_tasks')
+
+    done = sum(result['status'] != 'failed' for result in results)
+    if wants_json:
+        return JsonResponse({'action': action, 'done': done, 'failed': len(results) - done, 'results': results})
+    messages.success(request, f"{action.capitalize()}: {done} task(s) done, {len(results) - done} failed.")
+    for result in results:
+        if result['status'] == 'failed':
+            messages.warning(request, f"Task {result['task_id']}: {result['detail']}")
+    return redirect('view_all_tasks')
 
-    attendance_summary = []
 
-    for employee in employees:
-        # Fetch attendance data for the employee
-        attendance = Attendance.objects.filter(employee=employee)
-        
-        # Fetch task data for the employee
-        tasks = Task.objects.filter(employee=employee)
-        
-        # Initialize counters for task statuses
-        total_tasks = tasks.count()
-        completed_tasks = 0
-        pending_tasks = 0
-        in_process_tasks = 0
-        in_revision_tasks = 0
-        date_over_tasks = 0
-        
-        # Categorize tasks based on the status method
-        for task in tasks:
-            status = task.status()  # Get the task status using the status method
-            if status == 'Completed':
-                completed_tasks += 1
-            elif status == 'Pending Approval':
-                pending_tasks += 1
-            elif status == 'In Process':
-                in_process_tasks += 1
-            elif status.startswith('In Revision'):
-                in_revision_tasks += 1
-            elif status == 'Date Over':
-                date_over_tasks += 1
-        
-        # Fetch holidays
-        default_holiday = DefaultHoliday.objects.first()
-        employee_holidays = EmployeeHoliday.objects.filter(employee=employee)
-        total_occasional_holidays = MultiDefaultHoliday.objects.all()
-
-        # Format occasional holidays
-        occasional_holidays = list(set([ 
-            f"{holiday.holiday_date} ({holiday.holiday_date.strftime('%A')})"
-            for holiday in total_occasional_holidays
-        ])) 
-        occasional_holidays.sort(key=lambda x: x.split(" ")[0])
-
-        # Collect default holidays
-        default_holidays = []
-        if default_holiday:
-            for day in range(1, total_days + 1):
-                date = today.replace(day=day)
-                if date.strftime("%A").lower() == default_holiday.day.lower():
-                    default_holidays.append(f"{date} ({date.strftime('%A')})")
-
-        # Collect extra holidays
-        extra_holidays = list(set([f"{holiday.holiday_date} ({holiday.holiday_date.strftime('%A')})" for holiday in employee_holidays]))
-        extra_holidays.sort(key=lambda x: x.split(" ")[0])
-            
-        # Combine all holidays
-        all_holiday_dates = sorted(set([h.split(" ")[0] for h in default_holidays + extra_holidays + occasional_holidays]))
+SUMMARY_PAGE_SIZE = 250
 
-        # Holiday counts
-        extra_holiday_count = len(extra_holidays)
-        default_holiday_count = len(default_holidays)
-        occasional_holiday_count = len(occasional_holidays)
-        total_holidays = len(all_holiday_dates)
 
-        # Calculate workdays, present, and absent days
-        workdays = total_days - total_holidays
-        present_count = attendance.count()
-        absent_count = workdays - present_count
+def all_employee_attendance_details(request):
+    if not request.user.is_staff:
+        return redirect('dashboard')
+
+    # The whole report comes from a fixed number of grouped queries
+    df = activity_summary(localdate())
 
-        # Append the employee's attendance and task summary to the list
-        attendance_summary.append({
-            "employee_name": employee.user,  # Name of the employee
-            "total_workdays": workdays,
-            "present": present_count,
-            "absent": absent_count,
-            "default_holidays": default_holiday_count,
-            "occasional_holidays": occasional_holiday_count,
-            "extra_holidays": extra_holiday_count,
-            "total_holidays": total_holidays,
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks,
-            "pending_tasks": pending_tasks,
-            "in_process_tasks": in_process_tasks,
-            "in_revision_tasks": in_revision_tasks,
-            "date_over_tasks": date_over_tasks,
-        })
-        
     # ✅ Export to Excel if requested
     if "export" in request.GET:
-        df = pd.DataFrame(attendance_summary)
         response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
         response["Content-Disposition"] = 'attachment; filename="Employee_Attendance_Summary.xlsx"'
 
-        with pd.ExcelWriter(response, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="All Employee Activity Summary")
-
+        write_xlsx(response, "All Employee Activity Summary", df)
         return response
 
-    # Render the data in the 'attendance_summary.html' template
-    return render(request, 'employee_task_and_attendance_status.html', {"attendance_summary": attendance_summary})
+    # Render the data in the 'attendance_summary.html' template, a page at a time
+    page_obj = Paginator(df.to_dict('records'), SUMMARY_PAGE_SIZE).get_page(request.GET.get('page'))
+    return render(request, 'employee_task_and_attendance_status.html', {
+        "attendance_summary": page_obj.object_list,
+        "page_obj": page_obj,
+    })
 
 
 @login_required
@@ -1056,70 +1023,48 @@ def delete_task_history(request, history_id):
 def export_task_history_to_excel(request):
     if not request.user.is_staff:  # Ensure only admins can delete
         return redirect('dashboard')
-    # Get all task history data
-    task_history = TaskHistoryKeeper.objects.all()
-
-    # Prepare data for the Excel file
-    data = []
-    for task in task_history:
-        data.append({
-            "Task ID": task.task_id,
-            "Title": task.task_title,
-            "Description": task.description,
-            "Assigned To": task.assigned_to,
-            "Start Date": task.start_date.strftime("%Y-%m-%d"),
-            "End Date": task.end_date.strftime("%Y-%m-%d"),
-            "Extended Date": task.extended_date.strftime("%Y-%m-%d") if task.extended_date else "N/A",
-            "Revisions": task.revision_count,
-            "Rejections": task.rejected_count,
-            "Status": task.status,
-            "Action Taken": task.action_taken,
-            "Action Date": task.action_date.strftime("%Y-%m-%d %H:%M:%S"),
-        })
-
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
-
-    # Create HTTP response for Excel file
-    response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response["Content-Disposition"] = 'attachment; filename="Task_History.xlsx"'
-
-    # Save the DataFrame to an Excel file in memory
-    with pd.ExcelWriter(response, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Task History")
-
-    return response
+
+    # Streamed straight from the database cursor: ?format=csv for CSV, XLSX otherwise
+    rows = task_history_rows()
+    if request.GET.get('format') == 'csv':
+        return csv_response("Task_History.csv", TASK_HISTORY_COLUMNS, rows)
+    return xlsx_response("Task_History.xlsx", "Task History", TASK_HISTORY_COLUMNS, rows)
+
 
 
+MONTH_SUMMARY_PAGE_SIZE = 100
+
 
 @login_required
 def view_all_month_summaries(request):
     if not request.user.is_staff:  # Ensure only admins can delete
         return redirect('dashboard')
-    # Get the current month and year
-    today = date.today()
-    current_month = today.strftime("%B")
-    current_year = today.year
-
-    # Retrieve all MonthSummary entries for the current month and year
-    month_summaries = MonthSummary.objects.filter(month=current_month, year=current_year)
-
-    # Process the assigned and completed task strings into lists
-    for summary in month_summaries:
-        if summary.assigned_task_ids_with_title:
-            summary.assigned_task_list = [task.strip() for task in summary.assigned_task_ids_with_title.split(",")]
-        else:
-            summary.assigned_task_list = []  # Empty list if no assigned tasks
-
-        if summary.completed_task_ids_with_title:
-            summary.completed_task_list = [task.strip() for task in summary.completed_task_ids_with_title.split(",")]
-        else:
-            summary.completed_task_list = []  # Empty list if no completed tasks
+    # ?from=YYYY-MM&to=YYYY-MM&sector=&position=&group=month|employee, this month by default
+    filters = summary_filters(request.GET, localdate())
+    summaries = filtered_month_summaries(filters)
+
+    # Keyset pages: ?after= carries the sort key of the previous page's last row
+    if filters['group'] == 'employee':
+        rows, next_cursor = keyset_page(
+            employee_totals(summaries), ['employee_id'], request.GET.get('after'), MONTH_SUMMARY_PAGE_SIZE
+        )
+    else:
+        # With their task lists in one query per page
+        rows, next_cursor = keyset_page(
+            summaries.prefetch_related('task_entries'), ['period', 'employee_id'],
+            request.GET.get('after'), MONTH_SUMMARY_PAGE_SIZE,
+        )
 
+    params = filter_params(filters)
     return render(request, 'all_month_summaries.html', {
-        'month_summaries': month_summaries,
-        'month': current_month,
-        'year': current_year
+        'month_summaries': rows,
+        'filters': filters,
+        'params': params,
+        'query': urlencode(params),
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('after'),
+        'sectors': Sector.objects.all(),
+        'positions': Position.objects.all(),
     })
 
 @login_required
@@ -1138,45 +1083,178 @@ def delteMonthSummary(request, id):
 def export_month_summaries_to_excel(request):
     if not request.user.is_staff:  # Ensure only admins can delete
         return redirect('dashboard')
-    # Get the current month and year
-    today = date.today()
-    current_month = today.strftime("%B")
-    current_year = today.year
-    today_date_str = today.strftime("%Y-%m-%d") 
-    
-    # Retrieve all MonthSummary entries for the current month and year
-    month_summaries = MonthSummary.objects.filter(month=current_month, year=current_year)
+    # Same filters as the month summaries page
+    today = localdate()
+    filters = summary_filters(request.GET, today)
+    summaries = filtered_month_summaries(filters)
 
-    # Convert MonthSummary queryset into a list of dictionaries for Pandas DataFrame
-    month_summary_data = [
-        {
-            'Employee Name': summary.employee_name,
-            'Employee ID': summary.employee_id,
-            'Total Workdays': summary.total_workdays,
-            'Total Present Days': summary.total_present_days,
-            'Total Holidays Taken': summary.total_holidays_taken,
-            'Total Occasional Holidays': summary.total_occasional_holidays,
-            'Total Task Assigned': summary.total_task_assigned,
-            'Assigned Tasks': summary.assigned_task_ids_with_title,
-            'Total Task Completed': summary.total_task_completed,
-            'Completed Tasks': summary.completed_task_ids_with_title,
-            'Employee Status': summary.employee_present_status
-        }
-        for summary in month_summaries
-    ]
+    # Streamed straight from the database cursor: ?format=csv for CSV, XLSX otherwise
+    if filters['group'] == 'employee':
+        columns, rows = MONTH_SUMMARY_TOTAL_COLUMNS, month_summary_total_rows(employee_totals(summaries))
+    else:
+        columns, rows = MONTH_SUMMARY_COLUMNS, month_summary_rows(summaries)
+    filename = EXPORT_KINDS['month_summary']['file_name'](today, request.GET)
+    if request.GET.get('format') == 'csv':
+        return csv_response(f"{filename}.csv", columns, rows)
+    return xlsx_response(f"{filename}.xlsx", "Month Summary", columns, rows)
+
+
+
+ANALYTICS_DEFAULT_DIMENSIONS = ['month', 'sector', 'position']
+
+
+def _analytics_request(request):
+    # Same month range / sector / position parameters as the month summaries page, plus
+    # ?by=month,sector,position; "by" left out means all three, an empty "by=" the grand total
+    filters = summary_filters(request.GET, localdate())
+    by = parse_dimensions(request.GET.getlist('by')) if 'by' in request.GET else ANALYTICS_DEFAULT_DIMENSIONS
+    refreshed = refresh_cube(filters)
+    return filters, by, refreshed
+
+
+@login_required
+def analytics(request):
+    if not request.user.is_staff:
+        return redirect('dashboard')
+    filters, by, refreshed = _analytics_request(request)
+    params = filter_params(filters)
+    params.pop('group', None)
+    return render(request, 'analytics.html', {
+        'rows': cube_slice(filters, by),
+        'total': cube_slice(filters, [])[0],
+        'filters': filters,
+        'params': params,
+        'by': by,
+        'json_query': urlencode({**params, 'by': ",".join(by)}),
+        'sectors': Sector.objects.all(),
+        'positions': Position.objects.all(),
+    })
+
+
+@login_required
+def analytics_cube(request):
+    if not request.user.is_staff:
+        return JsonResponse({'error': "Forbidden."}, status=403)
+    filters, by, refreshed = _analytics_request(request)
+    return JsonResponse({
+        'from': filters['first'].strftime("%Y-%m"),
+        'to': filters['last'].strftime("%Y-%m"),
+        'sector': filters['sector'],
+        'position': filters['position'],
+        'by': by,
+        'refreshed_months': refreshed,
+        'rows': cube_slice(filters, by),
+    })
 
-    # Create a Pandas DataFrame
-    df = pd.DataFrame(month_summary_data)
 
-    # Create an HTTP response with the Excel file
-    response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response['Content-Disposition'] = f'attachment; filename="month_summary_{current_month}_{current_year}_{today_date_str}.xlsx"'
+@login_required
+def holiday_coverage(request):
+    # ?sector=<id> or ?employee=<id> (that employee's sector), ?from=YYYY-MM-DD (today),
+    # ?weeks=N (4): who is off and who is left each day, checked before approving leave
+    if not request.user.is_staff:
+        return JsonResponse({'error': "Forbidden."}, status=403)
+    sector_id = request.GET.get('sector') or None
+    employee_id = request.GET.get('employee')
+    if employee_id:
+        employee = Employee.objects.filter(id=employee_id if employee_id.isdigit() else 0).first()
+        if employee is None:
+            return JsonResponse({'error': "Unknown employee."}, status=404)
+        sector_id = employee.sector_id
+    elif sector_id is not None and not (sector_id.isdigit() and Sector.objects.filter(id=sector_id).exists()):
+        return JsonResponse({'error': "Unknown sector."}, status=404)
+
+    start = _parse_day(request.GET.get('from')) or localdate()
+    weeks = request.GET.get('weeks', '')
+    weeks = min(max(int(weeks), 1), MAX_FORECAST_WEEKS) if weeks.isdigit() else 4
+    forecast = coverage_forecast(start, weeks, int(sector_id) if sector_id is not None else None)
+    return JsonResponse({
+        'sector': int(sector_id) if sector_id is not None else None,
+        'from': start.isoformat(),
+        'weeks': weeks,
+        **forecast,
+    })
 
-    # Write the DataFrame to the Excel file
-    with pd.ExcelWriter(response, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name='Month Summary')
 
-    return response
+@login_required
+def search_records(request):
+    # ?q=words, ?kind=task|history|message (repeatable; all by default), ?page=N:
+    # ranked full-text matches, as JSON for Accept: application/json, else the search page
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+    if not request.user.is_staff:
+        return JsonResponse({'error': "Forbidden."}, status=403) if wants_json else redirect('dashboard')
+    query = request.GET.get('q', '').strip()
+    kinds = [kind for kind in request.GET.getlist('kind') if kind in SEARCH_KINDS]
+    page = request.GET.get('page', '')
+    found = search(query, kinds, int(page) if page.isdigit() else 1)
+
+    if wants_json:
+        return JsonResponse({'q': query, 'kinds': kinds or list(SEARCH_KINDS), **found})
+    params = urlencode([('q', query)] + [('kind', kind) for kind in kinds])
+    return render(request, 'search.html', {
+        'q': query,
+        'kinds': kinds,
+        'all_kinds': list(SEARCH_KINDS),
+        'query': params,
+        **found,
+    })
+
+def _export_job_payload(job):
+    return {
+        'job_id': job.id,
+        'kind': job.kind,
+        'format': job.file_format,
+        'status': job.status,
+        'error': job.error,
+        'status_url': reverse('export_job_status', args=[job.id]),
+        'download_url': reverse('download_export', args=[job.id]) if job.status == 'done' else None,
+    }
+
+
+@login_required
+@require_POST
+def request_export(request, kind):
+    if not request.user.is_staff:
+        return redirect('dashboard')
+    if kind not in EXPORT_KINDS:
+        raise Http404("Unknown export.")
+    file_format = request.POST.get('format', 'xlsx')
+    if file_format not in ('xlsx', 'csv'):
+        file_format = 'xlsx'
+
+    # Built by the export worker; a cached file of unchanged data comes back as done
+    job = enqueue_export(kind, file_format, request.user, params=request.POST.dict())
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse(_export_job_payload(job), status=200 if job.status == 'done' else 202)
+    return redirect('export_job_detail', job_id=job.id)
+
+
+@login_required
+def export_job_detail(request, job_id):
+    if not request.user.is_staff:
+        return redirect('dashboard')
+    job = get_object_or_404(ExportJob, id=job_id)
+    return render(request, 'export_job.html', {'job': job})
+
+
+@login_required
+def export_job_status(request, job_id):
+    if not request.user.is_staff:
+        return JsonResponse({'error': "Forbidden."}, status=403)
+    job = get_object_or_404(ExportJob, id=job_id)
+    return JsonResponse(_export_job_payload(job))
+
+
+@login_required
+def download_export(request, job_id):
+    if not request.user.is_staff:
+        return redirect('dashboard')
+    job = get_object_or_404(ExportJob, id=job_id, status='done')
+    path = artifact_path(job.file_name)
+    if not os.path.exists(path):
+        # Replaced by a newer build of the same export
+        messages.error(request, "This export has expired, please request it again.")
+        return redirect('export_job_detail', job_id=job.id)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=job.download_name)
 
 
 
@@ -1196,15 +1274,15 @@ def reset_attendance(request):
     if system_state.last_processed_month == current_month and system_state.last_processed_year == current_year:
         messages.error(request, "Attendance has already been reset for this month.")
     else:
-        # Delete all attendance records
-        Attendance.objects.all().delete()
+        # Move closed months into the archive, keeping only this month in Attendance
+        archived = archive_attendance(before=today.replace(day=1))
         
         # Update system state
         system_state.last_processed_month = current_month
         system_state.last_processed_year = current_year
         system_state.save()
 
-        messages.success(request, "All attendance records have been cleared for the new month.")
+        messages.success(request, f"{archived} attendance records from previous months have been archived for the new month.")
 
     return redirect('dashboard')
 
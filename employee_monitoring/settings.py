@@ -49,6 +49,13 @@ LOGOUT_REDIRECT_URL = '/accounts/login/'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Shared secret badge readers / kiosks send in the X-Device-Token header; the bulk
+# attendance API is disabled while it is empty
+ATTENDANCE_DEVICE_TOKEN = os.environ.get('ATTENDANCE_DEVICE_TOKEN', '')
+
+# Where the export worker (manage.py run_export_worker) keeps the built export files
+EXPORT_ROOT = os.environ.get('EXPORT_ROOT', os.path.join(BASE_DIR, 'exports'))
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -61,7 +68,6 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'employee_monitoring.urls'
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 TEMPLATES = [
     {
@@ -89,6 +95,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction begins so concurrent gunicorn
+            # workers wait on the busy timeout instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # File-backed so tests can exercise concurrent connections (in-memory is shared-cache)
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 